@@ -0,0 +1,138 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import azure_transport
+import llm_analysis
+import speech_fast_transcription
+import telemetry
+
+"""async_pipeline.py
+Overlapping transcribe -> summarize pipeline on one event loop.
+
+    results = async_pipeline.run([("a.wav", data_a), ("b.m4a", path_b)], prompt="")
+
+- Stages: producer -> bounded queue -> transcription tasks (afast_transcript) ->
+  bounded queue -> summarization tasks (aanalysis_text). File N+1 is uploading /
+  transcribing while file N is being summarized; the bounded queues apply
+  backpressure, so at most queue_size inputs are read ahead of the slowest stage
+- A failing file is recorded on its PipelineItem (error, stage) and never stops the others
+- on_result(item) (plain function or coroutine function) runs on the loop as each file
+  finishes (its errors are logged, never raised); run_pipeline() returns every item in input order
+- Inputs: (name, audio) where audio is bytes, an upload object or a file path (large files are streamed)
+"""
+
+PIPELINE_TRANSCRIBE_CONCURRENCY = int(os.getenv("PIPELINE_TRANSCRIBE_CONCURRENCY", "4"))
+PIPELINE_SUMMARIZE_CONCURRENCY = int(os.getenv("PIPELINE_SUMMARIZE_CONCURRENCY", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+_DONE = object()  # Queue sentinel: no more work for this stage
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineItem:
+    """One input file as it moves through the stages."""
+
+    def __init__(self, index: int, name: str, audio):
+        self.index = index
+        self.name = name
+        self.audio = audio
+        self.text: Optional[str] = None
+        self.language: Optional[str] = None
+        self.transcript = None      # transcript_model.Transcript
+        self.summary: Optional[str] = None
+        self.error: Optional[str] = None
+        self.stage: Optional[str] = None   # Stage that failed
+        self.timings = {}
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.summary is not None
+
+
+async def run_pipeline(inputs: Iterable[Tuple[str, object]], prompt: str = "", on_result: Optional[Callable] = None,
+                       transcribe_concurrency: int = PIPELINE_TRANSCRIBE_CONCURRENCY,
+                       summarize_concurrency: int = PIPELINE_SUMMARIZE_CONCURRENCY,
+                       queue_size: int = PIPELINE_QUEUE_SIZE, chunked: bool = False, hedged: bool = False,
+                       trim_silence: bool = False, mode: str = "auto") -> List[PipelineItem]:
+    """Transcribe and summarize every input with the two stages overlapped; items in input order."""
+    to_transcribe: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    to_summarize: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    items: List[PipelineItem] = []
+
+    async def finish(item):
+        if on_result is None:
+            return
+        try:  # A failing callback must not kill its worker (the other stages would block on the queues)
+            outcome = on_result(item)
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception:
+            logger.exception("on_result failed for %s", item.name)
+            telemetry.count("pipeline.callback_errors")
+
+    async def fail(item, stage, error):
+        item.error, item.stage = str(error), stage
+        telemetry.count("pipeline.failed", stage=stage)
+        await finish(item)
+
+    async def produce():
+        for index, (name, audio) in enumerate(inputs):
+            item = PipelineItem(index, name, audio)
+            items.append(item)
+            await to_transcribe.put(item)  # Blocks while the transcription stage is saturated
+        for _ in range(transcribe_concurrency):
+            await to_transcribe.put(_DONE)
+
+    async def transcribe():
+        while (item := await to_transcribe.get()) is not _DONE:
+            started = time.perf_counter()
+            try:
+                with telemetry.span("pipeline.transcribe", index=item.index):
+                    item.text, item.language, item.transcript = await speech_fast_transcription.afast_transcript(
+                        item.audio, chunked=chunked, hedged=hedged, trim_silence=trim_silence, structured=True)
+                    item.audio = None  # Drop the input reference once transcribed
+                if not item.text:
+                    raise RuntimeError("transcription failed")
+            except Exception as e:
+                await fail(item, "transcribe", e)
+                continue
+            item.timings["transcribe"] = time.perf_counter() - started
+            await to_summarize.put(item)
+
+    async def summarize():
+        while (item := await to_summarize.get()) is not _DONE:
+            started = time.perf_counter()
+            try:
+                with telemetry.span("pipeline.summarize", index=item.index):
+                    item.summary = await llm_analysis.aanalysis_text(prompt, f"Audio transcription: {item.text}",
+                                                                     item.language or "en-US", mode)
+            except Exception as e:
+                await fail(item, "summarize", e)
+                continue
+            item.timings["summarize"] = time.perf_counter() - started
+            await finish(item)
+
+    with telemetry.span("pipeline.run", transcribe=transcribe_concurrency, summarize=summarize_concurrency) as s:
+        summarizers = [asyncio.ensure_future(summarize()) for _ in range(summarize_concurrency)]
+        try:
+            await asyncio.gather(produce(), *(transcribe() for _ in range(transcribe_concurrency)))
+            for _ in range(summarize_concurrency):
+                await to_summarize.put(_DONE)
+            await asyncio.gather(*summarizers)
+        finally:
+            for task in summarizers:
+                task.cancel()
+            await azure_transport.aclose_clients()
+            await llm_analysis.aclose_client()
+        s.set(files=len(items), failed=sum(1 for item in items if item.error))
+    return items
+
+
+def run(inputs: Iterable[Tuple[str, object]], prompt: str = "", **kwargs) -> List[PipelineItem]:
+    """Synchronous entry point (owns its event loop); see run_pipeline for the arguments."""
+    return asyncio.run(run_pipeline(inputs, prompt, **kwargs))
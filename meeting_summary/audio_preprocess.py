@@ -0,0 +1,393 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from io import BytesIO
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+"""audio_preprocess.py
+Client-side audio normalization before upload to Fast Transcription.
+
+Pipeline (all NumPy vectorized):
+1. Sniff the real container from magic bytes (wav / mp3 / m4a / ogg / flac / webm)
+2. Decode: PCM WAV natively; other containers via ffmpeg when it is on PATH
+3. Downmix to mono (channels kept when diarization-by-channel is requested)
+4. Resample to 16 kHz (block-average for integer ratios, box filter + interp otherwise)
+5. Optional leading / trailing silence trim (frame RMS vs dBFS threshold)
+6. Encode 16-bit PCM WAV and keep it only if it is smaller than the original
+
+Undecodable inputs pass through untouched but with the correct filename / MIME type.
+Per-call and cumulative bytes saved / seconds spent are reported.
+
+Large recordings (file paths / on-disk file objects of at least STREAM_MIN_MB) stay out of
+memory: AudioSource reads them in chunks, and prepare_audio_source normalizes with
+ffmpeg file -> temp file (no silence trim) or passes the source through.
+"""
+
+TARGET_RATE = 16000
+STREAM_MIN_BYTES = int(float(os.getenv("AUDIO_STREAM_MIN_MB", "64")) * 1024 * 1024)  # Paths / file objects at least this big are streamed
+STREAM_CHUNK_BYTES = 1024 * 1024
+SILENCE_DBFS = -45.0     # Frames quieter than this count as silence
+SILENCE_FRAME_MS = 20
+SILENCE_PAD_MS = 250     # Keep a little context around speech
+
+CONTAINERS: Dict[str, Tuple[str, str]] = {
+    "wav": ("audio.wav", "audio/wav"),
+    "mp3": ("audio.mp3", "audio/mpeg"),
+    "m4a": ("audio.m4a", "audio/mp4"),
+    "ogg": ("audio.ogg", "audio/ogg"),
+    "flac": ("audio.flac", "audio/flac"),
+    "webm": ("audio.webm", "audio/webm"),
+}
+
+# Cumulative counters across calls (diagnostics)
+stats = {"calls": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+class _SharedReader:
+    """Independent read / seek / tell view of a file object that other readers share (positions don't interfere)."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, fileobj, size: int):
+        self._file = fileobj
+        self._size = size
+        self._pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._size - self._pos
+        with self._lock:
+            self._file.seek(self._pos)
+            data = self._file.read(max(0, min(size, self._size - self._pos)))
+        self._pos += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self._pos = offset if whence == 0 else self._pos + offset if whence == 1 else self._size + offset
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class AudioSource:
+    """Audio left where it is (file path or seekable file object) and read in chunks, never as a whole.
+
+    open() gives an independent reader, so concurrent uploads (hedged / chunked
+    attempts) can stream the same source. owned=True deletes the file on close().
+    """
+
+    def __init__(self, source, owned: bool = False):
+        if isinstance(source, (str, os.PathLike)):
+            self.path: Optional[str] = os.fspath(source)
+            self.fileobj = None
+            self.size = os.path.getsize(self.path)
+        else:
+            self.path = None
+            self.fileobj = source
+            self.size = source.seek(0, os.SEEK_END)
+        self.owned = owned
+        with self.open() as f:
+            self.container = sniff_container(f.read(16))
+
+    def __len__(self):
+        return self.size
+
+    def open(self):
+        return open(self.path, "rb") if self.path is not None else _SharedReader(self.fileobj, self.size)
+
+    def iter_chunks(self, chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+        with self.open() as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def close(self):
+        if self.owned and self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.owned = False
+
+
+def stream_source(audio) -> Optional[AudioSource]:
+    """AudioSource for a path / seekable file object of at least STREAM_MIN_BYTES, else None (handle in memory).
+
+    In-memory buffers (Streamlit UploadedFile, BytesIO) are never streamed: their bytes are
+    already loaded, and prepare_audio can normalize them without ffmpeg.
+    """
+    if isinstance(audio, AudioSource):
+        return audio
+    if isinstance(audio, (str, os.PathLike)):
+        size = os.path.getsize(audio)
+    elif hasattr(audio, "read") and hasattr(audio, "seek") and not hasattr(audio, "getvalue"):
+        position = audio.tell()
+        size = audio.seek(0, os.SEEK_END)
+        audio.seek(position)
+    else:
+        return None
+    return AudioSource(audio) if size >= STREAM_MIN_BYTES else None
+
+
+class PreparedAudio:
+    """Upload-ready audio payload plus what the preprocessing did to it.
+
+    data is bytes, or an AudioSource for streamed recordings (len() works on both).
+    """
+    def __init__(self, data, container: str, original_bytes: int, elapsed: float = 0.0,
+                 sample_rate: Optional[int] = None, channels: Optional[int] = None, trimmed_ms: int = 0, normalized: bool = False):
+        self.data = data
+        self.container = container
+        self.filename, self.mime = CONTAINERS.get(container, ("audio.bin", "application/octet-stream"))
+        self.original_bytes = original_bytes
+        self.elapsed = elapsed
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.trimmed_ms = trimmed_ms
+        self.normalized = normalized
+
+    def close(self):
+        """Delete the temp file behind a streamed, normalized payload (no-op otherwise)."""
+        if isinstance(self.data, AudioSource):
+            self.data.close()
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+    def summary(self) -> str:
+        if not self.normalized:
+            return f"Preprocess: passthrough {self.container} ({self.original_bytes} bytes, {self.elapsed * 1000:.0f} ms)"
+        return (f"Preprocess: {self.container} -> wav {self.sample_rate} Hz x{self.channels}, "
+                f"{self.original_bytes} -> {len(self.data)} bytes (saved {self.bytes_saved}), "
+                f"trimmed {self.trimmed_ms} ms, {self.elapsed * 1000:.0f} ms")
+
+
+def sniff_container(data) -> str:
+    head = bytes(data[:16])
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0):
+        return "mp3"
+    if head[4:8] == b"ftyp":
+        return "m4a"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    return "unknown"
+
+
+# ===== Decode / encode =====
+
+def decode_wav(data) -> Optional[Tuple[np.ndarray, int]]:
+    """PCM WAV -> (float32 samples shaped [frames, channels] in [-1, 1], sample rate)."""
+    try:
+        with wave.open(BytesIO(data), "rb") as wf:
+            channels, width, rate = wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+            raw = wf.readframes(wf.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = (b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        return None
+    return samples.reshape(-1, channels), rate
+
+
+def decode_ffmpeg(data, channels: Optional[int]) -> Optional[Tuple[np.ndarray, int]]:
+    """Decode any container ffmpeg understands straight to 16 kHz s16le."""
+    exe = shutil.which("ffmpeg")
+    if not exe:
+        return None
+    cmd = [exe, "-hide_banner", "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-ar", str(TARGET_RATE)]
+    out_channels = channels or 1
+    cmd += ["-ac", str(out_channels), "pipe:1"]
+    try:
+        proc = subprocess.run(cmd, input=bytes(data), capture_output=True, timeout=600)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if proc.returncode != 0 or not proc.stdout:
+        return None
+    samples = np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 32768.0
+    return samples.reshape(-1, out_channels), TARGET_RATE
+
+
+def encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    pcm = np.clip(samples * 32768.0, -32768, 32767).astype("<i2")
+    out = BytesIO()
+    with wave.open(out, "wb") as wf:
+        wf.setnchannels(samples.shape[1])
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+# ===== Signal ops =====
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    return samples if samples.shape[1] == 1 else samples.mean(axis=1, keepdims=True, dtype=np.float32)
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = TARGET_RATE) -> np.ndarray:
+    """Vectorized resample of [frames, channels]; anti-aliased when downsampling."""
+    if src_rate == dst_rate or not len(samples):
+        return samples
+    ratio = src_rate / dst_rate
+    if ratio.is_integer() and ratio > 1:
+        k = int(ratio)
+        n = (len(samples) // k) * k
+        return samples[:n].reshape(-1, k, samples.shape[1]).mean(axis=1, dtype=np.float32)
+    if ratio > 1:
+        # Box filter (moving average over ~ratio samples) via cumulative sum
+        width = int(np.ceil(ratio))
+        csum = np.cumsum(np.vstack([np.zeros((1, samples.shape[1]), np.float32), samples]), axis=0, dtype=np.float64)
+        samples = ((csum[width:] - csum[:-width]) / width).astype(np.float32)
+    n_out = int(len(samples) / ratio)
+    src_pos = np.arange(len(samples), dtype=np.float64)
+    dst_pos = np.arange(n_out, dtype=np.float64) * ratio
+    return np.stack([np.interp(dst_pos, src_pos, samples[:, c]) for c in range(samples.shape[1])], axis=1).astype(np.float32)
+
+
+def silence_bounds(samples: np.ndarray, rate: int, threshold_dbfs: float = SILENCE_DBFS, pad_ms: int = SILENCE_PAD_MS) -> Tuple[int, int]:
+    """(start, end) frame indices of the non-silent region (whole clip if all silent)."""
+    frame = max(1, rate * SILENCE_FRAME_MS // 1000)
+    n = len(samples) // frame
+    if n == 0:
+        return 0, len(samples)
+    energy = np.square(samples[:n * frame], dtype=np.float32).mean(axis=1).reshape(n, frame).mean(axis=1)
+    loud = np.flatnonzero(energy > 10 ** (threshold_dbfs / 10.0))
+    if not len(loud):
+        return 0, len(samples)
+    pad = rate * pad_ms // 1000
+    return max(0, loud[0] * frame - pad), min(len(samples), (loud[-1] + 1) * frame + pad)
+
+
+# ===== Entry point =====
+
+def prepare_audio(data, keep_channels: bool = False, trim_silence: bool = False) -> PreparedAudio:
+    """Normalize raw upload bytes for transcription (see module docstring)."""
+    t0 = time.perf_counter()
+    data = bytes(data) if not isinstance(data, bytes) else data
+    container = sniff_container(data)
+    decoded = decode_wav(data) if container == "wav" else None
+    if decoded is None and container != "wav":
+        decoded = decode_ffmpeg(data, 2 if keep_channels else None)
+
+    prepared = None
+    if decoded is not None:
+        samples, rate = decoded
+        if not keep_channels:
+            samples = downmix(samples)
+        samples = resample(samples, rate, TARGET_RATE)
+        trimmed_ms = 0
+        if trim_silence:
+            start, end = silence_bounds(samples, TARGET_RATE)
+            trimmed_ms = (len(samples) - (end - start)) * 1000 // TARGET_RATE
+            samples = samples[start:end]
+        encoded = encode_wav(samples, TARGET_RATE)
+        if len(encoded) < len(data):
+            prepared = PreparedAudio(encoded, "wav", len(data), sample_rate=TARGET_RATE,
+                                     channels=samples.shape[1], trimmed_ms=trimmed_ms, normalized=True)
+    if prepared is None:
+        prepared = PreparedAudio(data, container if container != "unknown" else "wav", len(data))
+
+    prepared.elapsed = time.perf_counter() - t0
+    with _stats_lock:
+        stats["calls"] += 1
+        stats["bytes_in"] += prepared.original_bytes
+        stats["bytes_out"] += len(prepared.data)
+        stats["seconds"] += prepared.elapsed
+    return prepared
+
+
+def _wav_is_target(source: AudioSource, keep_channels: bool) -> bool:
+    """True when a WAV source is already 16 kHz 16-bit (mono unless channels are kept) -> nothing to gain."""
+    try:
+        with source.open() as f, wave.open(f, "rb") as wf:
+            return (wf.getframerate() == TARGET_RATE and wf.getsampwidth() == 2
+                    and (keep_channels or wf.getnchannels() == 1))
+    except (wave.Error, EOFError):
+        return False
+
+
+def _spool(source: AudioSource) -> str:
+    """Copy a file-object source to a temp file in chunks (ffmpeg needs a seekable input for mp4 / m4a)."""
+    fd, path = tempfile.mkstemp(suffix="." + source.container, prefix="avia-in-")
+    with os.fdopen(fd, "wb") as f:
+        for chunk in source.iter_chunks():
+            f.write(chunk)
+    return path
+
+
+def prepare_audio_source(source: AudioSource, keep_channels: bool = False) -> PreparedAudio:
+    """Normalize a streamed recording with ffmpeg (file in, temp WAV out; memory stays flat).
+
+    File-object sources are spooled to a temp file first. Needs ffmpeg on PATH; otherwise,
+    or when the result is not smaller, the source is passed through. Silence trimming is
+    not applied here.
+    """
+    t0 = time.perf_counter()
+    container = source.container if source.container != "unknown" else "wav"
+    prepared = None
+    exe = shutil.which("ffmpeg")
+    if exe and not (container == "wav" and _wav_is_target(source, keep_channels)):
+        in_path = source.path if source.path is not None else _spool(source)
+        fd, out_path = tempfile.mkstemp(suffix=".wav", prefix="avia-")
+        os.close(fd)
+        channels = 2 if keep_channels else 1
+        cmd = [exe, "-hide_banner", "-loglevel", "error", "-y", "-i", in_path,
+               "-ac", str(channels), "-ar", str(TARGET_RATE), "-c:a", "pcm_s16le", out_path]
+        try:
+            ok = subprocess.run(cmd, capture_output=True, timeout=3600).returncode == 0
+        except (OSError, subprocess.SubprocessError):
+            ok = False
+        finally:
+            if in_path != source.path:
+                os.remove(in_path)
+        if ok and 0 < os.path.getsize(out_path) < source.size:
+            prepared = PreparedAudio(AudioSource(out_path, owned=True), "wav", source.size, sample_rate=TARGET_RATE,
+                                     channels=channels, normalized=True)
+        else:
+            os.remove(out_path)
+    if prepared is None:
+        prepared = PreparedAudio(source, container, source.size)
+
+    prepared.elapsed = time.perf_counter() - t0
+    with _stats_lock:
+        stats["calls"] += 1
+        stats["bytes_in"] += prepared.original_bytes
+        stats["bytes_out"] += len(prepared.data)
+        stats["seconds"] += prepared.elapsed
+    return prepared
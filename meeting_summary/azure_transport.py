@@ -0,0 +1,643 @@
+import asyncio
+import email.utils
+import hashlib
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
+
+import resources
+import telemetry
+
+try:  # Async transport (arequest / apost) is optional; the sync path needs only requests
+    import httpx
+except ImportError:
+    httpx = None
+
+"""azure_transport.py
+Shared transport layer for Azure REST / SDK calls (Fast Transcription, Translator).
+
+Design:
+- One pooled keep-alive requests.Session per endpoint (scheme://host), reused across threads
+- Retries on 429 / 5xx / connection errors with exponential backoff + jitter,
+  honoring Retry-After (seconds or HTTP date) and retry-after-ms headers
+- Per-endpoint AIMD concurrency governor: additive increase on success,
+  multiplicative decrease on 429 -> many concurrent users settle just under quota
+- Optional token bucket (requests/second) per endpoint for hard rate caps
+
+Translator SDK clients built via translator_client() share the same pooled session;
+SDK calls go through governed_call() for identical throttling behavior.
+shared_translator_client() builds one per credentials / endpoint per process
+(resources.py), so sessions and reruns reuse it instead of constructing their own.
+
+Every attempt is a telemetry span (http.attempt, with http.queue / http.backoff);
+bodies sent as TimedBody are split into http.upload and http.wait children.
+multipart_body() returns a MultipartStream: the body is produced while it is sent
+(bytes fields sliced in place, file-backed fields read in chunks) with its
+Content-Length known up front, so a request never holds a copy of the audio.
+
+Async variants (arequest / apost / agoverned_call / atranslate) use one pooled
+httpx.AsyncClient per endpoint and event loop, and wait on the same per-endpoint
+governors as the sync path (AdaptiveLimiter.acquire_async never blocks the loop),
+so sync and async callers share one quota.
+"""
+
+POOL_CONNECTIONS = int(os.getenv("AZURE_HTTP_POOL_CONNECTIONS", "8"))
+POOL_MAXSIZE = int(os.getenv("AZURE_HTTP_POOL_MAXSIZE", "32"))
+MAX_RETRIES = int(os.getenv("AZURE_HTTP_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5      # seconds, doubled per attempt
+BACKOFF_MAX = 30.0      # cap for computed / advertised delays
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Governor defaults (per endpoint)
+INITIAL_CONCURRENCY = float(os.getenv("AZURE_INITIAL_CONCURRENCY", "4"))
+MAX_CONCURRENCY = float(os.getenv("AZURE_MAX_CONCURRENCY", "32"))
+RATE_LIMIT_RPS = float(os.getenv("AZURE_RATE_LIMIT_RPS", "0"))  # 0 = no token bucket
+
+
+class TokenBucket:
+    """Classic token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency governor for one endpoint.
+
+    limit grows by ~1 per window of successful requests (1/limit per success)
+    and halves on every throttled (429) response.
+    """
+
+    def __init__(self, initial: float = INITIAL_CONCURRENCY, minimum: float = 1.0, maximum: float = MAX_CONCURRENCY, rate: float = RATE_LIMIT_RPS):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.throttled = 0
+        self.completed = 0
+        self._cond = threading.Condition()
+        self._bucket = TokenBucket(rate) if rate > 0 else None
+        self._async_waiters = []  # (loop, future) pairs woken on release
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= max(1, int(self.limit)):
+                self._cond.wait()
+            self.in_flight += 1
+        if self._bucket:
+            try:
+                self._bucket.acquire()
+            except BaseException:
+                self.release(completed=False)
+                raise
+
+    async def acquire_async(self):
+        """acquire() for coroutines: waits on a future instead of blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < max(1, int(self.limit)):
+                    self.in_flight += 1
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+        if self._bucket:
+            try:
+                await self._bucket.acquire_async()
+            except BaseException:  # Cancelled while waiting for a token: the slot is already counted
+                self.release(completed=False)
+                raise
+
+    def release(self, throttled: bool = False, completed: bool = True):
+        """Hand back a slot; completed=False (no response arrived) leaves the AIMD limit untouched."""
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self.limit = max(self.minimum, self.limit / 2)
+            elif completed:
+                self.completed += 1
+                self.limit = min(self.maximum, self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, waiter)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._cond:
+            return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "completed": self.completed, "throttled": self.throttled}
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def endpoint_key(url: str) -> str:
+    """Normalize a URL to its scheme://host[:port] (the pooling / governing unit)."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower() if parts.netloc else url.lower()
+
+
+def get_session(url: str) -> requests.Session:
+    key = endpoint_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+        return session
+
+
+def get_async_client(url: str) -> "httpx.AsyncClient":
+    """Pooled keep-alive AsyncClient for url's endpoint on the running event loop."""
+    if httpx is None:
+        raise RuntimeError("httpx is required for the async transport (pip install httpx)")
+    loop = asyncio.get_running_loop()
+    key = endpoint_key(url)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            limits = httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_CONNECTIONS)
+            client = clients[key] = httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(None, connect=30.0))
+        return client
+
+
+async def aclose_clients():
+    """Close the running loop's AsyncClients (call before the loop ends, e.g. at the end of asyncio.run)."""
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def get_limiter(url: str) -> AdaptiveLimiter:
+    key = endpoint_key(url)
+    with _lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveLimiter()
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, float]]:
+    with _lock:
+        items = list(_limiters.items())
+    return {key: limiter.snapshot() for key, limiter in items}
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Parse retry-after-ms / x-ms-retry-after-ms / Retry-After (seconds or HTTP date)."""
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value) / 1000.0
+            except ValueError:
+                pass
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    if retry_after is not None:
+        return min(BACKOFF_MAX, retry_after)
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+class TimedBody:
+    """Request body that notes when its last byte was handed to the socket.
+
+    requests streams file-like bodies with a known length (Content-Length from
+    __len__); the final empty read() marks the end of the upload, so request()
+    can tell upload time from service time.
+    """
+
+    def __init__(self, data: bytes):
+        self._view = memoryview(data)
+        self.size = len(data)
+        self._pos = 0
+        self.sent_at: Optional[float] = None
+
+    def __len__(self):
+        return len(self._view) - self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        if self._pos >= len(self._view):
+            if self.sent_at is None:
+                self.sent_at = time.perf_counter()
+            return b""
+        end = len(self._view) if size is None or size < 0 else self._pos + size
+        chunk = self._view[self._pos:end].tobytes()
+        self._pos += len(chunk)
+        return chunk
+
+    def rewind(self):
+        self._pos = 0
+        self.sent_at = None
+
+    async def aiter(self, chunk_size: int = 64 * 1024):
+        """Async chunk stream for httpx (content=); sets sent_at like the final read()."""
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class MultipartStream(TimedBody):
+    """multipart/form-data body generated as it is read (same wire format as urllib3's encoder).
+
+    Field data is bytes / str, or a streamed source: an object with size and open()
+    (e.g. audio_preprocess.AudioSource) read STREAM_CHUNK_BYTES at a time. Memory per
+    request is one chunk regardless of the audio size; rewind() restarts for a retry.
+    """
+
+    STREAM_CHUNK_BYTES = 1024 * 1024
+
+    def __init__(self, fields, boundary: Optional[str] = None):
+        boundary = boundary or choose_boundary()
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self._parts = []  # memoryview (in place) or streamed source
+        for name, value in fields.items():
+            field = RequestField.from_tuples(name, value)
+            data = field.data
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            head = f"--{boundary}\r\n".encode("latin-1") + field.render_headers().encode("utf-8")
+            self._parts += [memoryview(head), data if hasattr(data, "open") else memoryview(data), memoryview(b"\r\n")]
+        self._parts.append(memoryview(f"--{boundary}--\r\n".encode("latin-1")))
+        self.size = sum(part.size if hasattr(part, "open") else len(part) for part in self._parts)
+        self.streamed = any(hasattr(part, "open") for part in self._parts)
+        self.sent_at = None
+        self.rewind()
+
+    def __len__(self):
+        return self.size - self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self._pos
+        out = []
+        while size > 0 and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if hasattr(part, "open"):
+                if self._reader is None:
+                    self._reader = part.open()
+                chunk = self._reader.read(min(size, part.size - self._offset))
+                if not chunk:
+                    raise IOError("streamed field shorter than its declared size")
+            else:
+                chunk = part[self._offset:self._offset + size].tobytes()
+            out.append(chunk)
+            size -= len(chunk)
+            self._offset += len(chunk)
+            self._pos += len(chunk)
+            if self._offset >= (part.size if hasattr(part, "open") else len(part)):
+                self._next_part()
+        if not out and self.sent_at is None:
+            self.sent_at = time.perf_counter()
+        return b"".join(out)
+
+    def _next_part(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._index += 1
+        self._offset = 0
+
+    def rewind(self):
+        reader = getattr(self, "_reader", None)
+        if reader is not None:
+            reader.close()
+        self._reader = None
+        self._index = 0
+        self._offset = 0
+        self._pos = 0
+        self.sent_at = None
+
+    def close(self):
+        self.rewind()
+
+    async def aiter(self, chunk_size: int = 64 * 1024):
+        """Async chunk stream; file-backed fields are read in a worker thread."""
+        if not self.streamed:
+            async for chunk in super().aiter(chunk_size):
+                yield chunk
+            return
+        while True:
+            chunk = await asyncio.to_thread(self.read, self.STREAM_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def multipart_body(fields) -> "tuple[MultipartStream, str]":
+    """Encode {name: (filename, data, content_type)} as a streamed multipart/form-data body -> (body, Content-Type)."""
+    body = MultipartStream(fields)
+    return body, body.content_type
+
+
+class RequestCancelled(Exception):
+    """Raised when a caller's cancel_event is set before (another) attempt starts."""
+
+
+# ----- Attempt bookkeeping and retry decisions (shared by the sync and async drivers) -----
+
+def _transport_error(attempt_span, error: Exception, endpoint: str, attempt: int, max_retries: int) -> bool:
+    """Record a connection / timeout error; True when another attempt should follow."""
+    attempt_span.set(error=type(error).__name__)
+    telemetry.count("http.errors", endpoint=endpoint, kind=type(error).__name__)
+    return attempt < max_retries
+
+
+def _record_response(attempt_span, response, body, started: float):
+    attempt_span.set(status=response.status_code)
+    if isinstance(body, TimedBody) and body.sent_at is not None:
+        finished = time.perf_counter()
+        telemetry.add_span("http.upload", started, body.sent_at, bytes=body.size)
+        telemetry.add_span("http.wait", body.sent_at, finished)
+
+
+def _release(limiter: "AdaptiveLimiter", response):
+    """Slot back; only an actual response counts as completed (429 halves the limit)."""
+    limiter.release(throttled=response is not None and response.status_code == 429, completed=response is not None)
+
+
+def _response_retry_delay(response, endpoint: str, attempt: int, max_retries: int) -> Optional[float]:
+    """Backoff before retrying this response (429 / 5xx, Retry-After honored), or None to return it."""
+    telemetry.count("http.responses", endpoint=endpoint, status=response.status_code)
+    if response.status_code in RETRY_STATUSES and attempt < max_retries:
+        return backoff_delay(attempt, retry_after_seconds(response.headers))
+    return None
+
+
+def _sdk_failure(error: Exception, endpoint: str, attempt: int, max_retries: int) -> "tuple[Optional[int], Optional[float]]":
+    """SDK exception -> (HTTP status or None, backoff before retrying or None to re-raise)."""
+    status = getattr(error, "status_code", None)
+    telemetry.count("sdk.errors", endpoint=endpoint, status=status)
+    if status not in RETRY_STATUSES or attempt >= max_retries:
+        return status, None
+    return status, backoff_delay(attempt, retry_after_seconds(getattr(getattr(error, "response", None), "headers", None)))
+
+
+def request(method: str, url: str, max_retries: int = MAX_RETRIES, cancel_event: Optional[threading.Event] = None, **kwargs) -> requests.Response:
+    """Pooled, governed HTTP request with 429/5xx retries. Returns the final response.
+
+    cancel_event (optional) abandons pending retries once set (hedged callers).
+    """
+    session = get_session(url)
+    limiter = get_limiter(url)
+    endpoint = endpoint_key(url)
+    body = kwargs.get("data")
+    for attempt in range(max_retries + 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise RequestCancelled(url)
+        with telemetry.span("http.queue", endpoint=endpoint):
+            limiter.acquire()
+        response = None
+        try:  # The slot goes back whatever the attempt raises (only transport errors are retried)
+            if isinstance(body, TimedBody):
+                body.rewind()
+            with telemetry.span("http.attempt", endpoint=endpoint, attempt=attempt) as attempt_span:
+                started = time.perf_counter()
+                try:
+                    response = session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if not _transport_error(attempt_span, e, endpoint, attempt, max_retries):
+                        raise
+                else:
+                    _record_response(attempt_span, response, body, started)
+        finally:
+            _release(limiter, response)
+        if response is None:
+            with telemetry.span("http.backoff", endpoint=endpoint):
+                time.sleep(backoff_delay(attempt))
+            continue
+        delay = _response_retry_delay(response, endpoint, attempt, max_retries)
+        if delay is not None:
+            response.close()
+            with telemetry.span("http.backoff", endpoint=endpoint, status=response.status_code):
+                time.sleep(delay)
+            continue
+        return response
+    raise RuntimeError("unreachable")
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+async def arequest(method: str, url: str, max_retries: int = MAX_RETRIES, cancel_event: Optional[asyncio.Event] = None,
+                   data=None, headers: Optional[Dict[str, str]] = None, **kwargs) -> "httpx.Response":
+    """Async request(): same governor, retries and telemetry, over httpx.
+
+    data: bytes or TimedBody (streamed with an explicit Content-Length); other
+    kwargs go to httpx.AsyncClient.request. The response body is read before returning.
+    """
+    client = get_async_client(url)
+    limiter = get_limiter(url)
+    endpoint = endpoint_key(url)
+    headers = dict(headers or {})
+    if isinstance(data, TimedBody):
+        headers["Content-Length"] = str(data.size)
+    for attempt in range(max_retries + 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise RequestCancelled(url)
+        with telemetry.span("http.queue", endpoint=endpoint):
+            await limiter.acquire_async()
+        response = None
+        try:  # finally also covers CancelledError (hedged / chunked / pipeline callers cancel tasks)
+            if isinstance(data, TimedBody):
+                data.rewind()
+                content = data.aiter()
+            else:
+                content = data
+            with telemetry.span("http.attempt", endpoint=endpoint, attempt=attempt) as attempt_span:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, content=content, headers=headers, **kwargs)
+                except httpx.TransportError as e:
+                    if not _transport_error(attempt_span, e, endpoint, attempt, max_retries):
+                        raise
+                else:
+                    _record_response(attempt_span, response, data, started)
+        finally:
+            _release(limiter, response)
+        if response is None:
+            with telemetry.span("http.backoff", endpoint=endpoint):
+                await asyncio.sleep(backoff_delay(attempt))
+            continue
+        delay = _response_retry_delay(response, endpoint, attempt, max_retries)
+        if delay is not None:
+            await response.aclose()
+            with telemetry.span("http.backoff", endpoint=endpoint, status=response.status_code):
+                await asyncio.sleep(delay)
+            continue
+        return response
+    raise RuntimeError("unreachable")
+
+
+async def apost(url: str, **kwargs) -> "httpx.Response":
+    return await arequest("POST", url, **kwargs)
+
+
+def governed_call(url: str, fn: Callable, max_retries: int = MAX_RETRIES):
+    """Run an Azure SDK call under the endpoint governor with 429/5xx retries.
+
+    SDK errors (azure.core HttpResponseError) expose status_code + response headers;
+    anything else is raised unchanged.
+    """
+    limiter = get_limiter(url)
+    endpoint = endpoint_key(url)
+    for attempt in range(max_retries + 1):
+        with telemetry.span("http.queue", endpoint=endpoint):
+            limiter.acquire()
+        status, completed = None, False
+        try:
+            with telemetry.span("sdk.attempt", endpoint=endpoint, attempt=attempt):
+                result = fn()
+            completed = True
+        except Exception as e:
+            status, delay = _sdk_failure(e, endpoint, attempt, max_retries)
+            completed = status is not None  # The service answered (vs. a transport failure)
+            if delay is None:
+                raise
+        finally:
+            limiter.release(throttled=status == 429, completed=completed)
+        if status is None:
+            return result
+        with telemetry.span("http.backoff", endpoint=endpoint, status=status):
+            time.sleep(delay)
+    raise RuntimeError("unreachable")
+
+
+async def agoverned_call(url: str, fn: Callable[[], Awaitable], max_retries: int = MAX_RETRIES):
+    """governed_call() for async SDK calls: fn is a zero-argument coroutine factory."""
+    limiter = get_limiter(url)
+    endpoint = endpoint_key(url)
+    for attempt in range(max_retries + 1):
+        with telemetry.span("http.queue", endpoint=endpoint):
+            await limiter.acquire_async()
+        status, completed = None, False
+        try:  # finally also covers CancelledError
+            with telemetry.span("sdk.attempt", endpoint=endpoint, attempt=attempt):
+                result = await fn()
+            completed = True
+        except Exception as e:
+            status, delay = _sdk_failure(e, endpoint, attempt, max_retries)
+            completed = status is not None
+            if delay is None:
+                raise
+        finally:
+            limiter.release(throttled=status == 429, completed=completed)
+        if status is None:
+            return result
+        with telemetry.span("http.backoff", endpoint=endpoint, status=status):
+            await asyncio.sleep(delay)
+    raise RuntimeError("unreachable")
+
+
+def translator_client(key: str, region: str, endpoint: str):
+    """TextTranslationClient sharing the pooled session (SDK retries disabled; governed_call retries)."""
+    from azure.ai.translation.text import TextTranslationClient
+    from azure.core.credentials import AzureKeyCredential
+    from azure.core.pipeline.transport import RequestsTransport
+
+    transport = RequestsTransport(session=get_session(endpoint), session_owner=False)
+    return TextTranslationClient(credential=AzureKeyCredential(key), region=region, endpoint=endpoint, transport=transport, retry_total=0)
+
+
+def shared_translator_client(key: str, region: str, endpoint: str):
+    """Process-wide translator_client() per (endpoint, region, key); built on first use."""
+    name = f"translator:{endpoint}:{region}:{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}"
+    return resources.shared(name, lambda: translator_client(key, region, endpoint))
+
+
+def translate(client, body, to_language, from_language=None, endpoint: Optional[str] = None):
+    """Governed Translator call; endpoint defaults to the client's configured endpoint."""
+    url = endpoint or getattr(getattr(client, "_config", None), "endpoint", None) or "translator"
+    kwargs = {"body": body, "to_language": to_language}
+    if from_language:
+        kwargs["from_language"] = from_language
+    with telemetry.span("translator.translate", segments=len(body), to=to_language):
+        return governed_call(url, lambda: client.translate(**kwargs))
+
+
+def async_translator_client(key: str, region: str, endpoint: str):
+    """azure.ai.translation.text.aio client (SDK retries disabled; agoverned_call retries). Close with `await client.close()`."""
+    from azure.ai.translation.text.aio import TextTranslationClient
+    from azure.core.credentials import AzureKeyCredential
+
+    return TextTranslationClient(credential=AzureKeyCredential(key), region=region, endpoint=endpoint, retry_total=0)
+
+
+async def atranslate(client, body, to_language, from_language=None, endpoint: Optional[str] = None):
+    """Async translate() for an aio TextTranslationClient."""
+    url = endpoint or getattr(getattr(client, "_config", None), "endpoint", None) or "translator"
+    kwargs = {"body": body, "to_language": to_language}
+    if from_language:
+        kwargs["from_language"] = from_language
+    with telemetry.span("translator.translate", segments=len(body), to=to_language):
+        return await agoverned_call(url, lambda: client.translate(**kwargs))
@@ -0,0 +1,265 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import search_index
+import speech_fast_transcription
+import llm_analysis
+import telemetry
+from chunked_transcription import wav_duration_ms
+
+"""batch_process.py
+Headless batch entry point: transcribe + summarize many recordings offline.
+
+Usage:
+    python batch_process.py recordings/ "archive/2024-*/*.m4a" --out batch_out \\
+        --transcribe-workers 4 --summarize-workers 2
+
+Design:
+- Inputs: directories (recursive, audio extensions) and/or glob patterns
+- Two bounded pools: transcription (fast_transcript) and summarization (analysis_text);
+  a file moves to the summary pool as soon as its transcript is ready
+- Outputs <name>.transcript.txt / <name>.summary.txt next to manifest.jsonl in --out,
+  plus <name>.transcript.avtr (structured transcript, transcript_model.Transcript.load);
+  each file is added to the meeting search index (search_index.py) as it completes
+- manifest.jsonl gets one line per state change (append-only); on restart the last
+  record per file decides what is left: done -> skip, transcribed -> summarize only
+- Final report: files/min, audio-hours per wall-clock hour, p50 / p95 per stage;
+  --metrics writes the span histograms (upload / wait / parse / LLM ...) as JSON or .prom
+"""
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".ogg", ".flac", ".webm")
+
+
+def discover(inputs: List[str]) -> List[str]:
+    """Expand directories and globs to a sorted, de-duplicated list of audio files."""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                found.update(os.path.join(root, f) for f in files if f.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            found.update(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+    return sorted(os.path.abspath(p) for p in found)
+
+
+def fingerprint(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_size}-{int(st.st_mtime)}"
+
+
+def output_stem(out_dir: str, path: str) -> str:
+    """Unique output prefix: file stem + short hash of the full path (same names in different folders)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(out_dir, f"{stem}-{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}")
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Audio duration in seconds (WAV header, else ffprobe when available)."""
+    ms = wav_duration_ms(path)
+    if ms is not None:
+        return ms / 1000.0
+    exe = shutil.which("ffprobe")
+    if not exe:
+        return None
+    try:
+        out = subprocess.run([exe, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+                             capture_output=True, text=True, timeout=60)
+        return float(out.stdout.strip())
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+class Manifest:
+    """Append-only JSONL state log; last record per file wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line from an interrupted run
+                    self.records[record["file"]] = record
+
+    def state(self, path: str, fp: str) -> Optional[dict]:
+        record = self.records.get(path)
+        return record if record and record.get("fingerprint") == fp else None
+
+    def write(self, record: dict):
+        with self._lock:
+            self.records[record["file"]] = record
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+
+
+class BatchRunner:
+    def __init__(self, files: List[str], out_dir: str, transcribe_workers: int, summarize_workers: int,
+                 prompt: str = "", chunked: bool = False, hedged: bool = False):
+        self.files = files
+        self.out_dir = out_dir
+        self.prompt = prompt
+        self.chunked = chunked
+        self.hedged = hedged
+        self.manifest = Manifest(os.path.join(out_dir, "manifest.jsonl"))
+        self.transcribe_pool = ThreadPoolExecutor(max_workers=transcribe_workers, thread_name_prefix="transcribe")
+        self.summarize_pool = ThreadPoolExecutor(max_workers=summarize_workers, thread_name_prefix="summarize")
+        self.timings: Dict[str, List[float]] = {"transcribe": [], "summarize": []}
+        self.audio_seconds = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._futures = []
+
+    # ----- Stages -----
+    def _transcribe(self, path: str, fp: str):
+        base = output_stem(self.out_dir, path)
+        record = {"file": path, "fingerprint": fp}
+        try:
+            duration = probe_duration(path)
+            t0 = time.perf_counter()
+            # Path in: large recordings are hashed and uploaded straight from disk
+            text, language, transcript = speech_fast_transcription.fast_transcript(path, chunked=self.chunked, hedged=self.hedged, structured=True)
+            elapsed = time.perf_counter() - t0
+            if not text:
+                raise RuntimeError("transcription failed")
+            with open(base + ".transcript.txt", "w", encoding="utf-8") as f:
+                f.write(text)
+            transcript.save(base + ".transcript.avtr")
+            search_index.index_quietly(path, search_index.segments_from_transcript(transcript), "batch",
+                                       title=os.path.basename(path), language=language)
+        except Exception as e:
+            self._fail(record, "transcribe", e)
+            return
+        with self._lock:
+            self.timings["transcribe"].append(elapsed)
+        record.update(status="transcribed", transcript=base + ".transcript.txt", structured=base + ".transcript.avtr", language=language,
+                      duration_s=duration, timings={"transcribe": round(elapsed, 3)})
+        self.manifest.write(record)
+        self._submit_summary(record)
+
+    def _summarize(self, record: dict):
+        record = dict(record)
+        try:
+            with open(record["transcript"], "r", encoding="utf-8") as f:
+                text = f.read()
+            t0 = time.perf_counter()
+            summary = llm_analysis.analysis_text(self.prompt, f"Audio transcription: {text}", record.get("language") or "en-US")
+            elapsed = time.perf_counter() - t0
+            summary_path = output_stem(self.out_dir, record["file"]) + ".summary.txt"
+            with open(summary_path, "w", encoding="utf-8") as f:
+                f.write(summary or "")
+            if summary:
+                search_index.add_summary_quietly(record["file"], summary)
+        except Exception as e:
+            self._fail(record, "summarize", e)
+            return
+        with self._lock:
+            self.timings["summarize"].append(elapsed)
+            self.completed += 1
+            self.audio_seconds += record.get("duration_s") or 0.0
+        record["timings"] = dict(record.get("timings") or {}, summarize=round(elapsed, 3))
+        record.update(status="done", summary=summary_path)
+        self.manifest.write(record)
+
+    def _fail(self, record: dict, stage: str, error: Exception):
+        with self._lock:
+            self.failed += 1
+        print(f"[{stage}] {os.path.basename(record['file'])}: {error}", file=sys.stderr)
+        self.manifest.write(dict(record, status="failed", stage=stage, error=str(error)))
+
+    def _submit_summary(self, record: dict):
+        with self._lock:
+            self._futures.append(self.summarize_pool.submit(self._summarize, record))
+
+    # ----- Driver -----
+    def run(self) -> dict:
+        started = time.perf_counter()
+        for path in self.files:
+            fp = fingerprint(path)
+            state = self.manifest.state(path, fp)
+            status = state.get("status") if state else None
+            if status == "done":
+                self.skipped += 1
+            elif (status == "transcribed" or state and state.get("stage") == "summarize") and os.path.exists(state.get("transcript", "")):
+                self._submit_summary(state)  # Resume: transcript already on disk
+            else:
+                with self._lock:
+                    self._futures.append(self.transcribe_pool.submit(self._transcribe, path, fp))
+        # Summaries are submitted from transcription workers -> wait until no new futures appear
+        while True:
+            with self._lock:
+                pending = [f for f in self._futures if not f.done()]
+            if not pending:
+                break
+            wait(pending)
+        self.transcribe_pool.shutdown()
+        self.summarize_pool.shutdown()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, wall: float) -> dict:
+        stages = {}
+        for stage, values in self.timings.items():
+            stages[stage] = {"count": len(values), "p50_s": telemetry.percentile(values, 50), "p95_s": telemetry.percentile(values, 95)}
+        return {
+            "files": len(self.files),
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "wall_s": round(wall, 2),
+            "files_per_min": round(self.completed / wall * 60, 2) if wall else 0.0,
+            "audio_hours_per_hour": round(self.audio_seconds / wall, 2) if wall else 0.0,
+            "stages": stages,
+        }
+
+
+def _fmt(seconds: Optional[float]) -> str:
+    return f"{seconds:.2f}s" if seconds is not None else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch transcription + summarization with a resumable manifest.")
+    parser.add_argument("inputs", nargs="+", help="Directories and/or glob patterns")
+    parser.add_argument("--out", default="batch_output", help="Output directory (transcripts, summaries, manifest.jsonl)")
+    parser.add_argument("--transcribe-workers", type=int, default=4)
+    parser.add_argument("--summarize-workers", type=int, default=2)
+    parser.add_argument("--prompt", default="", help="Custom summary prompt (default: language-specific)")
+    parser.add_argument("--chunked", action="store_true", help="Parallel chunked transcription for long WAVs")
+    parser.add_argument("--hedged", action="store_true", help="Hedge slow primary requests with the non-diarized fallback")
+    parser.add_argument("--metrics", default="", help="Write telemetry histograms here (.prom -> Prometheus text, else JSON)")
+    args = parser.parse_args(argv)
+
+    files = discover(args.inputs)
+    if not files:
+        parser.error("no audio files found")
+    os.makedirs(args.out, exist_ok=True)
+    runner = BatchRunner(files, args.out, args.transcribe_workers, args.summarize_workers, args.prompt, args.chunked, args.hedged)
+    report = runner.run()
+
+    print(f"\nFiles: {report['completed']} done, {report['failed']} failed, {report['skipped']} skipped (of {report['files']})")
+    print(f"Wall: {report['wall_s']}s | {report['files_per_min']} files/min | {report['audio_hours_per_hour']} audio-hours/hour")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<10} n={s['count']:<4} p50={_fmt(s['p50_s'])} p95={_fmt(s['p95_s'])}")
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(telemetry.registry.to_prometheus() if args.metrics.endswith(".prom") else telemetry.registry.to_json())
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
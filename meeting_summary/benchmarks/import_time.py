@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+"""benchmarks/import_time.py
+Cold-start cost of the app shell and of each scenario's first render.
+
+Run from meeting_summary/:
+    python -m benchmarks.import_time --repeat 5 --out import_time.json
+
+Every case runs in a fresh interpreter (nothing cached in sys.modules) and reports the
+median wall time of its statement:
+- startup_lazy         what meeting_sum.py does now: scenario metadata only
+- startup_eager        the previous startup: every scenario module imported up front
+- first_render:<key>   importing one scenario module (paid when it is first opened)
+- llm_client           llm_analysis import + first get_client() (openai import, client build)
+
+--top N additionally lists the N slowest modules (python -X importtime) of the eager startup.
+Cases whose dependencies are not installed are reported as skipped.
+"""
+
+SCENARIO_MODULES = {
+    "live_mic": "scenarios.live_mic",
+    "audio_file_summary": "scenarios.audio_file_summary",
+    "image_analysis": "scenarios.image_analysis",
+    "meeting_search": "scenarios.meeting_search",
+}
+
+CASES = {
+    "startup_lazy": "import resources; resources.load_env(); import scenarios; scenarios.list_scenarios()",
+    "startup_eager": ("import resources; resources.load_env(); import scenarios, importlib\n"
+                      + "".join(f"importlib.import_module({m!r})\n" for m in SCENARIO_MODULES.values())),
+    **{f"first_render:{key}": f"import scenarios; import {module}" for key, module in SCENARIO_MODULES.items()},
+    "llm_client": "import llm_analysis; llm_analysis.get_client()",
+}
+
+_CHILD = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+sys.stderr.write("-- case --\\n")
+started = time.perf_counter()
+exec(compile({code!r}, "<case>", "exec"))
+print(json.dumps({{"seconds": time.perf_counter() - started}}))
+"""
+
+
+def child_env(cache_dir: str) -> Dict[str, str]:
+    """Placeholder credentials (clients are built, never called) and throwaway cache dirs."""
+    env = dict(os.environ)
+    env.update({
+        "GPT4o_API_KEY": "bench-key", "GPT4o_DEPLOYMENT_ENDPOINT": "https://bench.invalid/", "GPT4o_DEPLOYMENT_NAME": "gpt-4o-bench",
+        "LLM_CACHE_DIR": os.path.join(cache_dir, "llm"), "TRANSCRIPTION_CACHE_DIR": os.path.join(cache_dir, "transcriptions"),
+        "TRANSLATION_MEMORY_PATH": os.path.join(cache_dir, "tm.sqlite3"), "SEARCH_INDEX_PATH": os.path.join(cache_dir, "search.sqlite3"),
+    })
+    return env
+
+
+def run_case(code: str, root: str, env: Dict[str, str], repeat: int) -> dict:
+    samples: List[float] = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _CHILD.format(root=root, code=code)], capture_output=True, text=True, env=env)
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            return {"skipped": error}
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1])["seconds"])
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1), "runs": repeat}
+
+
+def slowest_imports(code: str, root: str, env: Dict[str, str], top: int) -> List[dict]:
+    """Top modules by cumulative import time (-X importtime, microseconds)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD.format(root=root, code=code)],
+                          capture_output=True, text=True, env=env)
+    rows = []
+    lines = proc.stderr.splitlines()
+    for line in lines[lines.index("-- case --") + 1:] if "-- case --" in lines else []:
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):  # Top-level imports only (nested ones are indented)
+            rows.append({"module": name.strip(), "cumulative_ms": round(int(cumulative) / 1000, 1)})
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold import / startup benchmark (fresh interpreter per run).")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (median reported)")
+    parser.add_argument("--cases", default="", help="Comma-separated subset of cases")
+    parser.add_argument("--top", type=int, default=0, help="List the N slowest top-level imports of the eager startup")
+    parser.add_argument("--out", default="", help="Write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cache_dir = tempfile.mkdtemp(prefix="avia-import-")
+    env = child_env(cache_dir)
+    wanted = [c for c in args.cases.split(",") if c]
+    results = {}
+    for name, code in CASES.items():
+        if wanted and name not in wanted:
+            continue
+        results[name] = row = run_case(code, root, env, args.repeat)
+        shown = f"{row['median_ms']:>9} ms (min {row['min_ms']})" if "median_ms" in row else f"skipped: {row['skipped']}"
+        print(f"{name:<32} {shown}", file=sys.stderr)
+
+    lazy, eager = results.get("startup_lazy", {}), results.get("startup_eager", {})
+    speedup = None
+    if "median_ms" in lazy and "median_ms" in eager and lazy["median_ms"]:
+        speedup = round(eager["median_ms"] / lazy["median_ms"], 1)
+        print(f"startup: {eager['median_ms']} ms -> {lazy['median_ms']} ms ({speedup}x)", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "cases": results,
+        "startup_speedup": speedup,
+    }
+    if args.top:
+        report["slowest_eager_imports"] = slowest_imports(CASES["startup_eager"], root, env, args.top)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
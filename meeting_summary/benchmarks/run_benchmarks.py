@@ -0,0 +1,238 @@
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import struct
+import sys
+import tempfile
+import time
+import wave
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+"""benchmarks/run_benchmarks.py
+Throughput / latency benchmark against local stand-in services (no Azure quota needed).
+
+Run from meeting_summary/:
+    python -m benchmarks.run_benchmarks --concurrency 1,4,16 --requests 32 --out bench.json
+
+Targets (each at every concurrency level):
+- fast_transcript         Speech stand-in (multipart upload, phrases parsing, fallbacks)
+- analysis_text           chat completions (non-streaming)
+- analysis_text_stream    chat completions over SSE (reports TTFT too)
+- analysis_image          vision request with an inline image
+- realtime_translation    realtime_stream.TranslationWorker batching segments
+
+Caches are disabled / isolated so every call reaches the stand-in. Targets whose
+dependencies are not installed are reported as skipped. The JSON report is stable
+across runs so two reports can be diffed / compared.
+"""
+
+from benchmarks.stand_ins import FailurePolicy, LatencyModel, OpenAIStandIn, SpeechStandIn, TranslatorStandIn
+from telemetry import percentile
+
+
+def synthetic_wav(seconds: float, rate: int = 16000) -> bytes:
+    """Mono 16-bit tone (non-silent so preprocessing keeps it)."""
+    out = io.BytesIO()
+    frames = int(seconds * rate)
+    tone = b"".join(struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / rate))) for i in range(rate))
+    with wave.open(out, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        for _ in range(frames // rate):
+            wf.writeframes(tone)
+    return out.getvalue()
+
+
+def tiny_png(width: int = 64, height: int = 64) -> bytes:
+    """Minimal valid RGB PNG without Pillow."""
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    rows = b"".join(b"\x00" + b"".join(bytes((x * 4 % 256, y * 4 % 256, 128)) for x in range(width)) for y in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def run_level(fn: Callable[[], Optional[float]], concurrency: int, requests: int) -> Dict:
+    """Run `requests` calls of fn on `concurrency` threads; fn may return a TTFT (seconds)."""
+    latencies, ttfts, errors = [], [], []
+
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            ttft = fn()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return
+        latencies.append(time.perf_counter() - t0)
+        if ttft is not None:
+            ttfts.append(ttft)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+
+    result = {
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+    }
+    if ttfts:
+        result["ttft_p50_ms"] = _ms(percentile(ttfts, 50))
+        result["ttft_p95_ms"] = _ms(percentile(ttfts, 95))
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def build_targets(args):
+    """Import app modules (after endpoints are configured) and wrap one call per target.
+
+    Returns (targets, skipped) where skipped maps target name -> import error.
+    """
+    targets: Dict[str, Callable[[], Optional[float]]] = {}
+    skipped: Dict[str, str] = {}
+
+    try:
+        import speech_fast_transcription
+        audio = synthetic_wav(args.audio_seconds)
+
+        def transcribe():
+            text, _ = speech_fast_transcription.fast_transcript(audio, use_cache=False)
+            if not text:
+                raise RuntimeError("transcription failed")
+        targets["fast_transcript"] = transcribe
+    except ImportError as e:
+        skipped["fast_transcript"] = str(e)
+
+    try:
+        import llm_analysis
+        transcript = "\n".join(f"{1 + i % 3}: Discussion point number {i} about the roadmap." for i in range(args.transcript_lines))
+        targets["analysis_text"] = lambda: llm_analysis.analysis_text("", transcript, "en-US") and None
+
+        def text_stream():
+            stats = llm_analysis.StreamStats()
+            for _ in llm_analysis.analysis_text_stream("", transcript, "en-US", stats=stats):
+                pass
+            return stats.ttft
+        targets["analysis_text_stream"] = text_stream
+        image = tiny_png()
+        targets["analysis_image"] = lambda: llm_analysis.analysis_image(image) and None
+    except ImportError as e:
+        for name in ("analysis_text", "analysis_text_stream", "analysis_image"):
+            skipped[name] = str(e)
+
+    try:
+        import azure_transport
+        import realtime_stream
+        client = azure_transport.translator_client("bench-key", "bench-region", os.environ["TRANSLATOR_ENDPOINT"])
+        segments = [f"Segment {i} of the live session." for i in range(args.segments)]
+
+        def realtime_translation():
+            state = realtime_stream.StreamingResult()
+            worker = realtime_stream.TranslationWorker(client, state, "en-US", "fr-FR")
+            for i, text in enumerate(segments):
+                state.final_segments.append(text)
+                worker.submit(i, text)
+            worker.close()
+            if any(not t or t.startswith("[Translation failed") for t in state.translated_segments):
+                raise RuntimeError("translation failed")
+        targets["realtime_translation"] = realtime_translation
+    except ImportError as e:
+        skipped["realtime_translation"] = str(e)
+
+    return targets, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark app service paths against local stand-in services.")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="Calls per target per level")
+    parser.add_argument("--targets", default="", help="Comma-separated subset of targets (default: all)")
+    parser.add_argument("--latency", default="lognormal:0.05:0.3", help="Service latency model, e.g. fixed:0.05")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Injected 429 probability per request")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Injected 503 probability per request")
+    parser.add_argument("--audio-seconds", type=float, default=60.0)
+    parser.add_argument("--transcript-lines", type=int, default=200)
+    parser.add_argument("--segments", type=int, default=20, help="Segments per realtime translation session")
+    parser.add_argument("--tokens", type=int, default=120, help="Completion tokens per chat response")
+    parser.add_argument("--out", default="", help="Write JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    latency = LatencyModel.parse(args.latency)
+    failures = FailurePolicy(args.rate_429, args.rate_5xx)
+    speech = SpeechStandIn(latency, failures).start()
+    translator = TranslatorStandIn(latency, failures).start()
+    openai_server = OpenAIStandIn(latency, failures, tokens=args.tokens).start()
+
+    # Point the app at the stand-ins before its modules are imported; isolate caches
+    cache_dir = tempfile.mkdtemp(prefix="avia-bench-")
+    os.environ.update({
+        "SPEECH_KEY": "bench-key", "SPEECH_REGION": "bench", "SPEECH_ENDPOINT": speech.endpoint,
+        "TRANSLATOR_KEY": "bench-key", "TRANSLATOR_ENDPOINT": translator.endpoint,
+        "GPT4o_API_KEY": "bench-key", "GPT4o_DEPLOYMENT_ENDPOINT": openai_server.endpoint, "GPT4o_DEPLOYMENT_NAME": "gpt-4o-bench",
+        "LLM_CACHE": "0", "TRANSLATION_MEMORY": "0", "TRANSCRIPTION_CACHE_DIR": os.path.join(cache_dir, "transcriptions"),
+    })
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    targets, skipped = build_targets(args)
+    import telemetry
+    wanted = [t for t in args.targets.split(",") if t]
+    if wanted:
+        targets = {k: v for k, v in targets.items() if k in wanted}
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+
+    results = []
+    for name, fn in targets.items():
+        for level in levels:
+            row = dict(target=name, **run_level(fn, level, args.requests))
+            results.append(row)
+            print(f"{name:<22} c={level:<3} {row['throughput_rps']:>8} req/s  p50={row['p50_ms']}ms p95={row['p95_ms']}ms errors={row['errors']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_model": args.latency,
+            "rate_429": args.rate_429,
+            "rate_5xx": args.rate_5xx,
+            "requests_per_level": args.requests,
+            "audio_seconds": args.audio_seconds,
+            "server_requests": {"speech": speech.requests, "translator": translator.requests, "openai": openai_server.requests},
+        },
+        "skipped": skipped,
+        "results": results,
+        # Per-stage breakdown (http.upload / http.wait / speech.parse / llm.*) across all runs
+        "spans": {h["name"]: {"count": h["count"], "p50_ms": _ms(h["p50"]), "p95_ms": _ms(h["p95"])}
+                  for h in telemetry.registry.snapshot()["histograms"] if not h["labels"]},
+    }
+    for server in (speech, translator, openai_server):
+        server.stop()
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
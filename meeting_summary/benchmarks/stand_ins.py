@@ -0,0 +1,259 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+"""benchmarks/stand_ins.py
+Local stand-in HTTP servers for Azure Speech Fast Transcription, Translator and
+Azure OpenAI chat completions, so performance can be measured without quota.
+
+Each server:
+- listens on 127.0.0.1:<ephemeral port> in a daemon thread (start() / stop())
+- samples response latency from a LatencyModel (fixed / uniform / lognormal)
+- injects 429 (with Retry-After) and 5xx failures at configurable rates
+
+Payloads mimic the real services closely enough for the app's parsers:
+- POST .../transcriptions:transcribe -> {"phrases": [...]} with speakers, locales, words
+- POST .../translate?to=xx            -> [{"translations": [{"text", "to"}]}]
+- POST /openai/deployments/<name>/chat/completions -> completion or SSE stream
+"""
+
+
+class LatencyModel:
+    """Latency distribution in seconds. kind: fixed | uniform | lognormal."""
+
+    def __init__(self, kind: str = "fixed", mean: float = 0.05, spread: float = 0.0):
+        self.kind = kind
+        self.mean = mean
+        self.spread = spread
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """'fixed:0.05', 'uniform:0.05:0.02' (mean, +/-), 'lognormal:0.05:0.5' (median, sigma)."""
+        parts = spec.split(":")
+        return cls(parts[0], float(parts[1]) if len(parts) > 1 else 0.05, float(parts[2]) if len(parts) > 2 else 0.0)
+
+    def sample(self) -> float:
+        if self.kind == "uniform":
+            return max(0.0, random.uniform(self.mean - self.spread, self.mean + self.spread))
+        if self.kind == "lognormal":
+            return random.lognormvariate(0.0, self.spread) * self.mean if self.spread else self.mean
+        return self.mean
+
+
+class FailurePolicy:
+    """Random failure injection: rate_429 / rate_5xx are probabilities per request."""
+
+    def __init__(self, rate_429: float = 0.0, rate_5xx: float = 0.0, retry_after: float = 0.1):
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+
+    def pick(self) -> Optional[int]:
+        roll = random.random()
+        if roll < self.rate_429:
+            return 429
+        if roll < self.rate_429 + self.rate_5xx:
+            return 503
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        stand_in: StandIn = self.server.stand_in
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else self._read_chunked()
+        stand_in.count(self.path)
+        failure = stand_in.failures.pick()
+        time.sleep(stand_in.latency.sample())
+        if failure:
+            headers = {"Retry-After": f"{stand_in.failures.retry_after:g}"} if failure == 429 else {}
+            self._send_json(failure, {"error": {"code": str(failure), "message": "injected failure"}}, headers)
+            return
+        stand_in.handle(self, body)
+
+    def _read_chunked(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            return b""
+        out = bytearray()
+        while True:
+            size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+            if not size:
+                self.rfile.readline()
+                return bytes(out)
+            out += self.rfile.read(size)
+            self.rfile.readline()
+
+    def _send_json(self, status: int, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StandIn:
+    """Base stand-in server; subclasses implement handle(handler, body)."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, failures: Optional[FailurePolicy] = None):
+        self.latency = latency or LatencyModel()
+        self.failures = failures or FailurePolicy()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path: str):
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "StandIn":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def handle(self, handler: _Handler, body: bytes):
+        raise NotImplementedError
+
+
+# ===== Speech Fast Transcription =====
+
+SAMPLE_SENTENCES = [
+    "Let's start with the status update from last week.",
+    "The migration finished on Tuesday and error rates are down.",
+    "We still need a decision on the release date.",
+    "I can take the action item for the customer follow-up.",
+    "Any blockers before we move on to the roadmap?",
+]
+
+
+class SpeechStandIn(StandIn):
+    """Fast Transcription stand-in: phrase count scales with the uploaded audio size."""
+
+    def __init__(self, latency=None, failures=None, locale: str = "en-US", speakers: int = 3, bytes_per_phrase: int = 32000 * 5):
+        super().__init__(latency, failures)
+        self.locale = locale
+        self.speakers = speakers
+        self.bytes_per_phrase = bytes_per_phrase  # ~5 s of 16 kHz mono PCM per phrase
+
+    def handle(self, handler, body):
+        if "transcriptions:transcribe" not in handler.path:
+            handler._send_json(404, {"error": "not found"})
+            return
+        definition = {}
+        match = re.search(rb'name="definition"\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', body, re.S)
+        if match:
+            try:
+                definition = json.loads(match.group(1))
+            except ValueError:
+                pass
+        diarize = (definition.get("diarizationSettings") or {}).get("enabled", False)
+        phrases, offset = [], 0
+        for i in range(max(1, len(body) // self.bytes_per_phrase)):
+            text = SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]
+            words, w_offset = [], offset
+            for word in text.split():
+                words.append({"text": word, "offsetMilliseconds": w_offset, "durationMilliseconds": 300})
+                w_offset += 350
+            phrase = {"offsetMilliseconds": offset, "durationMilliseconds": w_offset - offset, "text": text,
+                      "words": words, "locale": self.locale, "confidence": 0.92}
+            if diarize:
+                phrase["speaker"] = 1 + i % self.speakers
+            phrases.append(phrase)
+            offset = w_offset + 500
+        handler._send_json(200, {
+            "durationMilliseconds": offset,
+            "combinedPhrases": [{"text": " ".join(p["text"] for p in phrases)}],
+            "phrases": phrases,
+        })
+
+
+# ===== Translator =====
+
+class TranslatorStandIn(StandIn):
+    """Translator v3 stand-in: echoes each element prefixed with the target language."""
+
+    def handle(self, handler, body):
+        parts = urlsplit(handler.path)
+        if not parts.path.endswith("/translate"):
+            handler._send_json(404, {"error": "not found"})
+            return
+        targets = parse_qs(parts.query).get("to", ["xx"])
+        items = json.loads(body or b"[]")
+        handler._send_json(200, [
+            {"detectedLanguage": {"language": "en", "score": 1.0},
+             "translations": [{"text": f"[{to}] {item.get('text', '')}", "to": to} for to in targets]}
+            for item in items
+        ])
+
+
+# ===== Azure OpenAI chat completions =====
+
+class OpenAIStandIn(StandIn):
+    """Chat completions stand-in; stream=true answers as SSE with per-token latency."""
+
+    def __init__(self, latency=None, failures=None, tokens: int = 120, token_latency: float = 0.005):
+        super().__init__(latency, failures)
+        self.tokens = tokens
+        self.token_latency = token_latency
+
+    def handle(self, handler, body):
+        match = re.match(r"/openai/deployments/([^/]+)/chat/completions", handler.path)
+        if not match:
+            handler._send_json(404, {"error": "not found"})
+            return
+        request = json.loads(body or b"{}")
+        model = match.group(1)
+        tokens = [f"token{i} " for i in range(self.tokens)]
+        base = {"id": "chatcmpl-standin", "created": int(time.time()), "model": model}
+        if not request.get("stream"):
+            time.sleep(self.token_latency * self.tokens)
+            handler._send_json(200, dict(base, object="chat.completion", choices=[
+                {"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                usage={"prompt_tokens": len(body) // 4, "completion_tokens": self.tokens, "total_tokens": len(body) // 4 + self.tokens}))
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def event(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            handler.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            handler.wfile.flush()
+
+        chunk = dict(base, object="chat.completion.chunk")
+        event(json.dumps(dict(chunk, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])))
+        for token in tokens:
+            time.sleep(self.token_latency)
+            event(json.dumps(dict(chunk, choices=[{"index": 0, "delta": {"content": token}, "finish_reason": None}])))
+        event(json.dumps(dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])))
+        event("[DONE]")
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
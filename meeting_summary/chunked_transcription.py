@@ -0,0 +1,200 @@
+import os
+import wave
+from functools import partial
+from io import BytesIO
+from typing import Dict, List, Optional
+
+"""chunked_transcription.py
+Pure helpers for long-recording transcription in overlapping windows.
+
+Design:
+- split_wav cuts a PCM WAV into fixed windows with a small overlap (header preserved per chunk);
+  for a streamed source (audio_preprocess.AudioSource) windows are read from disk on use
+- Each chunk is transcribed independently (caller owns HTTP / retries / concurrency)
+- stitch_phrases shifts chunk-relative offsets to absolute time, removes the
+  duplicated overlap using word-level timestamps, and maps per-chunk diarization
+  labels onto a consistent global speaker numbering (votes from the overlap region)
+
+No network or UI code here; see speech_fast_transcription.transcribe_chunked.
+"""
+
+CJK_JOIN_LOCALES = ("zh", "ja")  # Languages whose words are joined without spaces
+
+
+class AudioChunk:
+    """One window of the source recording (standalone WAV bytes + absolute span)."""
+    __slots__ = ("index", "start_ms", "end_ms", "_data", "_load")
+
+    def __init__(self, index: int, start_ms: int, end_ms: int, data: Optional[bytes] = None, load=None):
+        self.index = index
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self._data = data
+        self._load = load
+
+    @property
+    def data(self) -> bytes:
+        """Window WAV bytes; lazy windows are re-read on each access (nothing retained)."""
+        return self._data if self._data is not None else self._load()
+
+
+def wav_duration_ms(wav_bytes) -> Optional[int]:
+    """Duration of a PCM WAV payload (bytes or file path), or None if it is not a readable WAV."""
+    try:
+        with wave.open(os.fspath(wav_bytes) if isinstance(wav_bytes, (str, os.PathLike)) else BytesIO(wav_bytes), "rb") as wf:
+            rate = wf.getframerate()
+            return int(wf.getnframes() * 1000 / rate) if rate else None
+    except (wave.Error, EOFError):
+        return None
+
+
+def _window(wf, start: int, frames: int) -> bytes:
+    """frames starting at start from an open wave reader, as a standalone WAV."""
+    wf.setpos(start)
+    out = BytesIO()
+    with wave.open(out, "wb") as cw:
+        cw.setnchannels(wf.getnchannels())
+        cw.setsampwidth(wf.getsampwidth())
+        cw.setframerate(wf.getframerate())
+        cw.writeframes(wf.readframes(frames))
+    return out.getvalue()
+
+
+def _read_window(source, start: int, frames: int) -> bytes:
+    with source.open() as f, wave.open(f, "rb") as wf:
+        return _window(wf, start, frames)
+
+
+def split_wav(wav_bytes, chunk_seconds: float, overlap_seconds: float) -> Optional[List[AudioChunk]]:
+    """Split WAV bytes (or a streamed source with open()) into overlapping chunks; None if not PCM WAV."""
+    streamed = hasattr(wav_bytes, "open")
+    try:
+        handle = wav_bytes.open() if streamed else BytesIO(wav_bytes)
+        wf = wave.open(handle, "rb")
+    except (wave.Error, EOFError):
+        if streamed:
+            handle.close()
+        return None
+    with handle, wf:
+        rate = wf.getframerate()
+        nframes = wf.getnframes()
+        if not rate or not nframes:
+            return None
+        chunk_frames = max(1, int(chunk_seconds * rate))
+        step = max(1, chunk_frames - int(overlap_seconds * rate))
+        chunks: List[AudioChunk] = []
+        start = 0
+        while start < nframes:
+            end = min(nframes, start + chunk_frames)
+            if streamed:
+                chunk = AudioChunk(len(chunks), start * 1000 // rate, end * 1000 // rate, load=partial(_read_window, wav_bytes, start, chunk_frames))
+            else:
+                chunk = AudioChunk(len(chunks), start * 1000 // rate, end * 1000 // rate, _window(wf, start, chunk_frames))
+            chunks.append(chunk)
+            if end >= nframes:
+                break
+            start += step
+    return chunks
+
+
+# ===== Stitching =====
+
+def _span(item: Dict):
+    start = int(item.get("offsetMilliseconds", 0))
+    return start, start + int(item.get("durationMilliseconds", 0))
+
+
+def _shift(phrase: Dict, offset_ms: int) -> Dict:
+    """Copy of phrase (and its words) moved to absolute time."""
+    shifted = dict(phrase)
+    shifted["offsetMilliseconds"] = int(phrase.get("offsetMilliseconds", 0)) + offset_ms
+    if phrase.get("words"):
+        shifted["words"] = [dict(w, offsetMilliseconds=int(w.get("offsetMilliseconds", 0)) + offset_ms) for w in phrase["words"]]
+    return shifted
+
+
+def _map_speakers(prev: List[Dict], cur: List[Dict], window, next_id: int):
+    """Map local speaker labels of `cur` onto global labels used in `prev`.
+
+    Votes are the overlapping duration (inside `window`) between a prev phrase
+    and a cur phrase. Greedy assignment by vote weight; unmatched locals get fresh ids.
+    Returns (mapping, next_id).
+    """
+    lo, hi = window
+    votes: Dict[tuple, int] = {}
+    for q in cur:
+        qs, qe = _span(q)
+        qs, qe = max(qs, lo), min(qe, hi)
+        if q.get("speaker") is None or qe <= qs:
+            continue
+        for p in prev:
+            ps, pe = _span(p)
+            inter = min(pe, qe) - max(ps, qs)
+            if inter > 0 and p.get("speaker") is not None:
+                pair = (q["speaker"], p["speaker"])
+                votes[pair] = votes.get(pair, 0) + inter
+    mapping: Dict[object, object] = {}
+    used = set()
+    for (local, glob), _ in sorted(votes.items(), key=lambda kv: -kv[1]):
+        if local not in mapping and glob not in used:
+            mapping[local] = glob
+            used.add(glob)
+    for q in cur:
+        local = q.get("speaker")
+        if local is not None and local not in mapping:
+            mapping[local] = next_id
+            next_id += 1
+    return mapping, next_id
+
+
+def _joiner(phrase: Dict) -> str:
+    return "" if str(phrase.get("locale", ""))[:2] in CJK_JOIN_LOCALES else " "
+
+
+def stitch_phrases(chunks: List[AudioChunk], chunk_phrases: List[List[Dict]]) -> List[Dict]:
+    """Merge per-chunk phrase lists into one absolute, de-duplicated phrase list."""
+    stitched: List[Dict] = []
+    prev_abs: List[Dict] = []
+    next_speaker = 1
+    last_end = 0  # Absolute end of the last emitted word / phrase
+    for i, (chunk, phrases) in enumerate(zip(chunks, chunk_phrases)):
+        absolute = [_shift(p, chunk.start_ms) for p in phrases]
+        absolute.sort(key=lambda p: p["offsetMilliseconds"])
+
+        # Consistent speaker labels
+        if i == 0:
+            mapping, next_speaker = _map_speakers([], absolute, (0, 0), next_speaker)
+        else:
+            window = (chunk.start_ms, chunks[i - 1].end_ms)
+            mapping, next_speaker = _map_speakers(prev_abs, absolute, window, next_speaker)
+        for p in absolute:
+            if p.get("speaker") is not None:
+                p["speaker"] = mapping[p["speaker"]]
+        prev_abs = absolute
+
+        # Ownership: phrases starting before the midpoint of the next overlap belong here
+        if i + 1 < len(chunks):
+            cut = (chunks[i + 1].start_ms + chunk.end_ms) // 2
+        else:
+            cut = None
+        for p in absolute:
+            start, end = _span(p)
+            if cut is not None and start >= cut:
+                continue
+            words = p.get("words")
+            if words:
+                kept = [w for w in words if sum(_span(w)) / 2 > last_end]
+                if not kept:
+                    continue
+                if len(kept) != len(words):
+                    p["words"] = kept
+                    p["text"] = _joiner(p).join(w.get("text", "") for w in kept)
+                    p["offsetMilliseconds"] = _span(kept[0])[0]
+                    p["durationMilliseconds"] = end - p["offsetMilliseconds"]
+                last_end = max(last_end, _span(kept[-1])[1])
+            else:
+                if start < last_end:
+                    continue
+                last_end = max(last_end, end)
+            stitched.append(p)
+    return stitched
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+"""disk_cache.py
+Small persistent key/value cache for expensive service results.
+
+Design:
+- One JSON file per entry under a two-level fan-out directory (<dir>/ab/abcd....json)
+- File mtime doubles as the "last used" stamp (touched on every hit) -> LRU order
+- Size budget (max_bytes) and idle age (max_age seconds) enforced on write
+- Atomic writes (tmp file + os.replace) so concurrent workers never read torn entries
+- Hit / miss / store / eviction counters for diagnostics
+- TieredCache: small in-memory LRU in front of a DiskCache for hot keys
+
+Values must be JSON serializable. Keys are opaque hex strings (see make_key).
+"""
+
+SWEEP_INTERVAL = 60.0  # Min seconds between full directory scans for expired entries
+
+
+def make_key(*parts) -> str:
+    """Stable sha256 hex digest over bytes / str / JSON-serializable parts.
+
+    Parts with iter_chunks() (streamed audio sources) are hashed chunk by chunk and
+    give the same key as their content passed as bytes.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(part)
+        elif hasattr(part, "iter_chunks"):
+            for chunk in part.iter_chunks():
+                h.update(chunk)
+        elif isinstance(part, str):
+            h.update(part.encode("utf-8"))
+        else:
+            h.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        h.update(b"\x00")  # separator so ("ab","c") != ("a","bc")
+    return h.hexdigest()
+
+
+class DiskCache:
+    """Directory-backed JSON cache with size and age based LRU eviction."""
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, max_age: Optional[float] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age          # Seconds since last use; None = never expire
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None  # Lazily computed on first write
+        self._last_sweep = 0.0
+
+    # ----- Paths -----
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every entry on disk."""
+        if not os.path.isdir(self.directory):
+            return
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.path, st.st_size, st.st_mtime
+
+    # ----- Public API -----
+    def get(self, key: str) -> Optional[object]:
+        path = self._path(key)
+        try:
+            mtime = os.path.getmtime(path)
+            if self.max_age is not None and time.time() - mtime > self.max_age:
+                self._remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path, None)  # Refresh LRU position
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: object):
+        path = self._path(key)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self.stores += 1
+            if self._total_bytes is not None:
+                self._total_bytes += len(data) - old_size
+        self._evict()
+
+    def clear(self):
+        for path, _, _ in list(self._entries()):
+            self._remove(path)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "bytes": self._total_bytes or 0,
+            }
+
+    # ----- Eviction -----
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self.evictions += 1
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _evict(self):
+        now = time.time()
+        with self._lock:
+            total = self._total_bytes
+        over_size = total is None or total > self.max_bytes
+        sweep_due = self.max_age is not None and now - self._last_sweep > SWEEP_INTERVAL
+        if not (over_size or sweep_due):
+            return
+        self._last_sweep = now
+        entries = sorted(self._entries(), key=lambda e: e[2])  # Oldest use first
+        total = sum(size for _, size, _ in entries)
+        with self._lock:
+            self._total_bytes = total
+        for path, size, mtime in entries:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            if not expired and total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+
+class TieredCache:
+    """In-memory LRU tier (max_items) in front of a DiskCache; same get / put / stats API."""
+
+    def __init__(self, disk: DiskCache, max_items: int = 256):
+        self.disk = disk
+        self.max_items = max_items
+        self.memory_hits = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[object]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                value, stored_at = item
+                if self.disk.max_age is None or time.time() - stored_at <= self.disk.max_age:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+        value = self.disk.get(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: object):
+        self._remember(key, value)
+        self.disk.put(key, value)
+
+    def _remember(self, key: str, value: object):
+        with self._lock:
+            self._memory[key] = (value, time.time())
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self.disk.clear()
+
+    def stats(self) -> Dict[str, float]:
+        disk = self.disk.stats()
+        with self._lock:
+            memory_hits = self.memory_hits
+            memory_items = len(self._memory)
+        hits = memory_hits + disk["hits"]
+        lookups = hits + disk["misses"]
+        return dict(disk, memory_hits=memory_hits, memory_items=memory_items, hits=hits,
+                    hit_rate=(hits / lookups) if lookups else 0.0)
@@ -0,0 +1,134 @@
+import base64
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import List, Optional
+
+try:  # Pillow is optional: without it images are sent as-is (with the correct MIME type)
+    from PIL import Image, ImageOps
+except Exception:
+    Image = None
+
+"""image_preprocess.py
+Prepare uploaded images for GPT-4o vision requests.
+
+Pipeline:
+1. Detect the real format from magic bytes (png / jpeg / gif / webp / bmp) and apply
+   the EXIF orientation (re-encoding drops the tag, so pixels are rotated instead)
+2. Downscale to what the model actually uses for the chosen detail level:
+   - "high": fit within MAX_EDGE (2048) and shortest side <= HIGH_DETAIL_SHORT_SIDE (768) (512px tiles)
+   - "low":  fit within LOW_DETAIL_EDGE (512) - one tile, fixed token cost
+3. Re-encode to JPEG / WEBP when that is smaller than the (resized) original
+4. Base64 data URL with the correct MIME type
+
+Several images are prepared concurrently (encode_images).
+"""
+
+MAX_EDGE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+LOW_DETAIL_EDGE = 512
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+MAX_WORKERS = 4
+
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "gif": "image/gif", "webp": "image/webp", "bmp": "image/bmp"}
+
+
+class PreparedImage:
+    """Upload-ready image bytes + what preprocessing did to them."""
+    def __init__(self, data: bytes, fmt: str, original_bytes: int, size=None, original_size=None, detail: str = "high", elapsed: float = 0.0):
+        self.data = data
+        self.format = fmt
+        self.mime = MIME_TYPES.get(fmt, "image/png")
+        self.original_bytes = original_bytes
+        self.size = size                    # (width, height) sent
+        self.original_size = original_size  # (width, height) uploaded
+        self.detail = detail
+        self.elapsed = elapsed
+
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+    def summary(self) -> str:
+        dims = f"{self.original_size} -> {self.size}, " if self.size and self.size != self.original_size else ""
+        return f"Image: {dims}{self.format}, {self.original_bytes} -> {len(self.data)} bytes, detail={self.detail}, {self.elapsed * 1000:.0f} ms"
+
+
+def sniff_image_format(data) -> Optional[str]:
+    head = bytes(data[:12])
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[:2] == b"BM":
+        return "bmp"
+    return None
+
+
+def target_size(width: int, height: int, detail: str = "high", max_edge: int = MAX_EDGE):
+    """Largest size the model will actually look at for this detail level (never upscales)."""
+    if detail == "low":
+        scale = min(1.0, LOW_DETAIL_EDGE / max(width, height))
+    else:  # "high" / "auto"
+        scale = min(1.0, max_edge / max(width, height), HIGH_DETAIL_SHORT_SIDE / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _encode(img, fmt: str) -> bytes:
+    out = BytesIO()
+    if fmt == "jpeg":
+        img.convert("RGB").save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    elif fmt == "webp":
+        img.save(out, format="WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        img.save(out, format=fmt.upper(), optimize=True)
+    return out.getvalue()
+
+
+def prepare_image(data, detail: str = "high", max_edge: int = MAX_EDGE) -> PreparedImage:
+    """Detect, downscale and re-encode one image (see module docstring)."""
+    t0 = time.perf_counter()
+    data = bytes(data) if not isinstance(data, bytes) else data
+    fmt = sniff_image_format(data) or "png"
+    prepared = PreparedImage(data, fmt, len(data), detail=detail)
+    if Image is not None:
+        try:
+            img = Image.open(BytesIO(data))
+            img.load()
+            if getattr(img, "is_animated", False):
+                raise ValueError("animated image kept as-is")
+            oriented = img.getexif().get(0x0112, 1) not in (0, 1)  # EXIF Orientation tag
+            if oriented:
+                img = ImageOps.exif_transpose(img)  # Phone photos: rotate pixels, the tag is lost on re-encode
+            prepared.original_size = prepared.size = img.size
+            size = target_size(img.width, img.height, detail, max_edge)
+            resized = size != img.size
+            if resized:
+                img = img.resize(size, Image.LANCZOS)
+            reencode = resized or oriented
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            candidates = [] if reencode or fmt not in MIME_TYPES or fmt == "bmp" else [(data, fmt)]
+            if reencode and fmt in ("png", "jpeg", "webp"):
+                candidates.append((_encode(img, fmt), fmt))
+            if not has_alpha and fmt != "jpeg":
+                candidates.append((_encode(img, "jpeg"), "jpeg"))
+            candidates.append((_encode(img, "webp"), "webp"))
+            best_data, best_fmt = min(candidates, key=lambda c: len(c[0]))
+            prepared = PreparedImage(best_data, best_fmt, len(data), size=img.size, original_size=prepared.original_size, detail=detail)
+        except Exception:
+            pass  # Undecodable / animated -> original bytes with sniffed MIME type
+    prepared.elapsed = time.perf_counter() - t0
+    return prepared
+
+
+def encode_images(images: List, detail: str = "high", max_edge: int = MAX_EDGE, max_workers: int = MAX_WORKERS) -> List[PreparedImage]:
+    """Prepare several images concurrently (order preserved). Accepts bytes or upload objects."""
+    payloads = [img if isinstance(img, (bytes, bytearray, memoryview)) else img.getvalue() for img in images]
+    if len(payloads) == 1:
+        return [prepare_image(payloads[0], detail, max_edge)]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(payloads))) as pool:
+        return list(pool.map(lambda d: prepare_image(d, detail, max_edge), payloads))
@@ -0,0 +1,346 @@
+import html
+import threading
+from collections import deque
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import azure.cognitiveservices.speech as speechsdk
+    RECOGNIZING = speechsdk.ResultReason.RecognizingSpeech
+    RECOGNIZED = speechsdk.ResultReason.RecognizedSpeech
+except ImportError:  # FakeRecognizer works without the Speech SDK
+    speechsdk = None
+    RECOGNIZING, RECOGNIZED = "RecognizingSpeech", "RecognizedSpeech"
+
+"""live_captions.py
+Push-style caption state for live recognition, independent of Streamlit.
+
+- CaptionFeed: recognizer callbacks write partial / final text into it (any thread);
+  the UI polls snapshot() from a fragment and renders only a bounded tail, so the
+  per-refresh cost stays flat however long the meeting runs. Finals are HTML-escaped
+  once on arrival; version increments on every change (cheap "anything new?" check).
+- TranscriptBuffer: append-only transcript keeping only the newest MEMORY_SEGMENTS
+  (raw + escaped) in memory; older segments are paged back in from the session
+  journal on demand, so multi-hour sessions use bounded memory and each append
+  costs O(new text)
+- attach(recognizer, feed): wires recognizing / recognized / session_stopped / canceled.
+- FakeRecognizer: scripted stand-in for speechsdk.SpeechRecognizer (same signal names
+  and start/stop methods) for tests, demos and load checks without a microphone.
+"""
+
+CAPTION_TAIL_SEGMENTS = 12  # Finals shown in the caption box
+MEMORY_SEGMENTS = 500       # Finals kept in memory; older ones live only in the journal
+
+Pager = Callable[[int, int], List[str]]  # (start, count) -> texts, e.g. SessionJournal.read_segments
+
+
+class TranscriptBuffer:
+    """Bounded in-memory window over an append-only transcript (not thread-safe; CaptionFeed locks).
+
+    Segment indices are global (0 = first segment of the session). Segments older than
+    first_index are evicted from memory and served by pager when one is set.
+    """
+
+    def __init__(self, max_segments: int = MEMORY_SEGMENTS, pager: Optional[Pager] = None):
+        self.max_segments = max_segments
+        self.pager = pager
+        self.total = 0
+        self._texts: deque = deque(maxlen=max_segments)
+        self._html: deque = deque(maxlen=max_segments)
+
+    def __len__(self) -> int:
+        return self.total
+
+    @property
+    def first_index(self) -> int:
+        """Global index of the oldest segment still in memory."""
+        return self.total - len(self._texts)
+
+    def append(self, text: str):
+        self._texts.append(text)
+        self._html.append(html.escape(text))
+        self.total += 1
+
+    def reset(self, texts: Sequence[str] = (), total: Optional[int] = None):
+        """Replace the contents; texts are the newest segments of a transcript of length total."""
+        self._texts.clear()
+        self._html.clear()
+        for text in texts[-self.max_segments:] if self.max_segments else ():
+            self._texts.append(text)
+            self._html.append(html.escape(text))
+        self.total = len(texts) if total is None else total
+
+    def tail_html(self, n: int) -> List[str]:
+        if n <= 0:
+            return []
+        held = len(self._html)
+        return [self._html[i] for i in range(max(0, held - n), held)]
+
+    def get(self, start: int, count: int) -> List[str]:
+        """Texts of segments [start, start + count); evicted ones come from the pager (skipped without one)."""
+        start = max(0, start)
+        end = min(self.total, start + max(0, count))
+        if start >= end:
+            return []
+        first = self.first_index
+        out: List[str] = []
+        if start < first and self.pager is not None:
+            out.extend(self.pager(start, min(end, first) - start))
+        out.extend(self._texts[i - first] for i in range(max(start, first), end))
+        return out
+
+    def text(self) -> str:
+        """Full transcript text (pages evicted segments back in when a pager is set)."""
+        return " ".join(self.get(0, self.total)).strip()
+
+
+class CaptionSnapshot:
+    """Immutable view handed to the UI."""
+    __slots__ = ("version", "running", "finals_html", "partial", "total_segments", "error")
+
+    def __init__(self, version: int, running: bool, finals_html: List[str], partial: str, total_segments: int, error: Optional[str]):
+        self.version = version
+        self.running = running
+        self.finals_html = finals_html
+        self.partial = partial
+        self.total_segments = total_segments
+        self.error = error
+
+
+class CaptionFeed:
+    """Thread-safe caption state: written by recognizer callbacks, read by the UI."""
+
+    def __init__(self, tail_segments: int = CAPTION_TAIL_SEGMENTS, max_segments: int = MEMORY_SEGMENTS):
+        self.tail_segments = tail_segments
+        self.partial = ""
+        self.version = 0
+        self.running = False
+        self.error: Optional[str] = None
+        self._buffer = TranscriptBuffer(max_segments)
+        self._cond = threading.Condition()
+
+    @property
+    def total_segments(self) -> int:
+        return self._buffer.total
+
+    @property
+    def pager(self) -> Optional[Pager]:
+        return self._buffer.pager
+
+    @pager.setter
+    def pager(self, pager: Optional[Pager]):
+        with self._cond:
+            self._buffer.pager = pager
+
+    def _changed(self):
+        self.version += 1
+        self._cond.notify_all()
+
+    # ----- Writers (SDK / recognizer threads) -----
+    def start(self):
+        with self._cond:
+            self.running = True
+            self.error = None
+            self._changed()
+
+    def on_partial(self, text: str):
+        with self._cond:
+            if text != self.partial:
+                self.partial = text
+                self._changed()
+
+    def on_final(self, text: str):
+        if not text:
+            return
+        with self._cond:
+            self._buffer.append(text)
+            self.partial = ""
+            self._changed()
+
+    def on_stopped(self, error: Optional[str] = None):
+        with self._cond:
+            if self.running or error:
+                self.running = False
+                self.partial = ""
+                self.error = error or self.error
+                self._changed()
+
+    def restore(self, segments: Sequence[str], pager: Optional[Pager] = None):
+        """Replace the finals with previously journaled segments (tab reload / recovery).
+
+        Only the newest max_segments stay in memory; pager serves the rest.
+        """
+        with self._cond:
+            self._buffer.reset(segments)
+            self._buffer.pager = pager
+            self.partial = ""
+            self._changed()
+
+    def clear(self):
+        with self._cond:
+            self._buffer.reset()
+            self._buffer.pager = None
+            self.partial = ""
+            self.error = None
+            self._changed()
+
+    # ----- Readers (UI) -----
+    def wait(self, version: int, timeout: Optional[float] = None) -> int:
+        """Block until version differs from the given one (or timeout); returns the current version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def snapshot(self, tail: Optional[int] = None) -> CaptionSnapshot:
+        """Bounded tail of finals (tail or tail_segments), running or not; older text via page()."""
+        tail = self.tail_segments if tail is None else tail
+        with self._cond:
+            finals = self._buffer.tail_html(tail)
+            return CaptionSnapshot(self.version, self.running, finals, self.partial, self._buffer.total, self.error)
+
+    def page(self, start: int, count: int) -> List[str]:
+        """Raw texts of segments [start, start + count), paged from the journal when evicted."""
+        with self._cond:
+            return self._buffer.get(start, count)
+
+    def text(self) -> str:
+        with self._cond:
+            return self._buffer.text()
+
+
+def render_caption_html(snap: CaptionSnapshot, empty_running: str = "Capturing…", empty_stopped: str = "No transcript yet.") -> str:
+    """Caption box body for a snapshot (partial highlighted; earlier segments elided)."""
+    parts = []
+    if snap.total_segments > len(snap.finals_html):
+        parts.append(f"<span class='live-empty'>… {snap.total_segments - len(snap.finals_html)} earlier segments</span>")
+    parts.extend(snap.finals_html)
+    if snap.partial:
+        parts.append(f"<span class='live-partial'>{html.escape(snap.partial)}</span>")
+    if not parts:
+        return f"<span class='live-empty'>{empty_running if snap.running else empty_stopped}</span>"
+    return " ".join(parts)
+
+
+def attach(recognizer, feed: CaptionFeed):
+    """Route a (real or fake) recognizer's events into the feed."""
+    def recognizing(evt):
+        if evt.result and evt.result.reason == RECOGNIZING:
+            feed.on_partial(evt.result.text)
+
+    def recognized(evt):
+        if evt.result and evt.result.reason == RECOGNIZED and evt.result.text:
+            feed.on_final(evt.result.text)
+
+    def canceled(evt):
+        details = getattr(evt, "error_details", None) or getattr(getattr(evt, "cancellation_details", None), "error_details", None)
+        feed.on_stopped(f"Recognition canceled: {details}" if details else None)
+
+    recognizer.recognizing.connect(recognizing)
+    recognizer.recognized.connect(recognized)
+    recognizer.session_stopped.connect(lambda _: feed.on_stopped())
+    recognizer.canceled.connect(canceled)
+
+
+# ===== Fake recognizer =====
+
+class _Signal:
+    def __init__(self):
+        self._handlers = []
+
+    def connect(self, handler):
+        self._handlers.append(handler)
+
+    def emit(self, evt):
+        for handler in list(self._handlers):
+            handler(evt)
+
+
+class _Result:
+    __slots__ = ("text", "reason")
+
+    def __init__(self, text: str, reason):
+        self.text = text
+        self.reason = reason
+
+
+class _Event:
+    __slots__ = ("result",)
+
+    def __init__(self, result: Optional[_Result] = None):
+        self.result = result
+
+
+class FakeRecognizer:
+    """Scripted recognizer: script is a sequence of (delay_seconds, "partial" | "final", text).
+
+    Events fire on a background thread like the SDK's; session_stopped fires once,
+    at the end of the script or on stop_continuous_recognition().
+    """
+
+    def __init__(self, script: Sequence[Tuple[float, str, str]], speed: float = 1.0, loop: bool = False):
+        self.script = list(script)
+        self.speed = speed
+        self.loop = loop
+        self.recognizing = _Signal()
+        self.recognized = _Signal()
+        self.session_stopped = _Signal()
+        self.canceled = _Signal()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped_lock = threading.Lock()
+        self._stopped = False
+
+    @classmethod
+    def from_sentences(cls, sentences: Iterable[str], word_delay: float = 0.15, pause: float = 0.6, **kwargs) -> "FakeRecognizer":
+        """Word-by-word partials followed by a final per sentence."""
+        script = []
+        for sentence in sentences:
+            words = sentence.split()
+            for i in range(1, len(words) + 1):
+                script.append((word_delay, "partial", " ".join(words[:i])))
+            script.append((pause, "final", sentence))
+        return cls(script, **kwargs)
+
+    def start_continuous_recognition(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop_continuous_recognition(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._emit_stopped()
+
+    def _emit_stopped(self):
+        with self._stopped_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self.session_stopped.emit(_Event())
+
+    def _run(self):
+        while True:
+            for delay, kind, text in self.script:
+                if self._stop.wait(delay / self.speed if self.speed else 0):
+                    return
+                if kind == "partial":
+                    self.recognizing.emit(_Event(_Result(text, RECOGNIZING)))
+                else:
+                    self.recognized.emit(_Event(_Result(text, RECOGNIZED)))
+            if not self.loop:
+                break
+        self._emit_stopped()
+
+
+DEMO_SCRIPT = [
+    "Good morning everyone, let's get started.",
+    "First item is the release schedule for next quarter.",
+    "The migration finished on Tuesday and error rates are down.",
+    "We still need a decision on the launch date.",
+    "I can take the action item for the customer follow-up.",
+]
+
+
+def demo_recognizer(speed: float = 1.0) -> FakeRecognizer:
+    """Looping scripted meeting for the UI's simulated mode."""
+    return FakeRecognizer.from_sentences(DEMO_SCRIPT, speed=speed, loop=True)
@@ -1,76 +1,581 @@
-from openai import AzureOpenAI
-from dotenv import load_dotenv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Deque, Optional
+from disk_cache import DiskCache, TieredCache, make_key
+from image_preprocess import encode_images
+import asyncio
 import base64
+import hashlib
+import logging
 import os
+import re
+import time
+import weakref
+import resources
+import telemetry
 
-load_dotenv()
+resources.load_env()
 GPT4o_API_KEY = os.getenv("GPT4o_API_KEY")
 GPT4o_DEPLOYMENT_ENDPOINT = os.getenv("GPT4o_DEPLOYMENT_ENDPOINT")
 GPT4o_DEPLOYMENT_NAME = os.getenv("GPT4o_DEPLOYMENT_NAME")
+OPENAI_API_VERSION = "2024-02-01"
 
+logger = logging.getLogger(__name__)
 
-client = AzureOpenAI(
-  azure_endpoint = GPT4o_DEPLOYMENT_ENDPOINT, 
-  api_key=GPT4o_API_KEY,  
-  api_version="2024-02-01"
+
+def _build_client():
+    from openai import AzureOpenAI  # Heavy import: deferred until the first completion
+    return AzureOpenAI(
+      azure_endpoint = GPT4o_DEPLOYMENT_ENDPOINT,
+      api_key=GPT4o_API_KEY,
+      api_version=OPENAI_API_VERSION
+    )
+
+
+def get_client():
+    """Process-wide AzureOpenAI client, built on first use (resources.py)."""
+    return resources.shared("azure_openai", _build_client)
+
+
+def __getattr__(name):
+    if name == "client":  # llm_analysis.client still works, lazily
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# AsyncAzureOpenAI binds its connection pool to the running loop -> one client per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncAzureOpenAI]" = weakref.WeakKeyDictionary()
+
+
+def async_client() -> "AsyncAzureOpenAI":
+    from openai import AsyncAzureOpenAI
+    loop = asyncio.get_running_loop()
+    aclient = _async_clients.get(loop)
+    if aclient is None:
+        aclient = _async_clients[loop] = AsyncAzureOpenAI(
+            azure_endpoint=GPT4o_DEPLOYMENT_ENDPOINT,
+            api_key=GPT4o_API_KEY,
+            api_version=OPENAI_API_VERSION
+        )
+    return aclient
+
+
+async def aclose_client():
+    """Close this loop's async client (call before the loop ends)."""
+    aclient = _async_clients.pop(asyncio.get_running_loop(), None)
+    if aclient is not None:
+        await aclient.close()
+
+# Deterministic-response cache (temperature=0.0 -> same request, same answer)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(os.getcwd(), ".cache", "llm_responses"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64"))
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+
+response_cache = TieredCache(
+    DiskCache(LLM_CACHE_DIR, max_bytes=int(LLM_CACHE_MAX_MB * 1024 * 1024), max_age=LLM_CACHE_TTL_HOURS * 3600),
+    max_items=256,
 )
 
 
-def call_openAI(text):
-    print(f"deploy is {GPT4o_DEPLOYMENT_ENDPOINT}")
-    response = client.chat.completions.create(
+def _normalize_messages(messages):
+    """Cache-key view of messages: text stripped, inline images replaced by their hash."""
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            content = content.strip()
+        elif isinstance(content, list):
+            parts = []
+            for part in content:
+                if part.get("type") == "text":
+                    parts.append({"type": "text", "text": part.get("text", "").strip()})
+                elif part.get("type") == "image_url":
+                    image_url = dict(part.get("image_url", {}))
+                    image_url["url"] = "sha256:" + hashlib.sha256(image_url.get("url", "").encode("utf-8")).hexdigest()
+                    parts.append({"type": "image_url", "image_url": image_url})
+                else:
+                    parts.append(part)
+            content = parts
+        normalized.append({"role": message.get("role"), "content": content})
+    return normalized
+
+
+def response_key(messages):
+    return make_key(GPT4o_DEPLOYMENT_NAME or "", OPENAI_API_VERSION, 0.0, _normalize_messages(messages))
+
+
+def _request_key(text, use_cache, key):
+    """Response-cache key for a request: the caller's precomputed key, else one derived from the messages."""
+    if not (use_cache and LLM_CACHE_ENABLED):
+        return None
+    return key if key is not None else response_key(text)
+
+
+def call_openAI(text, use_cache=True, key=None):
+    """Chat completion (temperature 0). Served from response_cache when possible; use_cache=False bypasses it.
+
+    With a precomputed `key`, `text` may be a zero-arg function that builds the messages on a cache miss.
+    """
+    key = _request_key(text, use_cache, key)
+    if key:
+        cached = response_cache.get(key)
+        if cached is not None:
+            logger.info("LLM cache hit")
+            telemetry.count("llm.cache_hit")
+            return cached["content"]
+    if callable(text):
+        text = text()
+    logger.debug("deploy is %s", GPT4o_DEPLOYMENT_ENDPOINT)
+    with telemetry.span("llm.chat", deployment=GPT4o_DEPLOYMENT_NAME) as s:
+        response = get_client().chat.completions.create(
+            model=GPT4o_DEPLOYMENT_NAME,
+            messages = text,
+            temperature=0.0
+        )
+        _record_usage(s, response)
+    content = response.choices[0].message.content
+    if key and content is not None:
+        response_cache.put(key, {"content": content})
+    return content
+
+
+def _record_usage(span, response):
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+
+async def acall_openAI(text, use_cache=True, key=None):
+    """call_openAI() on the per-loop AsyncAzureOpenAI client (cache I/O and message building in a worker thread)."""
+    key = _request_key(text, use_cache, key)
+    if key:
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            logger.info("LLM cache hit")
+            telemetry.count("llm.cache_hit")
+            return cached["content"]
+    if callable(text):
+        text = await asyncio.to_thread(text)
+    with telemetry.span("llm.chat", deployment=GPT4o_DEPLOYMENT_NAME, asynchronous=True) as s:
+        response = await async_client().chat.completions.create(
+            model=GPT4o_DEPLOYMENT_NAME,
+            messages=text,
+            temperature=0.0
+        )
+        _record_usage(s, response)
+    content = response.choices[0].message.content
+    if key and content is not None:
+        await asyncio.to_thread(response_cache.put, key, {"content": content})
+    return content
+
+
+class StreamStats:
+    """Timing for one streamed completion (filled in as the stream is consumed)."""
+    def __init__(self):
+        self.started: float = 0.0
+        self.ttft: Optional[float] = None           # Seconds until first content delta
+        self.total: Optional[float] = None          # Seconds until stream end
+        self.chunks = 0
+        self.tokens = 0                             # Estimated output tokens
+        self.tokens_per_sec: Optional[float] = None # Generation rate after first token
+
+    def summary(self):
+        if self.ttft is None:
+            return "no tokens received"
+        return f"TTFT {self.ttft * 1000:.0f} ms · {self.tokens_per_sec or 0:.1f} tok/s · {self.total:.1f} s total"
+
+
+# Recent stream timings (most recent last) for diagnostics
+STREAM_HISTORY: Deque[StreamStats] = deque(maxlen=100)
+
+
+def call_openAI_stream(text, stats: Optional[StreamStats] = None, use_cache=True, key=None):
+    """Streaming variant of call_openAI: yields content deltas as they arrive.
+
+    Time-to-first-token and tokens/sec are recorded on `stats` (if given) and in STREAM_HISTORY.
+    A cache hit yields the stored answer as a single delta; a completed stream is cached.
+    `key` / callable `text` work as in call_openAI.
+    """
+    stats = stats if stats is not None else StreamStats()
+    stats.started = time.perf_counter()
+    key = _request_key(text, use_cache, key)
+    cached = _cached_stream(stats, key)
+    if cached is not None:
+        yield cached
+        return
+    if callable(text):
+        text = text()
+    response = get_client().chat.completions.create(
         model=GPT4o_DEPLOYMENT_NAME,
         messages = text,
-        temperature=0.0
+        temperature=0.0,
+        stream=True
+    )
+    parts = []
+    completed = False
+    try:
+        for chunk in response:
+            if not chunk.choices:  # Azure content-filter preamble
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if stats.ttft is None:
+                stats.ttft = time.perf_counter() - stats.started
+            stats.chunks += 1
+            parts.append(delta)
+            yield delta
+        completed = True
+    finally:
+        _finish_stream(stats, parts, completed, key)
+
+
+def _cached_stream(stats: StreamStats, key):
+    """Cached answer for a stream request (stats filled in as a single-delta stream) or None."""
+    cached = response_cache.get(key) if key else None
+    if cached is None:
+        return None
+    logger.info("LLM cache hit")
+    telemetry.count("llm.cache_hit")
+    stats.ttft = stats.total = time.perf_counter() - stats.started
+    stats.chunks = 1
+    stats.tokens = estimate_tokens(cached["content"])
+    STREAM_HISTORY.append(stats)
+    return cached["content"]
+
+
+def _finish_stream(stats: StreamStats, parts, completed, key):
+    stats.total = time.perf_counter() - stats.started
+    stats.tokens = estimate_tokens("".join(parts)) if parts else 0
+    if stats.ttft is not None:
+        gen_time = stats.total - stats.ttft
+        stats.tokens_per_sec = stats.tokens / gen_time if gen_time > 0 else None
+    STREAM_HISTORY.append(stats)
+    # Generator may be suspended across threads / yields -> record the span after the fact
+    telemetry.add_span("llm.stream", stats.started, stats.started + stats.total, deployment=GPT4o_DEPLOYMENT_NAME,
+                       ttft_ms=round(stats.ttft * 1000) if stats.ttft is not None else None, completed=completed)
+    if stats.ttft is not None:
+        telemetry.record("llm.ttft", stats.ttft)
+    logger.info("Stream finished: %s", stats.summary())
+    if key and completed and parts:
+        response_cache.put(key, {"content": "".join(parts)})
+
+
+async def acall_openAI_stream(text, stats: Optional[StreamStats] = None, use_cache=True, key=None) -> AsyncIterator[str]:
+    """call_openAI_stream() as an async generator on the per-loop async client."""
+    stats = stats if stats is not None else StreamStats()
+    stats.started = time.perf_counter()
+    key = _request_key(text, use_cache, key)
+    cached = await asyncio.to_thread(_cached_stream, stats, key) if key else None
+    if cached is not None:
+        yield cached
+        return
+    if callable(text):
+        text = await asyncio.to_thread(text)
+    response = await async_client().chat.completions.create(
+        model=GPT4o_DEPLOYMENT_NAME,
+        messages=text,
+        temperature=0.0,
+        stream=True
     )
-    return response.choices[0].message.content
+    parts = []
+    completed = False
+    try:
+        async for chunk in response:
+            if not chunk.choices:  # Azure content-filter preamble
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if stats.ttft is None:
+                stats.ttft = time.perf_counter() - stats.started
+            stats.chunks += 1
+            parts.append(delta)
+            yield delta
+        completed = True
+    finally:
+        _finish_stream(stats, parts, completed, key)
 
 def encode_image(image):
     
     return base64.b64encode(image).decode("utf-8")
     
-def analysis_image(image, user_prompt: str | None = None, detected_language="en-US"):
-    encoded_image = encode_image(image.getvalue())
-    default_prompt = "Provide a clear, structured analysis of the image: key objects, relationships, actions, context, and any notable details relevant for documentation or presentation."
-    question = user_prompt.strip() if user_prompt and user_prompt.strip() else default_prompt
+IMAGE_SYSTEM_PROMPT = "You are a helpful assistant that analyzes images and visual content. Respond succinctly and clearly in English unless otherwise instructed."
+IMAGE_DEFAULT_PROMPT = "Provide a clear, structured analysis of the image: key objects, relationships, actions, context, and any notable details relevant for documentation or presentation."
+
+
+class _ImageRequest:
+    """One vision request: raw image bytes + prompt, keyed before any preprocessing.
+
+    The cache key hashes the uploaded bytes, so a cache hit skips decoding / resizing;
+    messages() prepares the images only when the completion is actually requested.
+    """
+    def __init__(self, image, user_prompt: str | None = None, detail="high"):
+        images = image if isinstance(image, (list, tuple)) else [image]
+        self.payloads = [img if isinstance(img, (bytes, bytearray, memoryview)) else img.getvalue() for img in images]
+        self.question = user_prompt.strip() if user_prompt and user_prompt.strip() else IMAGE_DEFAULT_PROMPT
+        self.detail = detail
+        self.key = make_key(GPT4o_DEPLOYMENT_NAME or "", OPENAI_API_VERSION, 0.0, "image", detail,
+                            IMAGE_SYSTEM_PROMPT, self.question, *self.payloads)
+
+    def messages(self):
+        return _image_messages(self.payloads, self.question, self.detail)
+
+
+def _image_messages(image, user_prompt: str | None = None, detail="high"):
+    """Vision messages for one image or a list of images (prepared concurrently, see image_preprocess)."""
+    images = image if isinstance(image, (list, tuple)) else [image]
+    with telemetry.span("llm.image_prepare", images=len(images), detail=detail):
+        prepared = encode_images(images, detail=detail)
+    for p in prepared:
+        logger.info(p.summary())
+    question = user_prompt.strip() if user_prompt and user_prompt.strip() else IMAGE_DEFAULT_PROMPT
     messages=[
-        {"role": "system", "content": "You are a helpful assistant that analyzes images and visual content. Respond succinctly and clearly in English unless otherwise instructed."},
+        {"role": "system", "content": IMAGE_SYSTEM_PROMPT},
         {"role": "user", "content": [
             {"type": "text", "text": question},
-            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{encoded_image}"}}
+        ] + [
+            {"type": "image_url", "image_url": {"url": p.data_url(), "detail": "high" if detail == "auto" else detail}}
+            for p in prepared
         ]}
     ]
-    result = call_openAI(messages)
-    
-    print(f"Image analysis result: {result}")
+    return messages
+
+def analysis_image(image, user_prompt: str | None = None, detected_language="en-US", detail="high"):
+    """Vision analysis of one image or a list of images; detail="low" trades fidelity for speed / tokens."""
+    with telemetry.span("llm.analysis_image", detail=detail):
+        request = _ImageRequest(image, user_prompt, detail)
+        result = call_openAI(request.messages, key=request.key)
+    logger.debug("Image analysis result: %s", result)
     return result
 
-def analysis_text(userPrompt, text, detected_language="en-US"):
-    # Define language-specific prompts
-    language_prompts = {
-        "en-US": "Please provide a comprehensive content summary focusing on key information and important points. Use clear English formatting.",
-        "zh-CN": "请提供一份侧重于关键内容和重要信息的总结。使用良好的中文格式输出",
-        "es-ES": "Por favor, proporciona un resumen completo del contenido enfocándose en la información clave y puntos importantes. Usa un formato claro en español.",
-        "fr-FR": "Veuillez fournir un résumé complet du contenu en vous concentrant sur les informations clés et les points importants. Utilisez un format français clair.",
-        "de-DE": "Bitte erstellen Sie eine umfassende Inhaltszusammenfassung mit Fokus auf wichtige Informationen und Kernpunkte. Verwenden Sie eine klare deutsche Formatierung.",
-        "ja-JP": "重要な内容と要点に焦点を当てた包括的なコンテンツ要約を提供してください。明確な日本語の形式を使用してください。",
-        "ko-KR": "주요 내용과 중요한 포인트에 중점을 둔 포괄적인 콘텐츠 요약을 제공해 주세요. 명확한 한국어 형식을 사용하세요."
-    }
-    
-    # Get the appropriate prompt based on detected language, default to English
-    base_prompt = language_prompts.get(detected_language, language_prompts["en-US"])
-    
-    # If user provided a custom prompt, use it; otherwise use the language-specific default
-    final_prompt = userPrompt if userPrompt and userPrompt.strip() else base_prompt
-    
-    messages=[
-        {"role": "system", "content": "You are a helpful assistant that responds in the same language as the input text. Help me with content analysis and summarization!"},
+def analysis_image_stream(image, user_prompt: str | None = None, detected_language="en-US", stats: Optional[StreamStats] = None, detail="high"):
+    """Streaming analysis_image: generator of content deltas."""
+    request = _ImageRequest(image, user_prompt, detail)
+    yield from call_openAI_stream(request.messages, stats, key=request.key)
+
+async def aanalysis_image(image, user_prompt: str | None = None, detected_language="en-US", detail="high"):
+    """analysis_image() for asyncio; image decoding / resizing (cache misses only) runs in a worker thread."""
+    with telemetry.span("llm.analysis_image", detail=detail, asynchronous=True):
+        request = _ImageRequest(image, user_prompt, detail)
+        result = await acall_openAI(request.messages, key=request.key)
+    logger.debug("Image analysis result: %s", result)
+    return result
+
+# Language-specific default summary prompts
+LANGUAGE_PROMPTS = {
+    "en-US": "Please provide a comprehensive content summary focusing on key information and important points. Use clear English formatting.",
+    "zh-CN": "请提供一份侧重于关键内容和重要信息的总结。使用良好的中文格式输出",
+    "es-ES": "Por favor, proporciona un resumen completo del contenido enfocándose en la información clave y puntos importantes. Usa un formato claro en español.",
+    "fr-FR": "Veuillez fournir un résumé complet du contenu en vous concentrant sur les informations clés et les points importants. Utilisez un format français clair.",
+    "de-DE": "Bitte erstellen Sie eine umfassende Inhaltszusammenfassung mit Fokus auf wichtige Informationen und Kernpunkte. Verwenden Sie eine klare deutsche Formatierung.",
+    "ja-JP": "重要な内容と要点に焦点を当てた包括的なコンテンツ要約を提供してください。明確な日本語の形式を使用してください。",
+    "ko-KR": "주요 내용과 중요한 포인트에 중점을 둔 포괄적인 콘텐츠 요약을 제공해 주세요. 명확한 한국어 형식을 사용하세요."
+}
+
+TEXT_SYSTEM_PROMPT = "You are a helpful assistant that responds in the same language as the input text. Help me with content analysis and summarization!"
+
+# Map-reduce summarization (long transcripts)
+SINGLE_SHOT_MAX_TOKENS = int(os.getenv("LLM_SINGLE_SHOT_MAX_TOKENS", "12000"))  # Above this -> map-reduce
+MAP_CHUNK_TOKENS = int(os.getenv("LLM_MAP_CHUNK_TOKENS", "4000"))
+MAP_MAX_WORKERS = int(os.getenv("LLM_MAP_MAX_WORKERS", "4"))
+MAP_PROMPT = ("This is part {index} of {total} of a longer transcript. Summarize this part: key points, decisions, "
+              "action items and who said them. Keep speaker labels. Respond in the same language as the transcript.")
+REDUCE_PREFIX = "The following are summaries of consecutive parts of one transcript, in order. Combine them into one summary."
+COMBINE_PROMPT = ("This is group {index} of {total} of consecutive partial summaries of one transcript, in order. "
+                  "Combine them into one summary: keep key points, decisions, action items and who said them. "
+                  "Respond in the same language as the summaries.")  # Intermediate reduce levels
+
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_SPEAKER_RE = re.compile(r"^([^:\n]{1,40}):\s")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate: ~1 token per CJK character, ~4 characters per token otherwise."""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def split_speaker_turns(text, max_tokens=MAP_CHUNK_TOKENS):
+    """Pack 'Speaker: text' lines into chunks of <= max_tokens, never splitting a turn unless it alone is too big."""
+    turns, current, current_speaker = [], [], None
+    for line in text.splitlines():
+        match = _SPEAKER_RE.match(line)
+        speaker = match.group(1) if match else current_speaker
+        if current and speaker != current_speaker:
+            turns.append("\n".join(current))
+            current = []
+        current.append(line)
+        current_speaker = speaker
+    if current:
+        turns.append("\n".join(current))
+
+    chunks, buf, buf_tokens = [], [], 0
+    for turn in turns:
+        pieces = [turn] if estimate_tokens(turn) <= max_tokens else turn.splitlines()
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if buf and buf_tokens + tokens > max_tokens:
+                chunks.append("\n".join(buf))
+                buf, buf_tokens = [], 0
+            buf.append(piece)
+            buf_tokens += tokens
+    if buf:
+        chunks.append("\n".join(buf))
+    return chunks
+
+
+def _text_messages(prompt, text):
+    return [
+        {"role": "system", "content": TEXT_SYSTEM_PROMPT},
         {"role": "user", "content": [
-            {"type": "text", "text": final_prompt},
+            {"type": "text", "text": prompt},
             {"type": "text", "text": text}
         ]}
     ]
-    result = call_openAI(messages)
-    
-    print(f"Text analysis result: {result}")
-    return result
\ No newline at end of file
+
+
+def _map_requests(text, max_tokens=MAP_CHUNK_TOKENS, prompt=MAP_PROMPT):
+    """Messages of the map step, one per speaker-turn chunk (in order); prompt takes {index} / {total}."""
+    chunks = split_speaker_turns(text, max_tokens)
+    return [_text_messages(prompt.format(index=i + 1, total=len(chunks)), chunk) for i, chunk in enumerate(chunks)]
+
+
+class _Reduction:
+    """Reduce-loop decisions shared by the sync and async paths.
+
+    Partial summaries are re-mapped while their concatenation is still too big for
+    one completion, and only as long as each pass actually shrinks them.
+    """
+
+    def __init__(self, partials):
+        self.partials = partials
+        self.stalled = False
+
+    @property
+    def combined(self):
+        return "\n\n".join(self.partials)
+
+    def pending(self):
+        """Text to summarize once more, or None when the combined partials can go to the final call."""
+        if self.stalled or len(self.partials) <= 1:
+            return None
+        combined = self.combined
+        return combined if estimate_tokens(combined) > SINGLE_SHOT_MAX_TOKENS else None
+
+    def advance(self, reduced):
+        if len(reduced) >= len(self.partials):
+            self.stalled = True  # Not converging; send what we have
+        else:
+            self.partials = reduced
+
+
+def map_summaries(text, max_tokens=MAP_CHUNK_TOKENS, max_workers=MAP_MAX_WORKERS, prompt=MAP_PROMPT):
+    """Map step: summarize speaker-turn chunks concurrently (order preserved).
+
+    prompt=COMBINE_PROMPT for intermediate reduce levels (the input is partial summaries).
+    """
+    jobs = _map_requests(text, max_tokens, prompt)
+    logger.info("Map-reduce: %d chunks, %d workers", len(jobs), max_workers)
+    with telemetry.span("llm.map", chunks=len(jobs), workers=max_workers) as parent:
+        def summarize(index):
+            with telemetry.span("llm.map_chunk", parent=parent, index=index):
+                return call_openAI(jobs[index])
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(summarize, range(len(jobs))))
+
+
+def _summary_plan(userPrompt, text, detected_language="en-US", mode="auto"):
+    """-> (final prompt, resolved mode)."""
+    # Get the appropriate prompt based on detected language, default to English
+    base_prompt = LANGUAGE_PROMPTS.get(detected_language, LANGUAGE_PROMPTS["en-US"])
+
+    # If user provided a custom prompt, use it; otherwise use the language-specific default
+    final_prompt = userPrompt if userPrompt and userPrompt.strip() else base_prompt
+
+    if mode == "auto":
+        mode = "map_reduce" if estimate_tokens(text) > SINGLE_SHOT_MAX_TOKENS else "single"
+    return final_prompt, mode
+
+
+def _analysis_messages(userPrompt, text, detected_language="en-US", mode="auto"):
+    """Final summary messages (runs the map step first when map-reduce is selected)."""
+    final_prompt, mode = _summary_plan(userPrompt, text, detected_language, mode)
+    if mode == "map_reduce":
+        # Reduce pass may itself be too large for one call -> repeat map over partial summaries
+        reduction = _Reduction(map_summaries(text))
+        while (pending := reduction.pending()) is not None:
+            reduction.advance(map_summaries(pending, prompt=COMBINE_PROMPT))
+        messages = _text_messages(f"{final_prompt}\n\n{REDUCE_PREFIX}", reduction.combined)
+    else:
+        messages = _text_messages(final_prompt, text)
+    return messages
+
+
+async def amap_summaries(text, max_tokens=MAP_CHUNK_TOKENS, max_workers=MAP_MAX_WORKERS, prompt=MAP_PROMPT):
+    """map_summaries() with at most max_workers completions in flight."""
+    jobs = _map_requests(text, max_tokens, prompt)
+    logger.info("Map-reduce: %d chunks, %d in flight", len(jobs), max_workers)
+    slots = asyncio.Semaphore(max_workers)
+    with telemetry.span("llm.map", chunks=len(jobs), workers=max_workers, asynchronous=True) as parent:
+        async def summarize(index):
+            async with slots:
+                with telemetry.span("llm.map_chunk", parent=parent, index=index):
+                    return await acall_openAI(jobs[index])
+        return list(await asyncio.gather(*(summarize(i) for i in range(len(jobs)))))
+
+
+async def _aanalysis_messages(userPrompt, text, detected_language="en-US", mode="auto"):
+    final_prompt, mode = _summary_plan(userPrompt, text, detected_language, mode)
+    if mode != "map_reduce":
+        return _text_messages(final_prompt, text)
+    reduction = _Reduction(await amap_summaries(text))
+    while (pending := reduction.pending()) is not None:
+        reduction.advance(await amap_summaries(pending, prompt=COMBINE_PROMPT))
+    return _text_messages(f"{final_prompt}\n\n{REDUCE_PREFIX}", reduction.combined)
+
+
+def analysis_text(userPrompt, text, detected_language="en-US", mode="auto"):
+    """Summarize text with the language-specific (or custom) prompt.
+
+    mode: "single" (one completion), "map_reduce" (chunked by speaker turns,
+    summarized concurrently, then combined), or "auto" (map-reduce when the
+    estimated token count exceeds SINGLE_SHOT_MAX_TOKENS).
+    """
+    with telemetry.span("llm.analysis_text", mode=mode):
+        result = call_openAI(_analysis_messages(userPrompt, text, detected_language, mode))
+    logger.debug("Text analysis result: %s", result)
+    return result
+
+
+ROLLING_PROMPT = ("You maintain the running summary of a live meeting. Update the summary with the new transcript "
+                  "excerpt: keep earlier points unless the new text revises them, add new key points, decisions and "
+                  "action items. Return only the complete updated summary.")
+
+
+def merge_summary(summary, new_text, detected_language="en-US"):
+    """Rolling summary step: fold a transcript delta into the running summary (cost ~ summary + delta, not meeting length)."""
+    prompt = f"{LANGUAGE_PROMPTS.get(detected_language, LANGUAGE_PROMPTS['en-US'])}\n\n{ROLLING_PROMPT}"
+    text = f"Summary so far:\n{summary or '(none yet)'}\n\nNew transcript:\n{new_text}"
+    with telemetry.span("llm.rolling_merge", delta_tokens=estimate_tokens(new_text)):
+        return call_openAI(_text_messages(prompt, text))
+
+
+def analysis_text_stream(userPrompt, text, detected_language="en-US", mode="auto", stats: Optional[StreamStats] = None):
+    """Streaming analysis_text: generator of summary deltas (map step, if any, runs before the first yield)."""
+    yield from call_openAI_stream(_analysis_messages(userPrompt, text, detected_language, mode), stats)
+
+
+async def aanalysis_text(userPrompt, text, detected_language="en-US", mode="auto"):
+    """analysis_text() for asyncio (map step as concurrent tasks)."""
+    with telemetry.span("llm.analysis_text", mode=mode, asynchronous=True):
+        result = await acall_openAI(await _aanalysis_messages(userPrompt, text, detected_language, mode))
+    logger.debug("Text analysis result: %s", result)
+    return result
+
+
+async def aanalysis_text_stream(userPrompt, text, detected_language="en-US", mode="auto", stats: Optional[StreamStats] = None) -> AsyncIterator[str]:
+    """analysis_text_stream() as an async generator."""
+    async for delta in acall_openAI_stream(await _aanalysis_messages(userPrompt, text, detected_language, mode), stats):
+        yield delta
@@ -1,6 +1,8 @@
 import streamlit as st
-from scenarios import list_scenarios
-import importlib
+import resources
+resources.load_env()
+from scenarios import list_scenarios  # Metadata only; scenario modules load on first render
+import telemetry
 
 # Optional external card component
 try:
@@ -11,8 +13,6 @@ except Exception:
 st.set_page_config(page_title="AVIA | Modular AI Demos", page_icon="🤖", layout="wide")
 
 # ===== Helpers =====
-_DEF_MODULES = ["scenarios.live_mic", "scenarios.audio_file_summary", "scenarios.image_analysis"]
-for m in _DEF_MODULES: importlib.import_module(m)
 scenarios = list_scenarios()
 if 'selected_scenario' not in st.session_state: st.session_state.selected_scenario = None
 
@@ -20,6 +20,37 @@ def _safe_rerun():
     try: st.rerun()
     except Exception: pass
 
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+def _render_diagnostics():
+    """Sidebar panel: span latency histograms, counters, recent traces, export."""
+    with st.sidebar.expander("🩺 Diagnostics", expanded=False):
+        enabled = st.checkbox("Collect timings", value=telemetry.enabled(), key="diag_enabled")
+        if enabled != telemetry.enabled(): telemetry.set_enabled(enabled)
+        snap = telemetry.registry.snapshot()
+        if not snap["histograms"]:
+            st.caption("No timings recorded yet.")
+        else:
+            rows = []
+            for h in snap["histograms"]:
+                labels = ",".join(f"{k}={v}" for k, v in h["labels"].items())
+                rows.append({"span": h["name"] + (f" [{labels}]" if labels else ""), "n": h["count"],
+                             "p50 ms": _ms(h["p50"]), "p95 ms": _ms(h["p95"]), "max ms": _ms(h["max"])})
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        if snap["counters"]:
+            st.caption(" · ".join(f"{c['name']}{c['labels'] or ''}: {c['value']:g}" for c in snap["counters"]))
+        traces = telemetry.traces(10)
+        if traces:
+            pick = st.selectbox("Recent trace", range(len(traces)), format_func=lambda i: f"{traces[i]['name']} ({traces[i]['ms']:.0f} ms)", key="diag_trace")
+            st.code(telemetry.format_trace(traces[pick]), language=None)
+        c1, c2, c3 = st.columns(3)
+        c1.download_button("Prometheus", telemetry.registry.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        c2.download_button("JSON", telemetry.registry.to_json(), file_name="metrics.json", mime="application/json")
+        if c3.button("Reset", key="diag_reset"):
+            telemetry.reset()
+            _safe_rerun()
+
 # ===== Hero Banner =====
 st.markdown("""
 <style>
@@ -119,4 +150,7 @@ else:
                         st.session_state.selected_scenario = key
                         _safe_rerun()
     st.markdown("<hr style='margin:1.2rem 0 .7rem;border:none;border-top:1px solid #dfe3eb' />", unsafe_allow_html=True)
-    st.caption("Add a new demo: create a module under meeting_summary/scenarios and register it. It appears automatically.")
+    st.caption("Add a new demo: create a module under meeting_summary/scenarios and declare it in scenarios/__init__.py. It appears automatically.")
+
+# Rendered last so it includes timings from this run
+_render_diagnostics()
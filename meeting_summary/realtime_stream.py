@@ -1,24 +1,38 @@
+import asyncio
+import io
+import mmap
 import os
+import queue
+import shutil
+import struct
+import subprocess
 import time
-import wave
 import threading
-from io import BytesIO
-from typing import List, Optional  # Removed unused Tuple
+from typing import AsyncIterator, Callable, Iterator, List, Optional  # Removed unused Tuple
 
 import azure.cognitiveservices.speech as speechsdk
-from azure.ai.translation.text import TextTranslationClient
-from azure.core.credentials import AzureKeyCredential
+import azure_transport
+import telemetry
+import translation_memory
 
 """realtime_stream.py
 Utility for simulating a real-time streaming session by pushing an uploaded
-WAV file into an Azure Speech PushAudioInputStream. Provides optional per-
+audio file into an Azure Speech PushAudioInputStream. Provides optional per-
 segment translation using Azure Translator.
 
 Design:
-- Writer thread feeds PCM frames to push stream (optional real-time pacing)
+- Writer thread feeds PCM slices to push stream; WAV input is memory-mapped /
+  sliced in place (AudioFeed), other formats are decoded by ffmpeg as a stream
+- Configurable pacing: real time, N x faster, or unthrottled (batch reprocessing)
 - Speech SDK callbacks update an in-memory state object (StreamingResult)
-- Caller invokes continuous_transcribe_and_translate and receives populated
-  result object after completion (blocking convenience wrapper)
+- Finalized segments are translated off the callback thread by a micro-batching
+  worker (TranslationWorker: size-or-deadline flush, results written in segment order);
+  segments already in the shared translation memory never reach the Translator
+- stream_transcribe_and_translate yields typed StreamEvents (partial / final /
+  translation / error) as they happen and ends on session_stopped / canceled
+  (astream_transcribe_and_translate: async iterator variant)
+- continuous_transcribe_and_translate is the blocking wrapper returning the
+  populated StreamingResult after completion
 
 Note: This module purposefully has no Streamlit references to keep it UI-agnostic.
 """
@@ -29,44 +43,314 @@ TRANSLATOR_KEY = os.getenv("TRANSLATOR_KEY", "")
 TRANSLATOR_REGION = os.getenv("TRANSLATOR_REGION", "eastasia")
 TRANSLATOR_ENDPOINT = os.getenv("TRANSLATOR_ENDPOINT", "https://api.cognitive.microsofttranslator.com")
 
+DECODE_SAMPLE_RATE = 16000        # ffmpeg decode target for non-WAV input
+TRANSLATION_BATCH_SIZE = 8        # Max segments per translate() request
+TRANSLATION_BATCH_DEADLINE = 0.5  # Seconds the first queued segment may wait for company
+
 class StreamingResult:
     """Holds incremental streaming transcription + translation state."""
     def __init__(self):
         self.partial: str = ""                  # Latest interim hypothesis
         self.final_segments: List[str] = []      # Finalized recognized lines
         self.translated_segments: List[str] = [] # Translated counterparts (if enabled)
+        self.translation_stats = translation_memory.LookupStats()  # Memory hits / latency saved
         self.detected_language: Optional[str] = None
         self.done = False                        # Session termination flag
         self.error: Optional[str] = None         # Error message if failure occurs
 
-def _push_stream_writer(wav_bytes: BytesIO, stream: speechsdk.audio.PushAudioInputStream, frame_size: int = 4096, sleep_real_time: bool = True):
-    """Feed audio frames into push stream; optionally pace to approximate real-time."""
-    wav_bytes.seek(0)
-    with wave.open(wav_bytes, 'rb') as wf:
-        frame_rate = wf.getframerate()
-        frame_duration = frame_size / frame_rate if frame_rate else 0.0
+class StreamEvent:
+    """One item from stream_transcribe_and_translate."""
+    PARTIAL = "partial"          # Interim hypothesis (text)
+    FINAL = "final"              # Finalized segment (text, index)
+    TRANSLATION = "translation"  # Translation of segment `index`
+    ERROR = "error"              # Non-fatal or fatal error message (text)
+
+    __slots__ = ("kind", "text", "index")
+
+    def __init__(self, kind: str, text: str = "", index: Optional[int] = None):
+        self.kind = kind
+        self.text = text
+        self.index = index
+
+    def __repr__(self):
+        return f"StreamEvent({self.kind!r}, {self.text!r}, index={self.index})"
+
+
+_SESSION_END = object()  # Internal completion marker (session_stopped / canceled)
+
+class TranslationWorker:
+    """Background translator: batches finalized segments into one translate(body=[...]) call.
+
+    submit() reserves the segment's slot in translated_segments immediately (empty
+    placeholder) so results land in segment order no matter when batches complete.
+    Recognition callbacks never wait on the translator.
+    """
+    def __init__(self, client, result_state: StreamingResult, source_language: str, target_language: str,
+                 batch_size: int = TRANSLATION_BATCH_SIZE, deadline: float = TRANSLATION_BATCH_DEADLINE,
+                 on_result: Optional[Callable[[int, str], None]] = None):
+        self.client = client
+        self.on_result = on_result  # Called (index, text) per translated segment, from the worker thread
+        self.result_state = result_state
+        self.source_language = source_language
+        self.target_language = target_language
+        self.batch_size = batch_size
+        self.deadline = deadline
+        self.batches = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, index: int, text: str):
+        with self._lock:
+            segments = self.result_state.translated_segments
+            while len(segments) <= index:
+                segments.append("")
+        self._queue.put((index, text))
+
+    def close(self, timeout: float = 10.0):
+        """Flush pending segments and stop the worker."""
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            flush_at = time.monotonic() + self.deadline
+            while len(batch) < self.batch_size:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            translations = translation_memory.translate(self.client, [text for _, text in batch], self.target_language,
+                                                        from_language=self.source_language, endpoint=TRANSLATOR_ENDPOINT,
+                                                        stats=self.result_state.translation_stats)
+        except Exception:
+            translations = ["[Translation failed]"] * len(batch)
+        self.batches += 1
+        with self._lock:
+            for (index, _), translated_text in zip(batch, translations):
+                self.result_state.translated_segments[index] = translated_text
+        if self.on_result:
+            for (index, _), translated_text in zip(batch, translations):
+                self.on_result(index, translated_text)
+
+class AudioFeed:
+    """Source audio exposed as raw PCM slices for the push stream.
+
+    WAV input is served as memoryview slices of a memory-mapped file (paths /
+    real files) or of the upload's own buffer (BytesIO / UploadedFile.getbuffer)
+    - no intermediate copies. Other containers are decoded incrementally by an
+    ffmpeg subprocess to 16 kHz mono s16le.
+    """
+    def __init__(self, sample_rate: int, bits_per_sample: int, channels: int, chunks: Callable[[int], Iterator], close: Optional[Callable[[], None]] = None):
+        self.sample_rate = sample_rate
+        self.bits_per_sample = bits_per_sample
+        self.channels = channels
+        self.block_align = channels * bits_per_sample // 8
+        self.byte_rate = sample_rate * self.block_align
+        self._chunks = chunks
+        self._close = close
+
+    def chunks(self, size: int) -> Iterator:
+        return self._chunks(size)
+
+    def close(self):
+        if self._close:
+            self._close()
+            self._close = None
+
+    def stream_format(self):
+        return speechsdk.audio.AudioStreamFormat(samples_per_second=self.sample_rate, bits_per_sample=self.bits_per_sample, channels=self.channels)
+
+
+def _wav_layout(buf):
+    """Parse RIFF chunks -> (channels, rate, bits, data_offset, data_len) for PCM WAV, else None."""
+    if len(buf) < 12 or bytes(buf[0:4]) != b"RIFF" or bytes(buf[8:12]) != b"WAVE":
+        return None
+    pos, fmt = 12, None
+    while pos + 8 <= len(buf):
+        chunk_id = bytes(buf[pos:pos + 4])
+        size = struct.unpack_from("<I", buf, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            audio_format, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", buf, body)
+            if audio_format not in (1, 0xFFFE):  # PCM / WAVE_FORMAT_EXTENSIBLE
+                return None
+            fmt = (channels, rate, bits)
+        elif chunk_id == b"data" and fmt:
+            available = len(buf) - body
+            data_len = available if size in (0, 0xFFFFFFFF) else min(size, available)  # streamed WAVs may omit size
+            return fmt + (body, data_len)
+        pos = body + size + (size & 1)
+    return None
+
+
+def _source_buffer(audio_file):
+    """(buffer, closer) over the input without copying where possible."""
+    if isinstance(audio_file, (str, os.PathLike)):
+        f = open(audio_file, "rb")
+        if os.fstat(f.fileno()).st_size == 0:
+            f.close()
+            return memoryview(b""), None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+
+        def closer():
+            view.release()
+            mm.close()
+            f.close()
+        return view, closer
+    if hasattr(audio_file, "getbuffer"):  # BytesIO / Streamlit UploadedFile: shares the upload's memory
+        return audio_file.getbuffer(), None
+    fileno = getattr(audio_file, "fileno", None)
+    if fileno is not None:
+        try:
+            mm = mmap.mmap(fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mm)
+
+            def closer():
+                view.release()
+                mm.close()
+            return view, closer
+        except (OSError, ValueError, io.UnsupportedOperation):
+            pass
+    return memoryview(audio_file.read()), None
+
+
+def open_audio_feed(audio_file) -> AudioFeed:
+    """Build an AudioFeed from a path, file object, BytesIO or Streamlit upload."""
+    buf, closer = _source_buffer(audio_file)
+    layout = _wav_layout(buf)
+    if layout:
+        channels, rate, bits, offset, length = layout
+        data = buf[offset:offset + length]
+
+        def wav_chunks(size):
+            for start in range(0, len(data), size):
+                yield data[start:start + size]
+
+        def close():
+            data.release()  # Derived views must go before the mmap can close
+            buf.release()
+            if closer:
+                closer()
+        return AudioFeed(rate, bits, channels, wav_chunks, close)
+
+    # Non-WAV: streaming decode through ffmpeg (stdout read incrementally)
+    exe = shutil.which("ffmpeg")
+    if not exe:
+        if closer:
+            closer()
+        raise ValueError("Unsupported audio format: only PCM WAV can be streamed without ffmpeg installed")
+    from_path = isinstance(audio_file, (str, os.PathLike))
+    cmd = [exe, "-hide_banner", "-loglevel", "error", "-i", os.fspath(audio_file) if from_path else "pipe:0",
+           "-f", "s16le", "-ac", "1", "-ar", str(DECODE_SAMPLE_RATE), "pipe:1"]
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL if from_path else subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def feed_stdin():
+        try:
+            for start in range(0, len(buf), 1 << 20):
+                proc.stdin.write(buf[start:start + (1 << 20)])
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+    if not from_path:
+        threading.Thread(target=feed_stdin, daemon=True).start()
+
+    def ffmpeg_chunks(size):
         while True:
-            data = wf.readframes(frame_size)
+            data = proc.stdout.read(size)
             if not data:
                 break
-            stream.write(data)
-            if sleep_real_time:
-                time.sleep(frame_duration)
-    stream.close()
+            yield data
 
+    def close():
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        if closer:
+            closer()
+    return AudioFeed(DECODE_SAMPLE_RATE, 16, 1, ffmpeg_chunks, close)
 
-def continuous_transcribe_and_translate(audio_file, source_language: str, target_language: str, enable_translation: bool = True) -> StreamingResult:
-    """Simulate continuous streaming for an uploaded audio file.
 
-    This blocks until all audio is pushed and recognition session completes.
-    Returns a populated StreamingResult with segments (and translations if enabled).
+def _push_stream_writer(feed: AudioFeed, stream: speechsdk.audio.PushAudioInputStream, frame_size: int = 4096, pace: Optional[float] = 1.0,
+                        stop_event: Optional[threading.Event] = None):
+    """Feed audio slices into push stream.
+
+    pace: 1.0 = real time, N = N x faster than real time, None / 0 = unthrottled.
+    Pacing follows an absolute schedule (bytes sent / byte rate) so sleeps never drift.
     """
-    result_state = StreamingResult()
+    chunk_bytes = frame_size * max(1, feed.block_align)
+    write = stream.write
+    copy_slices = False
+    sent = 0
+    started = time.monotonic()
+    try:
+        for data in feed.chunks(chunk_bytes):
+            if stop_event is not None and stop_event.is_set():
+                break
+            if copy_slices:
+                write(bytes(data))
+            else:
+                try:
+                    write(data)
+                except TypeError:  # SDK build that only takes bytes
+                    copy_slices = True
+                    write(bytes(data))
+            sent += len(data)
+            if isinstance(data, memoryview):
+                data.release()
+            if pace and feed.byte_rate:
+                delay = started + sent / (feed.byte_rate * pace) - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        stream.close()
+        feed.close()
+
+
+def stream_transcribe_and_translate(audio_file, source_language: str, target_language: str, enable_translation: bool = True,
+                                   result_state: Optional[StreamingResult] = None, pace: Optional[float] = 1.0,
+                                   stop_event: Optional[threading.Event] = None) -> Iterator[StreamEvent]:
+    """Stream an uploaded audio file through recognition, yielding StreamEvents as they arrive.
+
+    Completion is event driven: the writer closes the push stream at end of audio,
+    the SDK then fires session_stopped / canceled, pending translations are flushed,
+    and the generator returns. result_state (optional) is kept up to date as well.
+    Closing the generator early stops recognition and the writer; setting stop_event
+    (from any thread) ends the audio early, so the session winds down on its own.
+    audio_file: path, file object, BytesIO or Streamlit upload (WAV, or anything
+    ffmpeg decodes). pace: 1.0 real time, N x faster, None / 0 unthrottled.
+    """
+    result_state = result_state if result_state is not None else StreamingResult()
 
     if not SPEECH_KEY:
         result_state.error = "Missing SPEECH_KEY environment variable"
         result_state.done = True
-        return result_state
+        yield StreamEvent(StreamEvent.ERROR, result_state.error)
+        return
+
+    events: "queue.Queue" = queue.Queue()
 
     # Configure speech recognition
     speech_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
@@ -75,7 +359,16 @@ def continuous_transcribe_and_translate(audio_file, source_language: str, target
     speech_config.set_profanity(speechsdk.ProfanityOption.Raw)
     speech_config.output_format = speechsdk.OutputFormat.Detailed
 
-    push_stream = speechsdk.audio.PushAudioInputStream()
+    # Zero-copy audio source (WAV slices / ffmpeg stream) -> push stream in the source's own format
+    try:
+        feed = open_audio_feed(audio_file)
+    except (OSError, ValueError) as e:
+        result_state.error = f"Audio open failed: {e}"
+        result_state.done = True
+        yield StreamEvent(StreamEvent.ERROR, result_state.error)
+        return
+
+    push_stream = speechsdk.audio.PushAudioInputStream(stream_format=feed.stream_format())
     audio_config = speechsdk.audio.AudioConfig(stream=push_stream)
     recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, language=source_language, audio_config=audio_config)
 
@@ -83,56 +376,130 @@ def continuous_transcribe_and_translate(audio_file, source_language: str, target
     translator_client = None
     if enable_translation and TRANSLATOR_KEY:
         try:
-            translator_client = TextTranslationClient(credential=AzureKeyCredential(TRANSLATOR_KEY), region=TRANSLATOR_REGION, endpoint=TRANSLATOR_ENDPOINT)
+            translator_client = azure_transport.shared_translator_client(TRANSLATOR_KEY, TRANSLATOR_REGION, TRANSLATOR_ENDPOINT)
         except Exception as e:
             result_state.error = f"Translator init failed: {e}"
+            events.put(StreamEvent(StreamEvent.ERROR, result_state.error))
+
+    translation_worker = None
+    if translator_client and target_language and target_language != source_language:
+        translation_worker = TranslationWorker(translator_client, result_state, source_language, target_language,
+                                               on_result=lambda i, t: events.put(StreamEvent(StreamEvent.TRANSLATION, t, i)))
+
+    # Callback handlers (SDK threads: only touch result_state + the event queue)
+    first_seen = {}  # Telemetry: first partial / final latency after recognition start
+
+    def mark_first(kind):
+        if kind not in first_seen:
+            first_seen[kind] = time.perf_counter()
+            telemetry.record(f"speech_sdk.first_{kind}", first_seen[kind] - started, source="file")
 
-    # Callback handlers
     def recognizing_cb(evt: speechsdk.SpeechRecognitionEventArgs):
         if evt.result.reason == speechsdk.ResultReason.RecognizingSpeech:
+            mark_first("partial")
             result_state.partial = evt.result.text
+            events.put(StreamEvent(StreamEvent.PARTIAL, evt.result.text))
 
     def recognized_cb(evt: speechsdk.SpeechRecognitionEventArgs):
         if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
             text = evt.result.text
             if text:
+                mark_first("final")
                 result_state.final_segments.append(text)
-                # Translate segment if enabled & available
-                if translator_client and target_language and target_language != source_language:
-                    try:
-                        tr = translator_client.translate(body=[text], to_language=[target_language], from_language=source_language)
-                        translated_text = tr[0]['translations'][0]['text']
-                    except Exception:
-                        translated_text = "[Translation failed]"
-                    result_state.translated_segments.append(translated_text)
+                result_state.partial = ""
+                index = len(result_state.final_segments) - 1
+                events.put(StreamEvent(StreamEvent.FINAL, text, index))
+                # Queue segment for background batch translation (never blocks the SDK thread)
+                if translation_worker:
+                    translation_worker.submit(index, text)
                 elif translator_client is None and enable_translation:
                     result_state.translated_segments.append("[Translator not configured]")
 
-    def session_stopped_cb(evt):
-        result_state.done = True
+    def canceled_cb(evt):
+        details = getattr(evt, "error_details", None) or getattr(getattr(evt, "cancellation_details", None), "error_details", None)
+        if getattr(evt, "reason", None) == speechsdk.CancellationReason.Error or details:
+            result_state.error = f"Recognition canceled: {details}"
+            events.put(StreamEvent(StreamEvent.ERROR, result_state.error))
+        events.put(_SESSION_END)
 
     recognizer.recognizing.connect(recognizing_cb)
     recognizer.recognized.connect(recognized_cb)
-    recognizer.session_stopped.connect(session_stopped_cb)
-
-    # Read uploaded file bytes (assumed WAV) into memory
-    wav_bytes = BytesIO(audio_file.read())
+    recognizer.session_stopped.connect(lambda _: events.put(_SESSION_END))
+    recognizer.canceled.connect(canceled_cb)
 
-    # Writer thread simulates real-time pushing
-    writer_thread = threading.Thread(target=_push_stream_writer, args=(wav_bytes, push_stream))
+    # Writer thread paces the audio (real time by default); closing the stream signals end of audio
+    stop_writer = stop_event if stop_event is not None else threading.Event()
+    writer_thread = threading.Thread(target=_push_stream_writer, args=(feed, push_stream), kwargs={"pace": pace, "stop_event": stop_writer}, daemon=True)
     writer_thread.start()
 
+    started = time.perf_counter()
     recognizer.start_continuous_recognition()
-
-    # Poll until session indicates completion
-    while not result_state.done:
-        # Heuristic: if audio drained and no active partial, request stop
-        if not writer_thread.is_alive() and not result_state.partial:
-            time.sleep(0.5)  # Allow final callbacks to fire
+    try:
+        while True:
+            event = events.get()
+            if event is _SESSION_END:
+                break
+            yield event
+        # Session over: flush outstanding translations, then deliver their events
+        if translation_worker:
+            translation_worker.close()
+            translation_worker = None
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                break
+            if event is not _SESSION_END:
+                yield event
+    finally:
+        stop_writer.set()
+        try:
             recognizer.stop_continuous_recognition()
-            result_state.done = True
-            break
-        time.sleep(0.2)
+        except Exception:
+            pass
+        writer_thread.join(timeout=2)
+        if translation_worker:
+            translation_worker.close()
+        result_state.done = True
+        telemetry.add_span("speech_sdk.session", started, time.perf_counter(), segments=len(result_state.final_segments), pace=pace)
+
+
+async def astream_transcribe_and_translate(audio_file, source_language: str, target_language: str, enable_translation: bool = True,
+                                           result_state: Optional[StreamingResult] = None, pace: Optional[float] = 1.0) -> AsyncIterator[StreamEvent]:
+    """Async iterator over the same events (blocking waits and shutdown run in the default executor).
+
+    When the consumer stops early (break / cancellation) the audio is ended, the
+    in-flight next() is awaited and the generator is closed off the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    gen = stream_transcribe_and_translate(audio_file, source_language, target_language, enable_translation, result_state, pace,
+                                          stop_event=stop)
+    pending = None
+    try:
+        while True:
+            pending = loop.run_in_executor(None, next, gen, None)
+            event = await asyncio.shield(pending)  # Cancelling the consumer must not orphan the running next()
+            pending = None
+            if event is None:
+                break
+            yield event
+    finally:
+        stop.set()
+        if pending is not None:
+            await asyncio.wait([pending])  # The generator is still executing; it returns once the session winds down
+        await loop.run_in_executor(None, gen.close)
+
+
+def continuous_transcribe_and_translate(audio_file, source_language: str, target_language: str, enable_translation: bool = True,
+                                        pace: Optional[float] = 1.0) -> StreamingResult:
+    """Simulate continuous streaming for an uploaded audio file.
 
-    writer_thread.join(timeout=2)
+    This blocks until all audio is pushed and recognition session completes.
+    Returns a populated StreamingResult with segments (and translations if enabled).
+    Thin wrapper over stream_transcribe_and_translate.
+    """
+    result_state = StreamingResult()
+    for _ in stream_transcribe_and_translate(audio_file, source_language, target_language, enable_translation, result_state, pace):
+        pass
     return result_state
@@ -0,0 +1,70 @@
+import threading
+from typing import Any, Callable, Dict
+
+import telemetry
+
+"""resources.py
+Process-wide cache for expensive shared objects (SDK clients and their credentials).
+
+- shared(name, factory): factory runs on first use only - once per process even when
+  several threads / Streamlit sessions ask at the same moment - and every later call
+  gets the same object; construction time is recorded as a resource.build span
+- load_env(): loads .env (python-dotenv) once per process; modules that read settings
+  at import call it first, every later call is a no-op
+- drop(name) / clear(): forget cached objects (close() is called when they have one),
+  e.g. after rotating credentials
+
+Clients built here must be safe to share across threads (Azure SDK and OpenAI clients are).
+"""
+
+_resources: Dict[str, Any] = {}
+_building: Dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env():
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+
+def shared(name: str, factory: Callable[[], Any]) -> Any:
+    """The cached object for name, built with factory() on first use."""
+    try:
+        return _resources[name]
+    except KeyError:
+        pass
+    with _lock:
+        build_lock = _building.setdefault(name, threading.Lock())
+    with build_lock:  # Per-name lock: other resources can build concurrently
+        if name not in _resources:
+            with telemetry.span("resource.build", resource=name.split(":", 1)[0]):
+                _resources[name] = factory()
+        return _resources[name]
+
+
+def drop(name: str):
+    with _lock:
+        obj = _resources.pop(name, None)
+    close = getattr(obj, "close", None)
+    if callable(close):
+        close()
+
+
+def clear():
+    with _lock:
+        names = list(_resources)
+    for name in names:
+        drop(name)
+
+
+def cached() -> Dict[str, str]:
+    """name -> type of every object built so far (diagnostics)."""
+    with _lock:
+        return {name: type(obj).__name__ for name, obj in _resources.items()}
@@ -0,0 +1,137 @@
+import threading
+import time
+from typing import Callable, Optional
+
+import telemetry
+
+"""rolling_summary.py
+Incremental summary of a live session, maintained off the UI thread.
+
+- RollingSummarizer watches a CaptionFeed; every `every_segments` new finals (or
+  `every_seconds` with anything pending) it summarizes only the delta since the last
+  checkpoint and merges it into the running summary (llm_analysis.merge_summary).
+  LLM cost grows with new content, not quadratically with meeting length.
+- finish() drains whatever is still pending after Stop, so the full-meeting summary
+  is ready within one merge call.
+- Failed merges keep the checkpoint (the delta is retried on the next trigger).
+"""
+
+ROLLING_EVERY_SEGMENTS = 20
+ROLLING_EVERY_SECONDS = 60.0
+ROLLING_MAX_STEP_SEGMENTS = 200  # Cap per merge call (e.g. after recovering a long session)
+
+Merger = Callable[[str, str], str]  # (summary so far, new transcript text) -> updated summary
+
+
+def _default_merger(detected_language: str) -> Merger:
+    def merge(summary: str, new_text: str) -> str:
+        import llm_analysis  # Imported lazily: creates the OpenAI client
+        return llm_analysis.merge_summary(summary, new_text, detected_language)
+    return merge
+
+
+class RollingSummarizer:
+    """Background delta summarizer over a CaptionFeed (reads finals via feed.page)."""
+
+    def __init__(self, feed, every_segments: int = ROLLING_EVERY_SEGMENTS, every_seconds: float = ROLLING_EVERY_SECONDS,
+                 merger: Optional[Merger] = None, detected_language: str = "en-US",
+                 summary: str = "", checkpoint: int = 0, max_step_segments: int = ROLLING_MAX_STEP_SEGMENTS):
+        self.feed = feed
+        self.every_segments = max(1, every_segments)
+        self.every_seconds = every_seconds
+        self.merger = merger or _default_merger(detected_language)
+        self.max_step_segments = max(1, max_step_segments)
+        self.summary = summary
+        self.checkpoint = checkpoint  # Segments [0, checkpoint) are folded into summary
+        self.version = 0
+        self.merges = 0
+        self.error: Optional[str] = None
+        self.busy = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._draining = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_merge = time.monotonic()
+
+    # ----- Control (UI thread) -----
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._draining.clear()
+        self._last_merge = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="rolling-summary", daemon=True)
+        self._thread.start()
+
+    def finish(self, timeout: Optional[float] = None) -> str:
+        """Fold everything still pending into the summary, stop the worker; returns the summary."""
+        self._draining.set()
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+        else:
+            self._thread.join(timeout)
+        return self.summary
+
+    def stop(self):
+        """Stop without draining (pending segments stay unsummarized)."""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+
+    @property
+    def pending(self) -> int:
+        return max(0, self.feed.total_segments - self.checkpoint)
+
+    def state(self):
+        with self._lock:
+            return {"summary": self.summary, "checkpoint": self.checkpoint, "version": self.version,
+                    "pending": self.pending, "busy": self.busy, "error": self.error, "merges": self.merges}
+
+    # ----- Worker -----
+    def _due(self) -> bool:
+        pending = self.pending
+        if pending >= self.every_segments:
+            return True
+        return pending > 0 and time.monotonic() - self._last_merge >= self.every_seconds
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._draining.is_set():
+                self._drain()
+                return
+            if self._due():
+                if not self._step() and not self._draining.is_set():
+                    self._stop.wait(min(self.every_seconds, 5.0))  # Back off after a failed merge
+                continue
+            # Wake on new finals, on finish(), or when the time trigger comes due
+            wait = max(0.05, min(1.0, self.every_seconds - (time.monotonic() - self._last_merge)))
+            self.feed.wait(self.feed.version, timeout=wait)
+
+    def _drain(self):
+        while self.pending and not self._stop.is_set():
+            if not self._step():
+                return
+
+    def _step(self) -> bool:
+        start = self.checkpoint
+        count = min(self.pending, self.max_step_segments)
+        texts = self.feed.page(start, count)
+        with self._lock:
+            self.busy = True
+        try:
+            with telemetry.span("live.rolling_summary", start=start, segments=count):
+                summary = self.merger(self.summary, " ".join(texts).strip()) if texts else self.summary
+        except Exception as e:
+            with self._lock:
+                self.busy = False
+                self.error = f"Summary update failed: {e}"
+            return False
+        with self._lock:
+            self.summary = summary or self.summary
+            self.checkpoint = start + count
+            self.version += 1
+            self.merges += 1
+            self.busy = False
+            self.error = None
+        self._last_merge = time.monotonic()
+        return True
@@ -1,8 +1,14 @@
 """Scenario registry for AVIA modular demos.
-Add new scenario modules here and register them in SCENARIOS dict.
+
+Scenarios are declared here with their metadata and module path; the module itself
+(and whatever SDKs it pulls in) is imported only when the scenario is first rendered.
+The module's @register_scenario(key=...) decorator then binds its render function.
+Modules registered with full metadata and imported directly still work as before.
 """
-from typing import Dict, Callable
-import streamlit as st
+import importlib
+from typing import Dict, Callable, Optional
+
+import telemetry
 
 # Type alias for scenario render function
 ScenarioFn = Callable[[], None]
@@ -10,17 +16,78 @@ ScenarioFn = Callable[[], None]
 SCENARIOS: Dict[str, Dict[str, object]] = {}
 
 
-def register_scenario(key: str, title: str, description: str, keywords: str):
-    def decorator(func: ScenarioFn):
+def _lazy_render(key: str, module: str) -> ScenarioFn:
+    def render():
+        with telemetry.span("scenario.import", scenario=key):
+            importlib.import_module(module)
+        func = SCENARIOS[key]["render"]
+        if func is render:
+            raise RuntimeError(f"{module} does not register scenario {key!r}")
+        return func()
+    return render
+
+
+def register_scenario(key: str, title: Optional[str] = None, description: Optional[str] = None,
+                      keywords: Optional[str] = None, module: Optional[str] = None):
+    """Decorator registering a scenario's render function.
+
+    With module="scenarios.x" it declares the scenario instead (metadata now, import
+    on first render) and returns None. The decorator form may omit metadata that was
+    declared already.
+    """
+    if module is not None:
         SCENARIOS[key] = {
             "title": title,
             "description": description,
             "keywords": keywords,
-            "render": func,
+            "module": module,
+            "render": _lazy_render(key, module),
         }
+        return None
+
+    def decorator(func: ScenarioFn):
+        entry = dict(SCENARIOS.get(key) or {"title": None, "description": None, "keywords": None})
+        for name, value in (("title", title), ("description", description), ("keywords", keywords)):
+            if value is not None:
+                entry[name] = value
+        if entry["title"] is None:
+            raise ValueError(f"scenario {key!r} has no title (declare it or pass metadata)")
+        entry["render"] = func
+        SCENARIOS[key] = entry
         return func
     return decorator
 
 
 def list_scenarios():
     return SCENARIOS
+
+
+# ===== Built-in scenarios (imported on first render) =====
+register_scenario(
+    key="live_mic",
+    title="Live Microphone Transcription + Translation",
+    description="Continuously transcribe local microphone audio with optional real-time translation.",
+    keywords="Azure Speech SDK - Continuous Recognition; Azure Translator",
+    module="scenarios.live_mic",
+)
+register_scenario(
+    key="audio_file_summary",
+    title="Upload Audio: Transcription + Summary",
+    description="Upload an audio file for multi-language transcription and AI-generated summary.",
+    keywords="Azure Speech - Fast Transcription; Azure OpenAI",
+    module="scenarios.audio_file_summary",
+)
+register_scenario(
+    key="image_analysis",
+    title="Image Understanding + Prompt",
+    description="Upload an image and run GPT-4o vision with optional custom analysis prompt.",
+    keywords="Azure OpenAI - Vision",
+    module="scenarios.image_analysis",
+)
+register_scenario(
+    key="meeting_search",
+    title="Search Meetings",
+    description="Find where a topic came up across all transcribed meetings and summaries; jump to the moment and speaker.",
+    keywords="SQLite FTS5 - BM25; Local index",
+    module="scenarios.meeting_search",
+)
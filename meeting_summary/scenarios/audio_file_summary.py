@@ -2,26 +2,68 @@ from . import register_scenario
 import streamlit as st
 import speech_fast_transcription
 import llm_analysis
+import search_index
+import async_pipeline
+from disk_cache import make_key
 
-@register_scenario(
-    key="audio_file_summary",
-    title="Upload Audio: Transcription + Summary",
-    description="Upload an audio file for multi-language transcription and AI-generated summary.",
-    keywords="Azure Speech - Fast Transcription; Azure OpenAI"
-)
+
+def _index_upload(name, text, transcript, language, summary):
+    search_index.index_quietly(f"upload:{name}:{make_key(text)[:16]}", search_index.segments_from_transcript(transcript),
+                               "upload", title=name, language=language, summary=summary)
+
+
+def _run_many(files, user_prompt, chunked, hedged, trim_silence):
+    """Several uploads: async pipeline (file N+1 transcribes while file N is summarized); results shown as they finish."""
+    progress = st.progress(0.0, text=f"0 / {len(files)} files")
+    finished = []
+
+    def show(item):
+        finished.append(item)
+        progress.progress(len(finished) / len(files), text=f"{len(finished)} / {len(files)} files")
+        if item.error:
+            st.error(f"{item.name}: {item.stage} failed ({item.error})")
+            return
+        _index_upload(item.name, item.text, item.transcript, item.language, item.summary)
+        with st.expander(f"{item.name} ({item.language})", expanded=False):
+            st.caption(item.transcript.summary())
+            st.markdown(item.summary)
+            st.download_button("Download Transcription", item.text, file_name=f"{item.name}.transcription.txt", key=f"t{item.index}")
+            st.download_button("Download Summary", item.summary, file_name=f"{item.name}.summary.txt", key=f"s{item.index}")
+
+    async_pipeline.run([(f.name, f) for f in files], user_prompt, on_result=show,
+                       chunked=chunked, hedged=hedged, trim_silence=trim_silence)
+    ok = sum(1 for item in finished if not item.error)
+    st.success(f"Done: {ok} / {len(files)} files")
+
+@register_scenario(key="audio_file_summary")  # Metadata declared in scenarios/__init__.py
 def run():
-    audio_file = st.file_uploader("Select audio", type=["wav","mp3","m4a"], help="wav/mp3/m4a")
+    audio_files = st.file_uploader("Select audio", type=["wav","mp3","m4a"], help="wav/mp3/m4a; several files are processed as an overlapping pipeline",
+                                   accept_multiple_files=True)
     user_prompt = st.text_area("Custom Summary Prompt (optional)")
+    chunked = st.checkbox("Parallel chunked transcription (long WAV recordings)", value=False)
+    trim_silence = st.checkbox("Trim leading / trailing silence before upload", value=False)
+    hedged = st.checkbox("Hedged fallback (race non-diarized request if primary is slow)", value=False)
 
-    if st.button("Process", disabled=not audio_file):
+    if st.button("Process", disabled=not audio_files):
+        if len(audio_files) > 1:
+            _run_many(audio_files, user_prompt, chunked, hedged, trim_silence)
+            return
+        audio_file = audio_files[0]
         with st.spinner("Transcribing..."):
-            result, detected_lang = speech_fast_transcription.fast_transcript(audio_file)
+            result, detected_lang, transcript = speech_fast_transcription.fast_transcript(audio_file, chunked=chunked, hedged=hedged, trim_silence=trim_silence, structured=True)
         if not result:
             st.error("Transcription failed"); return
         st.success(f"Done (language: {detected_lang})")
+        st.caption(transcript.summary())
+        cache_stats = speech_fast_transcription.transcription_cache.stats()
+        st.caption(f"Transcription cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
         with st.expander("Raw Transcription", expanded=False): st.write(result)
+        st.markdown("### Summary")
+        stats = llm_analysis.StreamStats()
         with st.spinner("Summarizing..."):
-            summary = llm_analysis.analysis_text(user_prompt, f"Audio transcription: {result}", detected_lang)
-        st.markdown("### Summary"); st.write(summary)
+            summary = st.write_stream(llm_analysis.analysis_text_stream(user_prompt, f"Audio transcription: {result}", detected_lang, stats=stats))
+        st.caption(stats.summary())
+        _index_upload(audio_file.name, result, transcript, detected_lang, summary)
         st.download_button("Download Transcription", result, file_name="transcription.txt")
+        st.download_button("Download Structured Transcript", transcript.to_bytes(), file_name="transcription.avtr")
         st.download_button("Download Summary", summary, file_name="summary.txt")
@@ -1,25 +1,22 @@
 from . import register_scenario
 import streamlit as st
-from llm_analysis import analysis_image  # fixed absolute import to avoid relative import error
+from llm_analysis import analysis_image_stream, StreamStats  # fixed absolute import to avoid relative import error
 
-@register_scenario(
-    key="image_analysis",
-    title="Image Understanding + Prompt",
-    description="Upload an image and run GPT-4o vision with optional custom analysis prompt.",
-    keywords="Azure OpenAI - Vision"
-)
+@register_scenario(key="image_analysis")  # Metadata declared in scenarios/__init__.py
 def run():
     st.subheader("Image Analysis")
-    uploaded = st.file_uploader("Upload image", type=["png", "jpg", "jpeg", "gif", "webp"])
+    uploaded = st.file_uploader("Upload image(s)", type=["png", "jpg", "jpeg", "gif", "webp"], accept_multiple_files=True)
     user_prompt = st.text_area("Custom Analysis Prompt (optional)", placeholder="e.g., Identify UI usability issues and describe visual hierarchy.", height=100)
+    detail = st.radio("Detail", ["high", "low"], horizontal=True, help="low: downscaled to 512px, faster and cheaper; high: up to 2048px (768px short side)")
     col1, col2 = st.columns([1,1])
     if uploaded:
         with col1:
-            st.image(uploaded, caption="Preview", use_column_width=True)
+            st.image(uploaded, caption=["Preview"] * len(uploaded), use_column_width=True)
     if st.button("Analyze", type="primary", disabled=not uploaded):
+        st.markdown("### Result")
+        stats = StreamStats()
         with st.spinner("Analyzing..."):
-            result = analysis_image(uploaded, user_prompt=user_prompt)
+            result = st.write_stream(analysis_image_stream(uploaded, user_prompt=user_prompt, stats=stats, detail=detail))
         st.success("Analysis complete")
-        st.markdown("### Result")
-        st.write(result)
+        st.caption(stats.summary())
         st.download_button("Download Result", result, file_name="image_analysis.txt")
@@ -3,49 +3,240 @@
 Key behaviors:
   * Azure Speech SDK continuous recognition for partial + final results.
   * Real-time terminal streaming (direct callback -> stdout) for minimal latency.
-  * Streamlit UI updated via an event queue (avoids touching session state inside SDK threads).
-  * One-shot full translation only after STOP (clearer, stable output).
+  * SDK callbacks write into a CaptionFeed (live_captions.py); only the caption
+    fragment re-runs on a timer and renders a bounded tail - no full-script reruns,
+    so server cost per listener stays flat as the meeting grows.
+  * One-shot full translation only after STOP (clearer, stable output), segment by
+    segment through the shared translation memory (translation_memory.py).
   * Optional TrueText post-processing (may slow partial updates slightly).
+  * Simulated mode (Advanced) drives the same path from a scripted FakeRecognizer.
+  * Finals go to a per-session journal (session_journal.py, background writer); the
+    session ID sits in the URL (?session=...) so a reloaded tab recovers its transcript.
+  * Optional rolling summary (rolling_summary.py): a background worker folds each batch
+    of new finals into a running summary, so the meeting summary is ready right after Stop.
+  * Memory stays bounded for multi-hour sessions: the feed keeps the newest segments
+    only and pages older ones back from the journal ("Earlier transcript").
 
 Simplified: removed old mirror function & extraneous session keys; terminal streaming is always on.
 """
 
 from . import register_scenario
 import streamlit as st
-import os, queue, time, sys, threading
+import os, time, sys, threading
+from functools import partial
 import azure.cognitiveservices.speech as speechsdk
-from azure.ai.translation.text import TextTranslationClient
-from azure.core.credentials import AzureKeyCredential
+import azure_transport
+import telemetry
+from live_captions import CaptionFeed, attach, demo_recognizer, render_caption_html
+from rolling_summary import ROLLING_EVERY_SECONDS, ROLLING_EVERY_SEGMENTS, RollingSummarizer
+import session_journal
+import translation_memory
+import search_index
 
-LOG_FILE = os.path.join(os.getcwd(), 'live_mic_log.txt')
+CAPTION_REFRESH_INTERVAL = 0.15  # seconds between caption fragment refreshes while running
+EARLIER_PAGE_SEGMENTS = 50       # segments per page in the "Earlier transcript" expander
+LIVE_SOURCE_LANGUAGE = "en-US"   # recognition language; also the translation memory source key
 
-PARTIAL_RERUN_INTERVAL = 0.08   # minimum time between forced reruns on new partial
-PASSIVE_REFRESH_INTERVAL = 0.12 # background refresh cadence while running
+# st.fragment (Streamlit >= 1.37; experimental_fragment before) -> partial reruns
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
 
 
-@register_scenario(
-    key="live_mic",
-    title="Live Microphone Transcription + Translation",
-    description="Continuously transcribe local microphone audio with optional real-time translation.",
-    keywords="Azure Speech SDK - Continuous Recognition; Azure Translator"
-)
+def _build_recognizer():
+    """Speech SDK recognizer on the default microphone (None + error shown on failure)."""
+    key, region = os.getenv('SPEECH_KEY'), os.getenv('SPEECH_REGION','eastus')
+    if not key:
+        st.error("SPEECH_KEY missing")
+        return None
+    cfg = speechsdk.SpeechConfig(subscription=key, region=region)
+    if st.session_state.live_true_text:
+        cfg.set_property(speechsdk.PropertyId.SpeechServiceResponse_PostProcessingOption, "TrueText")
+    if st.session_state.live_translate_enabled:
+        t_key = os.getenv('TRANSLATOR_KEY')
+        if t_key:
+            try:
+                st.session_state.live_translator_client = azure_transport.shared_translator_client(t_key, os.getenv('TRANSLATOR_REGION') or region, os.getenv('TRANSLATOR_ENDPOINT','https://api.cognitive.microsofttranslator.com'))
+            except Exception as te: st.warning(f"Translator init failed: {te}")
+        else:
+            st.warning("Translator key missing")
+            st.session_state.live_translate_enabled = False
+    return speechsdk.SpeechRecognizer(speech_config=cfg, language=LIVE_SOURCE_LANGUAGE, audio_config=speechsdk.audio.AudioConfig(use_default_microphone=True))
+
+
+def _attach_terminal(rec):
+    """Direct terminal streaming (low latency) – isolated from Streamlit session state."""
+    term_lock = threading.Lock()
+    term_cfg = {'last_inline_len': 0, 'started': time.perf_counter(), 'first_partial': False}
+
+    def _cb_recognizing(evt):
+        res = evt.result
+        if not res or res.reason != speechsdk.ResultReason.RecognizingSpeech:
+            return
+        line = res.text
+        if not line:
+            return
+        with term_lock:
+            if not term_cfg['first_partial']:
+                term_cfg['first_partial'] = True
+                telemetry.record("speech_sdk.first_partial", time.perf_counter() - term_cfg['started'], source="mic")
+            prev = term_cfg['last_inline_len']
+            pad = ' ' * (prev - len(line)) if prev > len(line) else ''
+            try:
+                sys.stdout.write('\r' + line + pad)
+                sys.stdout.flush()
+            except Exception:
+                pass
+            term_cfg['last_inline_len'] = len(line)
+
+    def _cb_recognized(evt):
+        res = evt.result
+        if not res or res.reason != speechsdk.ResultReason.RecognizedSpeech or not res.text:
+            return
+        text = res.text
+        with term_lock:
+            if term_cfg['last_inline_len']:
+                try:
+                    sys.stdout.write('\r' + ' ' * term_cfg['last_inline_len'] + '\r')
+                    sys.stdout.flush()
+                except Exception:
+                    pass
+                term_cfg['last_inline_len'] = 0
+            try:
+                print(text)
+            except Exception:
+                pass
+
+    rec.recognizing.connect(_cb_recognizing)
+    rec.recognized.connect(_cb_recognized)
+
+
+def _attach_journal(rec, journal):
+    """Queue each final into the session journal (enqueue only; the writer thread does the I/O)."""
+    def _cb_journal(evt):
+        res = evt.result
+        if not res or res.reason != speechsdk.ResultReason.RecognizedSpeech or not res.text:
+            return
+        offset, duration = getattr(res, 'offset', None), getattr(res, 'duration', None)
+        journal.append(res.text, offset_ms=offset / 10000 if offset is not None else None,
+                       duration_ms=duration / 10000 if duration is not None else None)  # SDK ticks are 100 ns
+    rec.recognized.connect(_cb_journal)
+
+
+def _set_session(session_id):
+    st.session_state.live_session_id = session_id
+    params = getattr(st, "query_params", None)
+    if params is None:
+        return
+    try:
+        if session_id: params["session"] = session_id
+        elif "session" in params: del params["session"]
+    except Exception:
+        pass
+
+
+def _recover_session(feed: CaptionFeed, session_id):
+    """Load a journaled session into the feed; returns the number of segments recovered."""
+    loaded = session_journal.load_session(session_id)
+    if loaded is None:
+        return 0
+    feed.restore(loaded.texts, pager=partial(session_journal.read_segments, session_id))
+    _set_session(session_id)
+    return len(loaded.segments)
+
+
+def _render_captions():
+    """Caption region; the only part of the page that refreshes while recognition runs."""
+    feed: CaptionFeed = st.session_state.live_feed
+    snap = feed.snapshot()
+    if snap.running != st.session_state.live_running:
+        # Session ended on its own (end of script / cancel) -> one full rerun to reset the controls
+        st.session_state.live_running = snap.running
+        if not snap.running:
+            _end_session()
+        st.rerun()
+    if snap.running:
+        st.markdown("<div style='display:inline-flex;align-items:center;gap:.5rem;background:#ffeef5;border:1px solid #ffb9d0;color:#c5004f;font-size:.7rem;font-weight:600;padding:.4rem .7rem;border-radius:30px;margin:.4rem 0 .4rem'>🔴 Listening...</div>", unsafe_allow_html=True)
+    st.markdown("**Transcription (live)**" if snap.running else "**Final Transcription**")
+    st.markdown(f"<div class='live-trans-box'>{render_caption_html(snap)}</div>", unsafe_allow_html=True)
+    if snap.error:
+        st.warning(snap.error)
+    summarizer = st.session_state.live_summarizer
+    if snap.running and summarizer is not None:
+        state = summarizer.state()
+        status = "updating…" if state['busy'] else f"{state['pending']} new segments pending"
+        st.markdown(f"**Running summary** <span class='live-empty'>(through segment {state['checkpoint']}; {status})</span>", unsafe_allow_html=True)
+        if state['summary']:
+            st.markdown(state['summary'])  # LLM output from transcribed speech: never rendered as HTML
+        else:
+            st.markdown("<span class='live-empty'>First update after a few segments.</span>", unsafe_allow_html=True)
+        if state['error']:
+            st.caption(state['error'])
+
+
+def _end_session():
+    """Recognition stopped: close the journal, finish the rolling summary, index the session for search."""
+    if st.session_state.live_journal:
+        st.session_state.live_journal.close()
+        st.session_state.live_journal = None
+    summarizer = st.session_state.live_summarizer
+    if summarizer is not None:
+        with st.spinner("Finishing summary..."):
+            summarizer.finish(timeout=60)
+    session_id = st.session_state.live_session_id
+    loaded = session_journal.load_session(session_id) if session_id and search_index.SEARCH_INDEX_ENABLED else None
+    if loaded is not None and loaded.segments:
+        search_index.index_live_quietly(loaded, summarizer.summary if summarizer else None)
+
+
+def _drop_summarizer():
+    if st.session_state.live_summarizer is not None:
+        st.session_state.live_summarizer.stop()
+        st.session_state.live_summarizer = None
+
+
+def _render_earlier(feed: CaptionFeed):
+    """Page through segments older than the caption tail (read back from the journal when evicted)."""
+    earlier = feed.total_segments - feed.tail_segments
+    if earlier <= 0:
+        return
+    with st.expander(f"Earlier transcript ({earlier} segments)", expanded=False):
+        pages = (earlier + EARLIER_PAGE_SEGMENTS - 1) // EARLIER_PAGE_SEGMENTS
+        page = st.number_input("Page", min_value=1, max_value=pages, value=pages, step=1)
+        start = (int(page) - 1) * EARLIER_PAGE_SEGMENTS
+        texts = feed.page(start, min(EARLIER_PAGE_SEGMENTS, earlier - start))
+        st.caption(f"Segments {start + 1}–{start + len(texts)} of {feed.total_segments}")
+        st.text("\n".join(texts) or "(not available)")
+
+
+@register_scenario(key="live_mic")  # Metadata declared in scenarios/__init__.py
 def run():
     # --- State initialization ---
     defaults = {
-        'live_segments': [],
-        'live_partial': '',
+        'live_feed': None,
         'live_running': False,
         'live_recognizer': None,
-        'live_queue': queue.Queue(),
-        'live_last_refresh': 0.0,
         'live_translate_enabled': False,
         'live_target_lang': 'zh-CN',
         'live_translator_client': None,
         'live_full_translation': None,
-        'live_true_text': False
+        'live_translation_stats': None,
+        'live_true_text': False,
+        'live_simulated': False,
+        'live_session_id': None,
+        'live_journal': None,
+        'live_summary_enabled': False,
+        'live_summary_every': ROLLING_EVERY_SEGMENTS,
+        'live_summary_seconds': int(ROLLING_EVERY_SECONDS),
+        'live_summarizer': None
     }
     for k, v in defaults.items():
         st.session_state.setdefault(k, v)
+    if st.session_state.live_feed is None:
+        st.session_state.live_feed = CaptionFeed()
+        # Fresh browser session: recover the transcript named in the URL (reload / crashed tab)
+        requested = (getattr(st, "query_params", None) or {}).get("session")
+        if requested and _recover_session(st.session_state.live_feed, requested):
+            st.info(f"Recovered session {requested}")
+    feed: CaptionFeed = st.session_state.live_feed
 
     # --- Translation controls ---
     with st.expander("Translation", expanded=False):
@@ -56,130 +247,80 @@ def run():
             disabled=not st.session_state.live_translate_enabled
         )
 
+    with st.expander("Rolling summary", expanded=False):
+        st.session_state.live_summary_enabled = st.checkbox("Summarize while recording", value=st.session_state.live_summary_enabled,
+                                                            disabled=st.session_state.live_running)
+        r1, r2 = st.columns(2)
+        st.session_state.live_summary_every = r1.number_input("Every N segments", min_value=1, max_value=500, value=st.session_state.live_summary_every,
+                                                              disabled=st.session_state.live_running)
+        st.session_state.live_summary_seconds = r2.number_input("Or every T seconds", min_value=5, max_value=3600, value=st.session_state.live_summary_seconds,
+                                                                disabled=st.session_state.live_running)
+        st.caption("Only the new segments since the last update are sent, merged into the running summary.")
+
     with st.expander("Advanced", expanded=False):
         st.session_state.live_true_text = st.checkbox("Enable TrueText post-processing (may slow partial captions)", value=st.session_state.live_true_text)
+        st.session_state.live_simulated = st.checkbox("Simulated recognizer (scripted captions, no microphone)", value=st.session_state.live_simulated)
         st.caption("Terminal streaming is always ON.")
+        sessions = session_journal.list_sessions()
+        if sessions and not st.session_state.live_running:
+            pick = st.selectbox("Recent sessions", [s['session_id'] for s in sessions],
+                                format_func=lambda sid: f"{sid}{' (current)' if sid == st.session_state.live_session_id else ''}")
+            if st.button("Load session"):
+                st.session_state.live_full_translation = None
+                _drop_summarizer()
+                st.success(f"Loaded {_recover_session(feed, pick)} segments")
 
     c1, c2, c3 = st.columns([1,1,2])
     start = c1.button("▶️ Start", disabled=st.session_state.live_running)
     stop  = c2.button("🛑 Stop", disabled=not st.session_state.live_running)
     if c3.button("🧹 Clear"):
-        st.session_state.live_segments = []
-        st.session_state.live_partial = ''
+        feed.clear()
         st.session_state.live_full_translation = None
+        _drop_summarizer()
+        _set_session(None)  # Next Start opens a new journal
 
     if start and not st.session_state.live_running:
-        key, region = os.getenv('SPEECH_KEY'), os.getenv('SPEECH_REGION','eastus')
-        if not key: st.error("SPEECH_KEY missing")
-        else:
-            try:
-                cfg = speechsdk.SpeechConfig(subscription=key, region=region)
-                if st.session_state.live_true_text:
-                    cfg.set_property(speechsdk.PropertyId.SpeechServiceResponse_PostProcessingOption, "TrueText")
-                rec = speechsdk.SpeechRecognizer(speech_config=cfg, language="en-US", audio_config=speechsdk.audio.AudioConfig(use_default_microphone=True))
-                if st.session_state.live_translate_enabled:
-                    t_key = os.getenv('TRANSLATOR_KEY')
-                    if t_key:
-                        try:
-                            st.session_state.live_translator_client = TextTranslationClient(credential=AzureKeyCredential(t_key), region=os.getenv('TRANSLATOR_REGION') or region, endpoint=os.getenv('TRANSLATOR_ENDPOINT','https://api.cognitive.microsofttranslator.com'))
-                        except Exception as te: st.warning(f"Translator init failed: {te}")
-                    else:
-                        st.warning("Translator key missing")
-                        st.session_state.live_translate_enabled = False
+        try:
+            rec = demo_recognizer() if st.session_state.live_simulated else _build_recognizer()
+            if rec is not None:
                 # reset any previous full translation
                 st.session_state.live_full_translation = None
-                q = st.session_state.live_queue
-                # Queue population for UI (avoid touching Streamlit in background threads except via queue)
-                rec.recognizing.connect(
-                    lambda e: q.put(('partial', e.result.text)) if e.result.reason == speechsdk.ResultReason.RecognizingSpeech else None
-                )
-                rec.recognized.connect(
-                    lambda e: q.put(('final', e.result.text)) if e.result.reason == speechsdk.ResultReason.RecognizedSpeech and e.result.text else None
-                )
-
-                # Direct terminal streaming (low latency) – isolated from Streamlit session state
-                term_lock = threading.Lock()
-                term_cfg = {'last_inline_len': 0}
-
-                def _cb_recognizing(evt: speechsdk.SessionEventArgs):
-                    res = evt.result
-                    if not res or res.reason != speechsdk.ResultReason.RecognizingSpeech:
-                        return
-                    line = res.text
-                    if not line:
-                        return
-                    with term_lock:
-                        prev = term_cfg['last_inline_len']
-                        pad = ' ' * (prev - len(line)) if prev > len(line) else ''
-                        try:
-                            sys.stdout.write('\r' + line + pad)
-                            sys.stdout.flush()
-                        except Exception:
-                            pass
-                        term_cfg['last_inline_len'] = len(line)
-
-                def _cb_recognized(evt: speechsdk.SessionEventArgs):
-                    res = evt.result
-                    if not res or res.reason != speechsdk.ResultReason.RecognizedSpeech or not res.text:
-                        return
-                    text = res.text
-                    with term_lock:
-                        if term_cfg['last_inline_len']:
-                            try:
-                                sys.stdout.write('\r' + ' ' * term_cfg['last_inline_len'] + '\r')
-                                sys.stdout.flush()
-                            except Exception:
-                                pass
-                            term_cfg['last_inline_len'] = 0
-                        try:
-                            print(text)
-                        except Exception:
-                            pass
-                        try:
-                            with open(LOG_FILE, 'a', encoding='utf-8') as lf:
-                                lf.write(text + '\n')
-                        except Exception:
-                            pass
-
-                rec.recognizing.connect(_cb_recognizing)
-                rec.recognized.connect(_cb_recognized)
-                rec.session_stopped.connect(lambda _: q.put(('stopped', None)))
-                rec.canceled.connect(lambda _: q.put(('stopped', None)))
+                # SDK threads only touch the feed + journal queue (never Streamlit state)
+                journal = session_journal.SessionJournal(st.session_state.live_session_id, meta={
+                    'source': 'simulated' if st.session_state.live_simulated else 'microphone', 'language': LIVE_SOURCE_LANGUAGE})
+                session_journal.prune(keep=journal.session_id)
+                _set_session(journal.session_id)
+                st.session_state.live_journal = journal
+                feed.pager = journal.read_segments
+                attach(rec, feed)
+                _attach_terminal(rec)
+                _attach_journal(rec, journal)
+                feed.start()
+                if st.session_state.live_summary_enabled:
+                    # Resuming the same session continues from the previous summary + checkpoint
+                    previous = st.session_state.live_summarizer
+                    if previous is not None:
+                        previous.stop()
+                    summarizer = RollingSummarizer(feed, int(st.session_state.live_summary_every), float(st.session_state.live_summary_seconds),
+                                                   summary=previous.summary if previous else "",
+                                                   checkpoint=previous.checkpoint if previous else 0)
+                    summarizer.start()
+                    st.session_state.live_summarizer = summarizer
                 rec.start_continuous_recognition()
                 st.session_state.live_recognizer = rec
                 st.session_state.live_running = True
                 st.success("Started")
-            except Exception as e:
-                st.error(f"Start failed: {e}")
-
-    # --- Drain event queue into session state (UI thread safe) ---
-    q = st.session_state.live_queue
-    partial_updated = False
-    new_final = False
-    while not q.empty():
-        kind, txt = q.get()
-        if kind == 'partial':
-            st.session_state.live_partial = txt
-            partial_updated = True
-        elif kind == 'final':
-            st.session_state.live_segments.append(txt); st.session_state.live_partial = ''
-            new_final = True
-        elif kind == 'stopped': st.session_state.live_running = False
-
-    # Immediate rerun on fresh partial for snappier captioning
-    if st.session_state.live_running and partial_updated:
-        now = time.time()
-        if now - st.session_state.live_last_refresh > PARTIAL_RERUN_INTERVAL:
-            st.session_state.live_last_refresh = now
-            try: st.rerun()
-            except Exception: pass
+        except Exception as e:
+            st.error(f"Start failed: {e}")
 
     if stop and st.session_state.live_running and st.session_state.live_recognizer:
         try:
             st.session_state.live_recognizer.stop_continuous_recognition(); st.session_state.live_running = False; st.success("Stopped")
         except Exception as e: st.error(f"Stop failed: {e}")
+        feed.on_stopped()
+        _end_session()
         # Perform one-shot full translation after stopping (if enabled)
-        if st.session_state.live_translate_enabled and st.session_state.live_segments:
+        if st.session_state.live_translate_enabled and feed.total_segments:
             st.session_state.live_full_translation = None  # force recompute
     # (Terminal line cleared by callback logic.)
 
@@ -194,28 +335,35 @@ def run():
         """, unsafe_allow_html=True)
         st.session_state.live_css_injected = True
 
-    if st.session_state.live_running:
-        st.markdown("<div style='display:inline-flex;align-items:center;gap:.5rem;background:#ffeef5;border:1px solid #ffb9d0;color:#c5004f;font-size:.7rem;font-weight:600;padding:.4rem .7rem;border-radius:30px;margin:.4rem 0 .4rem'>🔴 Listening...</div>", unsafe_allow_html=True)
-    final_text = " ".join(st.session_state.live_segments).strip()
-    if st.session_state.live_running:
-        if st.session_state.live_partial:
-            html_text = f"{final_text + ' ' if final_text else ''}<span class='live-partial'>{st.session_state.live_partial}</span>"
-        else:
-            html_text = final_text if final_text else "<span class='live-empty'>Capturing…</span>"
+    if _fragment is not None:
+        _fragment(run_every=CAPTION_REFRESH_INTERVAL if st.session_state.live_running else None)(_render_captions)()
     else:
-        html_text = final_text if final_text else "<span class='live-empty'>No transcript yet.</span>"
-    st.markdown("**Transcription (live)**" if st.session_state.live_running else "**Final Transcription**")
-    st.markdown(f"<div class='live-trans-box'>{html_text}</div>", unsafe_allow_html=True)
+        _render_captions()
+    if not st.session_state.live_running:
+        _render_earlier(feed)
+
+    summarizer = st.session_state.live_summarizer
+    if not st.session_state.live_running and summarizer is not None and summarizer.summary:
+        st.markdown(f"**Meeting summary** <span class='live-empty'>({summarizer.merges} incremental updates)</span>", unsafe_allow_html=True)
+        st.markdown(summarizer.summary)
+        if summarizer.error:
+            st.caption(summarizer.error)
+        st.download_button("Download summary", summarizer.summary, file_name=f"{st.session_state.live_session_id or 'live'}_summary.txt")
 
     # Show translation only after stop (one-shot); attempt computation if missing
-    if not st.session_state.live_running and st.session_state.live_translate_enabled and st.session_state.live_segments:
+    if not st.session_state.live_running and st.session_state.live_translate_enabled and feed.total_segments:
         if st.session_state.live_full_translation is None:
-            full_text = " ".join(st.session_state.live_segments)
+            st.session_state.live_translation_stats = None
             client = st.session_state.live_translator_client
             if client:
+                # Per segment through the translation memory: recurring phrases are free, misses go out batched
+                stats = translation_memory.LookupStats()
                 try:
-                    tr = client.translate(body=[full_text], to_language=[st.session_state.live_target_lang])
-                    st.session_state.live_full_translation = tr[0]['translations'][0]['text']
+                    segments = feed.page(0, feed.total_segments)
+                    translated = translation_memory.translate(client, segments, st.session_state.live_target_lang,
+                                                             from_language=LIVE_SOURCE_LANGUAGE, stats=stats)
+                    st.session_state.live_full_translation = " ".join(t for t in translated if t)
+                    st.session_state.live_translation_stats = stats.summary()
                 except Exception as e:
                     st.session_state.live_full_translation = f"[Translation failed: {e}]"
             else:
@@ -223,9 +371,11 @@ def run():
         trans_display = st.session_state.live_full_translation or '<span style="color:#8a94a3">Translating...</span>'
         st.markdown(f"**Translation ({st.session_state.live_target_lang})**")
         st.markdown(f"<div style='background:#f7f4ff;border:1px solid #d6cbf5;border-radius:10px;padding:.6rem .75rem;min-height:80px;font-size:.85rem;line-height:1.1rem;color:#1f2530;'>{trans_display}</div>", unsafe_allow_html=True)
+        if st.session_state.live_translation_stats:
+            st.caption(st.session_state.live_translation_stats)
 
-    # Passive periodic refresh (helps advance UI if no new partial triggers rerun)
-    if st.session_state.live_running and time.time() - st.session_state.live_last_refresh > PASSIVE_REFRESH_INTERVAL:
-        st.session_state.live_last_refresh = time.time()
+    # Streamlit without fragments: fall back to throttled full reruns while running
+    if _fragment is None and st.session_state.live_running:
+        time.sleep(CAPTION_REFRESH_INTERVAL)
         try: st.rerun()
         except Exception: pass
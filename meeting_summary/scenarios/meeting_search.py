@@ -0,0 +1,55 @@
+"""Search across every processed meeting (uploads, batch runs, live sessions).
+
+Key behaviors:
+  * Queries the local FTS5 index (search_index.py); BM25-ranked segment hits.
+  * Works for all supported languages (CJK matched by character bigrams).
+  * Each hit shows meeting, timestamp and speaker; "Context" shows the surrounding lines.
+  * Filters: meeting kind, speaker label.
+"""
+
+from . import register_scenario
+import streamlit as st
+import html, re, time
+import search_index
+
+
+def _highlight(text: str, query: str) -> str:
+    """HTML-escaped text with query terms marked (case-insensitive, CJK runs as substrings)."""
+    terms = sorted({t.strip('"*') for t in query.split() if t.strip('"*')}, key=len, reverse=True)
+    escaped = html.escape(text)
+    if not terms:
+        return escaped
+    pattern = re.compile("|".join(re.escape(html.escape(t)) for t in terms), re.IGNORECASE)
+    return pattern.sub(lambda m: f"<mark>{m.group(0)}</mark>", escaped)
+
+
+@register_scenario(key="meeting_search")  # Metadata declared in scenarios/__init__.py
+def run():
+    index = search_index.default_index()
+    stats = index.stats()
+    st.caption(f"{stats['meetings']} meetings · {stats['segments']} indexed segments")
+
+    query = st.text_input("Search", placeholder='e.g. launch date, "release schedule", 发布, 회의')
+    c1, c2, c3 = st.columns([1, 1, 1])
+    kind = c1.selectbox("Source", ["All", "upload", "batch", "live"])
+    speaker = c2.text_input("Speaker (optional)")
+    limit = c3.number_input("Results", min_value=5, max_value=200, value=search_index.SEARCH_DEFAULT_LIMIT, step=5)
+    if not query.strip():
+        if not stats['meetings']:
+            st.info("Nothing indexed yet. Transcripts are added as they are produced; "
+                    "backfill older runs with `python search_index.py --batch <out dir> --live`.")
+        return
+
+    started = time.perf_counter()
+    hits = index.search(query, int(limit), kind=None if kind == "All" else kind, speaker=speaker.strip() or None)
+    st.caption(f"{len(hits)} results in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for hit in hits:
+        where = hit.timestamp or ("summary" if hit.field == "summary" else "")
+        who = f" · Speaker {html.escape(hit.speaker)}" if hit.speaker else ""
+        st.markdown(f"**{html.escape(hit.title or hit.source)}** <span style='color:#8a94a3'>{where}{who} · {hit.kind}</span>", unsafe_allow_html=True)
+        st.markdown(f"<div style='font-size:.85rem;margin:0 0 .3rem'>{_highlight(hit.text[:600], query)}</div>", unsafe_allow_html=True)
+        if hit.start_ms is not None:
+            with st.expander("Context", expanded=False):
+                for line in index.context(hit.meeting_id, hit.start_ms):
+                    label = f"{line.speaker}: " if line.speaker else ""
+                    st.markdown(f"`{line.timestamp}` {html.escape(label)}{_highlight(line.text, query)}", unsafe_allow_html=True)
@@ -0,0 +1,422 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+"""search_index.py
+Local full-text search over processed meetings (uploads, batch runs, live sessions).
+
+Design:
+- SQLite: meetings + segments tables, FTS5 index over a pre-tokenized column; ranking
+  is FTS5's built-in BM25 (ORDER BY rank), so queries stay in milliseconds at 10k+ meetings
+- tokenize() works for all LOCALES: NFKC + casefold + diacritics stripped for
+  alphabetic scripts; Han / Kana / Hangul runs become overlapping character bigrams
+  (zh-CN, ja-JP, ko-KR have no reliable word boundaries); a query's CJK run becomes
+  an adjacency phrase of its bigrams
+- Every hit is one segment with start time, duration and speaker, so the UI can jump
+  to the moment in the meeting; summaries are indexed as segments without a time
+- Incremental: index_meeting() replaces one meeting's rows in a single transaction;
+  the upload scenario, the batch CLI and live_mic call it as results are produced
+  (SEARCH_INDEX=0 turns that off)
+- Backfill existing archives:  python search_index.py --batch batch_output --live live_sessions
+"""
+
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX", "1") != "0"  # 0: pipelines skip indexing
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", os.path.join(os.getcwd(), "search_index.sqlite3"))
+SEARCH_DEFAULT_LIMIT = 20
+
+_CJK_CLASS = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿ᄀ-ᇿ㄰-㆏"
+_RUN_RE = re.compile(rf"([{_CJK_CLASS}]+)|([^\W{_CJK_CLASS}]+)")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+_SPEAKER_RE = re.compile(r"^([^:\n]{1,40}):\s(.*)$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    title TEXT,
+    language TEXT,
+    created REAL NOT NULL,
+    segments INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    meeting_id INTEGER NOT NULL REFERENCES meetings(id),
+    field TEXT NOT NULL,
+    ord INTEGER NOT NULL,
+    start_ms INTEGER,
+    duration_ms INTEGER,
+    speaker TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_meeting ON segments (meeting_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(tokens, tokenize = 'unicode61 remove_diacritics 0');
+"""
+
+
+# ===== Tokenization =====
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+
+
+def _runs(text: str) -> Iterable[Tuple[bool, str]]:
+    """(is_cjk, run) pieces of folded text."""
+    # Fold per run: NFKD would split Hangul syllables into jamo
+    for match in _RUN_RE.finditer(unicodedata.normalize("NFKC", text)):
+        cjk, word = match.groups()
+        yield (True, cjk.casefold()) if cjk else (False, _fold(word))
+
+
+def _bigrams(run: str) -> List[str]:
+    return [run] if len(run) < 2 else [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text: str) -> List[str]:
+    """Index tokens: folded words; CJK runs as overlapping bigrams."""
+    tokens: List[str] = []
+    for cjk, run in _runs(text):
+        tokens.extend(_bigrams(run) if cjk else [run])
+    return tokens
+
+
+def _fts_string(token: str) -> str:
+    return '"' + token.replace('"', '""') + '"'
+
+
+def build_query(query: str) -> Optional[str]:
+    """FTS5 MATCH expression: terms AND-ed, "quoted text" and CJK runs as phrases, trailing * as prefix."""
+    clauses = []
+    for quoted, bare in _QUERY_RE.findall(query):
+        if quoted:
+            tokens = tokenize(quoted)
+            if tokens:
+                clauses.append(_phrase(tokens))
+            continue
+        prefix = bare.endswith("*")
+        for cjk, run in _runs(bare):
+            if cjk:
+                grams = _bigrams(run)
+                clauses.append(_phrase(grams) + ("*" if len(run) == 1 else ""))
+            else:
+                clauses.append(_fts_string(run) + ("*" if prefix else ""))
+    return " AND ".join(clauses) if clauses else None
+
+
+def _phrase(tokens: Sequence[str]) -> str:
+    return " + ".join(_fts_string(t) for t in tokens)
+
+
+# ===== Index =====
+
+class SearchHit:
+    __slots__ = ("meeting_id", "source", "kind", "title", "field", "start_ms", "duration_ms", "speaker", "text", "score")
+
+    def __init__(self, meeting_id, source, kind, title, field, start_ms, duration_ms, speaker, text, score):
+        self.meeting_id = meeting_id
+        self.source = source
+        self.kind = kind
+        self.title = title
+        self.field = field
+        self.start_ms = start_ms
+        self.duration_ms = duration_ms
+        self.speaker = speaker
+        self.text = text
+        self.score = score  # BM25 (lower = better, SQLite convention)
+
+    @property
+    def timestamp(self) -> str:
+        if self.start_ms is None:
+            return ""
+        seconds = int(self.start_ms) // 1000
+        return f"{seconds // 3600:d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+Segment = Tuple[Optional[int], Optional[int], Optional[str], str]  # (start_ms, duration_ms, speaker, text)
+
+
+def segments_from_transcript(transcript) -> List[Segment]:
+    """Segments from a transcript_model.Transcript (speaker / timing per phrase)."""
+    return [(int(transcript.start_ms[i]), int(transcript.duration_ms[i]), transcript.speaker_of(i), transcript.text(i))
+            for i in range(len(transcript))]
+
+
+def segments_from_text(text: str) -> List[Segment]:
+    """Segments from flattened 'Speaker: text' lines (no timing)."""
+    out = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        match = _SPEAKER_RE.match(line)
+        out.append((None, None, match.group(1), match.group(2)) if match else (None, None, None, line))
+    return out
+
+
+class SearchIndex:
+    """SQLite FTS5 index of meeting segments; one connection per process, guarded by a lock."""
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ----- Writes -----
+    def index_meeting(self, source: str, segments: Sequence[Segment], kind: str, title: Optional[str] = None,
+                      language: Optional[str] = None, summary: Optional[str] = None) -> int:
+        """Add or replace one meeting (keyed by source); returns its id."""
+        with self._lock, self._conn:
+            meeting_id = self._replace_meeting(source, kind, title, language)
+            count = self._insert(meeting_id, "transcript", segments)
+            if summary:
+                count += self._insert(meeting_id, "summary", [(None, None, None, summary)])
+            self._conn.execute("UPDATE meetings SET segments = ? WHERE id = ?", (count, meeting_id))
+        return meeting_id
+
+    def add_summary(self, source: str, summary: str) -> bool:
+        """Attach (or replace) the summary of an indexed meeting; False if source is unknown."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM meetings WHERE source = ?", (source,)).fetchone()
+            if row is None:
+                return False
+            self._delete_segments(row[0], "summary")
+            self._insert(row[0], "summary", [(None, None, None, summary)])
+        return True
+
+    def remove(self, source: str):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM meetings WHERE source = ?", (source,)).fetchone()
+            if row is not None:
+                self._delete_segments(row[0])
+                self._conn.execute("DELETE FROM meetings WHERE id = ?", (row[0],))
+
+    def _replace_meeting(self, source, kind, title, language) -> int:
+        row = self._conn.execute("SELECT id FROM meetings WHERE source = ?", (source,)).fetchone()
+        if row is not None:
+            self._delete_segments(row[0])
+            self._conn.execute("UPDATE meetings SET kind = ?, title = ?, language = ?, created = ? WHERE id = ?",
+                               (kind, title, language, time.time(), row[0]))
+            return row[0]
+        return self._conn.execute("INSERT INTO meetings (source, kind, title, language, created) VALUES (?, ?, ?, ?, ?)",
+                                  (source, kind, title, language, time.time())).lastrowid
+
+    def _delete_segments(self, meeting_id: int, field: Optional[str] = None):
+        where, params = ("meeting_id = ?", (meeting_id,)) if field is None else ("meeting_id = ? AND field = ?", (meeting_id, field))
+        self._conn.execute(f"DELETE FROM segments_fts WHERE rowid IN (SELECT id FROM segments WHERE {where})", params)
+        self._conn.execute(f"DELETE FROM segments WHERE {where}", params)
+
+    def _insert(self, meeting_id: int, field: str, segments: Sequence[Segment]) -> int:
+        count = 0
+        for ord_, (start_ms, duration_ms, speaker, text) in enumerate(segments):
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            rowid = self._conn.execute(
+                "INSERT INTO segments (meeting_id, field, ord, start_ms, duration_ms, speaker, text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (meeting_id, field, ord_, start_ms, duration_ms, speaker, text)).lastrowid
+            self._conn.execute("INSERT INTO segments_fts (rowid, tokens) VALUES (?, ?)", (rowid, " ".join(tokens)))
+            count += 1
+        return count
+
+    # ----- Reads -----
+    def search(self, query: str, limit: int = SEARCH_DEFAULT_LIMIT, kind: Optional[str] = None,
+               speaker: Optional[str] = None) -> List[SearchHit]:
+        """Best segments for query by BM25, optionally restricted to a meeting kind / speaker."""
+        expression = build_query(query)
+        if not expression:
+            return []
+        filters, params = "", [expression]
+        if kind:
+            filters += " AND m.kind = ?"
+            params.append(kind)
+        if speaker:
+            filters += " AND s.speaker = ?"
+            params.append(speaker)
+        params.append(limit)
+        sql = ("SELECT m.id, m.source, m.kind, m.title, s.field, s.start_ms, s.duration_ms, s.speaker, s.text, f.rank "
+               "FROM segments_fts f JOIN segments s ON s.id = f.rowid JOIN meetings m ON m.id = s.meeting_id "
+               f"WHERE segments_fts MATCH ?{filters} ORDER BY f.rank LIMIT ?")
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError:
+                return []  # Query reduced to an expression FTS5 rejects
+        return [SearchHit(*row) for row in rows]
+
+    def context(self, meeting_id: int, start_ms: Optional[int], around: int = 2) -> List[SearchHit]:
+        """Transcript segments surrounding a hit (for the 'jump to moment' view)."""
+        with self._lock:
+            if start_ms is None:
+                rows = []
+            else:
+                rows = self._conn.execute(
+                    "SELECT ord FROM segments WHERE meeting_id = ? AND field = 'transcript' AND start_ms <= ? ORDER BY start_ms DESC LIMIT 1",
+                    (meeting_id, start_ms)).fetchall()
+            if not rows:
+                return []
+            rows = self._conn.execute(
+                "SELECT m.id, m.source, m.kind, m.title, s.field, s.start_ms, s.duration_ms, s.speaker, s.text, 0 "
+                "FROM segments s JOIN meetings m ON m.id = s.meeting_id "
+                "WHERE s.meeting_id = ? AND s.field = 'transcript' AND s.ord BETWEEN ? AND ? ORDER BY s.ord",
+                (meeting_id, rows[0][0] - around, rows[0][0] + around)).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def stats(self):
+        with self._lock:
+            meetings, segments = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(segments), 0) FROM meetings").fetchone()
+        return {"meetings": meetings, "segments": segments,
+                "bytes": os.path.getsize(self.path) if self.path != ":memory:" and os.path.exists(self.path) else 0}
+
+    def optimize(self):
+        """Merge FTS5 b-trees (after large backfills)."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO segments_fts (segments_fts) VALUES ('optimize')")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default: Optional[SearchIndex] = None
+_default_lock = threading.Lock()
+
+
+def default_index() -> SearchIndex:
+    """Process-wide index at SEARCH_INDEX_PATH."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SearchIndex()
+        return _default
+
+
+def _quietly(source: str, action):
+    if not SEARCH_INDEX_ENABLED:
+        return None
+    try:
+        return action(default_index())
+    except (sqlite3.Error, OSError) as e:
+        print(f"[search_index] indexing {source} failed: {e}", file=sys.stderr)
+        return None
+
+
+def index_quietly(source: str, segments: Sequence[Segment], kind: str, **kwargs) -> Optional[int]:
+    """index_meeting on the default index; indexing problems never fail the caller's pipeline."""
+    return _quietly(source, lambda index: index.index_meeting(source, segments, kind, **kwargs))
+
+
+def add_summary_quietly(source: str, summary: str):
+    return _quietly(source, lambda index: index.add_summary(source, summary))
+
+
+def index_live_quietly(loaded, summary: Optional[str] = None) -> Optional[int]:
+    """index_live_session on the default index (see index_quietly)."""
+    return _quietly(loaded.session_id, lambda index: index_live_session(index, loaded, summary))
+
+
+# ===== Backfill =====
+
+def index_batch_output(index: SearchIndex, out_dir: str) -> int:
+    """Index every finished file of a batch_process output directory (last manifest record per file)."""
+    latest = {}
+    try:
+        with open(os.path.join(out_dir, "manifest.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                latest[record.get("file")] = record
+    except OSError:
+        return 0
+    count = 0
+    for path, record in latest.items():
+        if record.get("status") not in ("transcribed", "done"):
+            continue
+        segments = _batch_segments(record)
+        if segments is None:
+            continue
+        summary = None
+        if record.get("summary") and os.path.exists(record["summary"]):
+            with open(record["summary"], "r", encoding="utf-8") as f:
+                summary = f.read()
+        index.index_meeting(path, segments, "batch", title=os.path.basename(path), language=record.get("language"), summary=summary)
+        count += 1
+    return count
+
+
+def _batch_segments(record) -> Optional[List[Segment]]:
+    structured = record.get("structured")
+    if structured and os.path.exists(structured):
+        from transcript_model import Transcript
+        return segments_from_transcript(Transcript.load(structured))
+    try:
+        with open(record["transcript"], "r", encoding="utf-8") as f:
+            return segments_from_text(f.read())
+    except (KeyError, OSError):
+        return None
+
+
+def index_live_sessions(index: SearchIndex, directory: Optional[str] = None) -> int:
+    """Index every journaled live session."""
+    import session_journal
+    directory = directory or session_journal.JOURNAL_DIR
+    count = 0
+    for info in session_journal.list_sessions(directory, limit=sys.maxsize):
+        loaded = session_journal.load_session(info["session_id"], directory)
+        if loaded is not None and loaded.segments:
+            index_live_session(index, loaded)
+            count += 1
+    return count
+
+
+def index_live_session(index: SearchIndex, loaded, summary: Optional[str] = None) -> int:
+    """Index a session_journal.JournalSession."""
+    segments = [(s.get("offset_ms"), s.get("duration_ms"), s.get("speaker"), s["text"]) for s in loaded.segments]
+    return index.index_meeting(f"live:{loaded.session_id}", segments, "live", title=f"Live session {loaded.session_id}",
+                               language=loaded.meta.get("language"), summary=summary)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build / query the local meeting search index.")
+    parser.add_argument("--index", default=SEARCH_INDEX_PATH, help="SQLite index file")
+    parser.add_argument("--batch", nargs="*", default=[], help="batch_process output directories to index")
+    parser.add_argument("--live", nargs="*", default=None, help="live session journal directories to index (no value: default)")
+    parser.add_argument("--query", "-q", help="Run a query and print the hits")
+    parser.add_argument("--limit", type=int, default=SEARCH_DEFAULT_LIMIT)
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.index)
+    indexed = sum(index_batch_output(index, d) for d in args.batch)
+    if args.live is not None:
+        indexed += sum(index_live_sessions(index, d) for d in (args.live or [None]))
+    if indexed:
+        index.optimize()
+        print(f"Indexed {indexed} meetings -> {index.stats()}")
+    if args.query:
+        started = time.perf_counter()
+        hits = index.search(args.query, args.limit)
+        print(f"{len(hits)} hits in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for hit in hits:
+            who = f" {hit.speaker}:" if hit.speaker else ""
+            print(f"{hit.score:8.3f}  {hit.title or hit.source}  {hit.timestamp or hit.field}{who} {hit.text[:160]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+import glob
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+"""session_journal.py
+Per-session append-only transcript journal for live recognition.
+
+Layout (JOURNAL_DIR):
+    <session_id>.jsonl       part 0: {"type": "session", ...} header, then segments
+    <session_id>.1.jsonl     further parts once a part exceeds JOURNAL_PART_MAX_BYTES
+Segment record: {"type": "segment", "i": index, "t": unix time, "offset_ms": ..., "duration_ms": ..., "text": ...}
+(offset / duration from the Speech SDK result when available, else relative to session start)
+
+Design:
+- append() only enqueues -> Speech SDK callback threads never touch the disk
+- A background writer drains the queue in batches (one write per batch, every
+  JOURNAL_FLUSH_INTERVAL at most) and fsyncs every JOURNAL_FSYNC_INTERVAL
+- Size-based rotation into numbered parts; close() compacts parts back into one file
+  (last record per index wins); prune() keeps the directory under JOURNAL_MAX_TOTAL_MB
+- load_session(id) rebuilds a transcript from the parts (torn last lines skipped),
+  so a reloaded / crashed tab recovers without re-recognizing
+- read_segments(start, count) pages older text back in (sparse byte-offset index every
+  INDEX_STRIDE segments while the journal is open; a forward scan otherwise)
+"""
+
+JOURNAL_DIR = os.getenv("LIVE_JOURNAL_DIR", os.path.join(os.getcwd(), "live_sessions"))
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("LIVE_JOURNAL_FLUSH_INTERVAL", "0.25"))
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("LIVE_JOURNAL_FSYNC_INTERVAL", "2.0"))
+JOURNAL_PART_MAX_BYTES = int(float(os.getenv("LIVE_JOURNAL_PART_MAX_MB", "4")) * 1024 * 1024)
+JOURNAL_MAX_TOTAL_MB = float(os.getenv("LIVE_JOURNAL_MAX_TOTAL_MB", "512"))
+INDEX_STRIDE = 64  # Segments per sparse offset-index entry
+
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_CLOSE = object()
+
+
+def new_session_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+def valid_session_id(session_id: str) -> bool:
+    return bool(session_id) and bool(_SESSION_ID_RE.match(session_id))
+
+
+def part_paths(session_id: str, directory: str = JOURNAL_DIR) -> List[str]:
+    """Existing part files of a session in write order."""
+    if not valid_session_id(session_id):
+        return []
+    base = os.path.join(directory, f"{session_id}.jsonl")
+    parts = [p for p in glob.glob(os.path.join(directory, f"{glob.escape(session_id)}.*.jsonl"))
+             if re.fullmatch(r"\d+", os.path.basename(p)[len(session_id) + 1:-len(".jsonl")])]
+    parts.sort(key=lambda p: int(os.path.basename(p)[len(session_id) + 1:-len(".jsonl")]))
+    return ([base] if os.path.exists(base) else []) + parts
+
+
+def _read_records(paths: List[str], first_offset: int = 0):
+    """Records of the given parts in order; first_offset seeks into the first part."""
+    for n, path in enumerate(paths):
+        try:
+            with open(path, "rb") as f:
+                if n == 0 and first_offset:
+                    f.seek(first_offset)
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash
+        except OSError:
+            continue
+
+
+def _collect_segments(records, start: int, count: int) -> List[str]:
+    end = start + count
+    found: Dict[int, str] = {}
+    for record in records:
+        if record.get("type") != "segment":
+            continue
+        i = record["i"]
+        if start <= i < end:
+            found[i] = record["text"]
+            if len(found) == count:
+                break
+    return [found[i] for i in sorted(found)]
+
+
+def read_segments(session_id: str, start: int, count: int, directory: str = JOURNAL_DIR) -> List[str]:
+    """Texts of segments [start, start + count) of a stored session (forward scan, stops early)."""
+    return _collect_segments(_read_records(part_paths(session_id, directory)), start, count)
+
+
+class JournalSession:
+    """A reloaded session: header info + segments ordered by index."""
+
+    def __init__(self, session_id: str, started: Optional[float], segments: List[Dict], ended: bool, meta: Dict):
+        self.session_id = session_id
+        self.started = started
+        self.segments = segments
+        self.ended = ended
+        self.meta = meta
+
+    @property
+    def texts(self) -> List[str]:
+        return [s["text"] for s in self.segments]
+
+
+def load_session(session_id: str, directory: str = JOURNAL_DIR) -> Optional[JournalSession]:
+    """Rebuild a session from its journal parts (None if unknown)."""
+    paths = part_paths(session_id, directory)
+    if not paths:
+        return None
+    started, ended, meta = None, False, {}
+    by_index: Dict[int, Dict] = {}
+    for record in _read_records(paths):
+        kind = record.get("type")
+        if kind == "segment":
+            by_index[record["i"]] = record
+            ended = False  # Resumed after an earlier end marker
+        elif kind == "session":
+            started = record.get("started", started)
+            meta = record.get("meta") or meta
+        elif kind == "end":
+            ended = True
+    return JournalSession(session_id, started, [by_index[i] for i in sorted(by_index)], ended, meta)
+
+
+def list_sessions(directory: str = JOURNAL_DIR, limit: int = 20) -> List[Dict]:
+    """Most recently written sessions: [{"session_id", "modified", "bytes"}]."""
+    sessions: Dict[str, Dict] = {}
+    for path in glob.glob(os.path.join(directory, "*.jsonl")):
+        name = os.path.basename(path)[:-len(".jsonl")]
+        session_id = name.split(".", 1)[0]
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        info = sessions.setdefault(session_id, {"session_id": session_id, "modified": 0.0, "bytes": 0})
+        info["modified"] = max(info["modified"], st.st_mtime)
+        info["bytes"] += st.st_size
+    return sorted(sessions.values(), key=lambda s: s["modified"], reverse=True)[:limit]
+
+
+def compact(session_id: str, directory: str = JOURNAL_DIR) -> Optional[str]:
+    """Merge a session's parts into <id>.jsonl (last record per index wins); atomic replace."""
+    paths = part_paths(session_id, directory)
+    if len(paths) < 2:
+        return paths[0] if paths else None
+    header, end, by_index = None, None, {}
+    for record in _read_records(paths):
+        kind = record.get("type")
+        if kind == "segment":
+            by_index[record["i"]] = record
+        elif kind == "session" and header is None:
+            header = record
+        elif kind == "end":
+            end = record
+    target = os.path.join(directory, f"{session_id}.jsonl")
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for record in ([header] if header else []) + [by_index[i] for i in sorted(by_index)] + ([end] if end else []):
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+    for path in paths:
+        if path != target:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return target
+
+
+def prune(directory: str = JOURNAL_DIR, max_total_mb: float = JOURNAL_MAX_TOTAL_MB, keep: Optional[str] = None) -> int:
+    """Delete oldest sessions until the directory fits max_total_mb; returns sessions removed."""
+    sessions = list_sessions(directory, limit=10 ** 6)
+    total = sum(s["bytes"] for s in sessions)
+    removed = 0
+    for info in reversed(sessions):  # Oldest first
+        if total <= max_total_mb * 1024 * 1024:
+            break
+        if info["session_id"] == keep:
+            continue
+        for path in part_paths(info["session_id"], directory):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= info["bytes"]
+        removed += 1
+    return removed
+
+
+class SessionJournal:
+    """Background-written journal for one live session (see module docstring).
+
+    Re-opening an existing session_id continues its index sequence (resume after reload).
+    """
+
+    def __init__(self, session_id: Optional[str] = None, directory: str = JOURNAL_DIR,
+                 flush_interval: float = JOURNAL_FLUSH_INTERVAL, fsync_interval: float = JOURNAL_FSYNC_INTERVAL,
+                 part_max_bytes: int = JOURNAL_PART_MAX_BYTES, meta: Optional[Dict] = None):
+        self.session_id = session_id if session_id and valid_session_id(session_id) else new_session_id()
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.part_max_bytes = part_max_bytes
+        self.started = time.time()
+        self.batches = 0
+        self.records = 0
+        self._offsets: Dict[int, tuple] = {}  # index // INDEX_STRIDE -> (part, byte offset)
+        os.makedirs(directory, exist_ok=True)
+
+        existing = load_session(self.session_id, directory)
+        self.next_index = (existing.segments[-1]["i"] + 1) if existing and existing.segments else 0
+        paths = part_paths(self.session_id, directory)
+        self._part = len(paths) - 1 if paths else 0
+        self._file = None
+        self._open_part(self._part)
+        if existing is None:
+            self._file.write((json.dumps({"type": "session", "id": self.session_id, "started": self.started, "meta": meta or {}}) + "\n").encode("utf-8"))
+        else:
+            self.started = existing.started or self.started
+        self._last_fsync = time.monotonic()
+        self._dirty = True
+        self._queue: "queue.Queue" = queue.Queue()
+        self._index_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"journal-{self.session_id}", daemon=True)
+        self._thread.start()
+
+    def _part_path(self, part: int) -> str:
+        name = f"{self.session_id}.jsonl" if part == 0 else f"{self.session_id}.{part}.jsonl"
+        return os.path.join(self.directory, name)
+
+    def _open_part(self, part: int):
+        if self._file:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        self._part = part
+        self._file = open(self._part_path(part), "ab")
+
+    # ----- Producer side (any thread, never blocks on I/O) -----
+    def append(self, text: str, offset_ms: Optional[float] = None, duration_ms: Optional[float] = None, **extra) -> int:
+        """Queue one finalized segment; returns its index."""
+        now = time.time()
+        with self._index_lock:
+            index = self.next_index
+            self.next_index += 1
+        record = {"type": "segment", "i": index, "t": round(now, 3),
+                  "offset_ms": round(offset_ms if offset_ms is not None else (now - self.started) * 1000),
+                  "duration_ms": round(duration_ms) if duration_ms is not None else None, "text": text}
+        record.update(extra)
+        self._queue.put(record)
+        return index
+
+    def read_segments(self, start: int, count: int) -> List[str]:
+        """Page already-written segments back in; seeks via the sparse index when it covers start."""
+        entry = None if self._closed else self._offsets.get(start // INDEX_STRIDE)
+        if entry is None:  # Not indexed, or parts compacted on close
+            return read_segments(self.session_id, start, count, self.directory)
+        part, offset = entry
+        paths = [self._part_path(p) for p in range(part, self._part + 1)]
+        return _collect_segments(_read_records(paths, offset), start, count)
+
+    def close(self, compact_parts: bool = True):
+        """Flush everything, mark the session ended, fsync; optionally merge rotated parts."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put({"type": "end", "t": round(time.time(), 3)})
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout=10)
+        if compact_parts and self._part > 0:
+            compact(self.session_id, self.directory)
+
+    # ----- Writer thread -----
+    def _run(self):
+        closing = False
+        while not closing:
+            try:
+                first = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                self._maybe_fsync(force=False)
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while True:  # Gather whatever arrives within the flush window
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+                if time.monotonic() >= deadline:
+                    break
+            if _CLOSE in batch:
+                closing = True
+                batch = [r for r in batch if r is not _CLOSE]
+            self._write(batch)
+            self._maybe_fsync(force=closing)
+        self._file.close()
+
+    def _write(self, batch: List[Dict]):
+        if not batch:
+            return
+        lines = [(json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in batch]
+        size = sum(len(line) for line in lines)
+        if self._file.tell() + size > self.part_max_bytes and self._file.tell() > 0:
+            self._open_part(self._part + 1)
+        position = self._file.tell()
+        for record, line in zip(batch, lines):
+            i = record.get("i")
+            if i is not None and i % INDEX_STRIDE == 0:
+                self._offsets[i // INDEX_STRIDE] = (self._part, position)
+            position += len(line)
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        self._dirty = True
+        self.batches += 1
+        self.records += len(batch)
+
+    def _maybe_fsync(self, force: bool):
+        now = time.monotonic()
+        if self._dirty and (force or now - self._last_fsync >= self.fsync_interval):
+            try:
+                os.fsync(self._file.fileno())
+            except (OSError, ValueError):
+                pass
+            self._dirty = False
+            self._last_fsync = now
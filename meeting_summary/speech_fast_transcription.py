@@ -1,26 +1,71 @@
+import asyncio
+import base64
 import datetime
 import json
 import logging
-import requests
 import os
+import threading
 import time
-from dotenv import load_dotenv
+from concurrent.futures import FIRST_COMPLETED, FIRST_EXCEPTION, ThreadPoolExecutor, wait
+import azure_transport
+import resources
+import telemetry
+from disk_cache import DiskCache, make_key
+from audio_preprocess import AudioSource, PreparedAudio, CONTAINERS, prepare_audio, prepare_audio_source, sniff_container, stream_source
+from chunked_transcription import split_wav, stitch_phrases
+from transcript_model import Transcript
 
 """speech_fast_transcription.py
 Wrapper for Azure Fast Transcription REST API with:
 - Multi-locale automatic language detection (7 locales)
 - Speaker diarization (retry fallbacks if failure)
 - Graceful degradation strategy (disable diarization, add stereo)
+- Content-addressed on-disk cache (audio bytes + parameters) -> repeat uploads skip the network
+- Pooled keep-alive transport with 429/Retry-After backoff (azure_transport.py)
+- Optional chunked mode: overlapping WAV windows transcribed in parallel, stitched by timestamps
+- Optional hedged mode: non-diarized fallback raced against a slow primary request
+- Client-side normalization (16 kHz mono PCM, real container MIME) before upload (audio_preprocess.py)
+- Large recordings given as a path / file object stay on disk: hashed, normalized (ffmpeg)
+  and uploaded as a streamed multipart body, so memory per request does not grow with the file
+- Telemetry spans per stage: preprocess, each attempt, multipart encode, upload / service wait, JSON parse
+- Structured result: the phrases payload packed into a transcript_model.Transcript
+  (timestamps, speakers, locales, words), cached alongside the text
+- asyncio variants (afast_transcript, atry_transcription, ...) over httpx: same
+  fallbacks, cache and telemetry; chunk windows and hedges are tasks instead of threads
 
-Returns (transcription_text, detected_language) or (None, None) on failure.
+Returns (transcription_text, detected_language) or (None, None) on failure;
+structured=True adds the Transcript as a third element.
 """
 
 # Support multiple languages with auto-detection
 LOCALES = ["en-US", "zh-CN", "es-ES", "fr-FR", "de-DE", "ja-JP", "ko-KR"]
 
-load_dotenv()
+resources.load_env()
 SPEECH_KEY = os.getenv("SPEECH_KEY")
 SPEECH_REGION = os.getenv("SPEECH_REGION")
+# Optional override (private endpoints, local stand-ins for benchmarks)
+SPEECH_ENDPOINT = os.getenv("SPEECH_ENDPOINT") or f"https://{SPEECH_REGION}.api.cognitive.microsoft.com"
+
+# Transcription cache (content addressed; see disk_cache.py)
+TRANSCRIPTION_CACHE_DIR = os.getenv("TRANSCRIPTION_CACHE_DIR", os.path.join(os.getcwd(), ".cache", "transcriptions"))
+TRANSCRIPTION_CACHE_MAX_MB = float(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "256"))
+TRANSCRIPTION_CACHE_MAX_AGE_DAYS = float(os.getenv("TRANSCRIPTION_CACHE_MAX_AGE_DAYS", "30"))
+
+transcription_cache = DiskCache(
+    TRANSCRIPTION_CACHE_DIR,
+    max_bytes=int(TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024),
+    max_age=TRANSCRIPTION_CACHE_MAX_AGE_DAYS * 86400,
+)
+
+# Chunked mode (long recordings)
+CHUNK_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "300"))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_OVERLAP_SECONDS", "4"))
+CHUNK_MAX_WORKERS = int(os.getenv("TRANSCRIPTION_CHUNK_WORKERS", "4"))
+CHUNK_RETRIES = 2
+CHUNK_RETRY_BACKOFF = 1.0  # seconds, doubled per attempt
+
+# Hedged mode: latency budget before the non-diarized fallback is launched in parallel
+HEDGE_DELAY_SECONDS = float(os.getenv("TRANSCRIPTION_HEDGE_DELAY_SECONDS", "20"))
 
 logger = logging.getLogger()
 
@@ -28,14 +73,42 @@ def print_message(message):
     ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{ts}] {message}")
     logger.info(message)
+    telemetry.event(message)
 
-def fast_transcript(audio):
-    """Primary entry: attempt transcription with resilience fallbacks."""
-    print_message("Fast transcription start")
-    url = f"https://{SPEECH_REGION}.api.cognitive.microsoft.com/speechtotext/transcriptions:transcribe?api-version=2024-11-15"
+def cache_key(audio_bytes, url, parameters):
+    """Content address for a transcription request: audio hash + endpoint + parameters.
+
+    audio_bytes may be an AudioSource (hashed in chunks; same key as its bytes).
+    """
+    return make_key(audio_bytes, url, parameters)
+
+def fast_transcript(audio, use_cache=True, chunked=False, hedged=False, hedge_delay=None, normalize=True, trim_silence=False, structured=False):
+    """Primary entry: attempt transcription with resilience fallbacks.
 
-    # Base parameters (most capable)
-    parameters = {
+    Results are cached on disk keyed by the audio bytes and the base parameters,
+    so a repeat upload returns instantly without any network call.
+    chunked=True transcribes long WAV recordings as overlapping windows in
+    parallel (see transcribe_chunked); other inputs use the single-request path.
+    hedged=True starts the non-diarized fallback alongside the primary request
+    once hedge_delay seconds pass without an answer (see transcribe_hedged).
+    normalize=True downmixes / resamples to 16 kHz PCM before upload (channels
+    kept for the stereo fallback); trim_silence drops leading / trailing silence.
+    structured=True returns (text, language, Transcript) - the phrases' timing,
+    speaker, locale and word data in compact columnar form (transcript_model.py).
+    """
+    with telemetry.span("speech.transcribe", chunked=chunked, hedged=hedged) as root:
+        result, detected_language, transcript = _fast_transcript(audio, use_cache, chunked, hedged, hedge_delay, normalize, trim_silence, structured)
+        root.set(ok=result is not None, language=detected_language)
+    if structured:
+        return result, detected_language, transcript
+    return result, detected_language
+
+def transcription_url():
+    return f"{SPEECH_ENDPOINT.rstrip('/')}/speechtotext/transcriptions:transcribe?api-version=2024-11-15"
+
+def base_parameters():
+    """Most capable request definition; fallback_configs derives the retries from it."""
+    return {
         "locales": LOCALES,
         "wordLevelTimestampsEnabled": True,
         "profanityFilterMode": "Masked",
@@ -43,63 +116,506 @@ def fast_transcript(audio):
         "diarizationSettings": {"enabled": True, "minSpeakers": 1, "maxSpeakers": 10}
     }
 
-    result, detected_language = try_transcription(audio, url, parameters)
+def _cache_lookup(payload, url, parameters, chunked, trim_silence, structured):
+    """-> (cache key, cached (text, language, transcript) or None)."""
+    variant = dict(parameters)
+    if chunked:
+        variant["chunked"] = True
+    if trim_silence:
+        variant["trimSilence"] = True
+    key = cache_key(payload, url, variant)
+    cached = transcription_cache.get(key)
+    # Entries from before structured results carry text only -> refetch when the structure is wanted
+    if cached and (cached.get("transcript") or not structured):
+        print_message("Cache hit")
+        packed = cached.get("transcript")
+        transcript = Transcript.from_bytes(base64.b64decode(packed)) if packed else None
+        return key, (cached["text"], cached["language"], transcript)
+    return key, None
 
-    # Fallback 1: disable diarization
-    if result is None:
-        print_message("Retry without diarization")
-        parameters["diarizationSettings"]["enabled"] = False
-        result, detected_language = try_transcription(audio, url, parameters)
+def _cache_store(key, result, detected_language, transcript):
+    transcription_cache.put(key, {"text": result, "language": detected_language,
+                                  "transcript": base64.b64encode(transcript.to_bytes()).decode("ascii")})
 
-    # Fallback 2: enable stereo + re-enable diarization
-    if result is None:
-        print_message("Retry stereo + diarization")
-        parameters["channels"] = [0, 1]
-        parameters["diarizationSettings"]["enabled"] = True
-        result, detected_language = try_transcription(audio, url, parameters)
+def _prepare_upload(payload, keep_channels, normalize, trim_silence):
+    streamed = isinstance(payload, AudioSource)
+    with telemetry.span("speech.preprocess", channels=2 if keep_channels else 1, streamed=streamed) as prep:
+        if streamed and normalize:
+            if trim_silence:
+                print_message("Silence trim skipped (streamed audio)")
+            upload = prepare_audio_source(payload, keep_channels=keep_channels)
+        elif normalize:
+            upload = prepare_audio(payload, keep_channels=keep_channels, trim_silence=trim_silence)
+        else:
+            container = payload.container if streamed else sniff_container(payload)
+            upload = PreparedAudio(payload, container if container != "unknown" else "wav", len(payload))
+        prep.set(bytes_in=len(payload), bytes_out=len(upload.data))
+    print_message(upload.summary())
+    return upload
+
+def _fast_transcript(audio, use_cache, chunked, hedged, hedge_delay, normalize, trim_silence, structured=False):
+    print_message("Fast transcription start")
+    url = transcription_url()
+    parameters = base_parameters()
+
+    # Read the upload once (large files: streamed from disk); every attempt shares it
+    payload = source_payload(audio)
+
+    key = None
+    if use_cache:
+        key, cached = _cache_lookup(payload, url, parameters, chunked, trim_silence, structured)
+        if cached:
+            return cached
+
+    uploads = {}
+
+    def upload_for(config):
+        """Normalized payload per channel layout (prepared lazily, at most once each)."""
+        keep_channels = len(config["channels"]) > 1
+        if keep_channels not in uploads:
+            uploads[keep_channels] = _prepare_upload(payload, keep_channels, normalize, trim_silence)
+        return uploads[keep_channels]
+
+    try:
+        return _attempts(url, parameters, key, upload_for, chunked, hedged, hedge_delay)
+    finally:
+        for upload in uploads.values():
+            upload.close()  # Temp files behind streamed, normalized uploads
+
+def _attempt_plan(parameters, hedged):
+    """-> (configs raced by the hedge or None, configs then tried one by one)."""
+    configs = fallback_configs(parameters)
+    if hedged:
+        return configs[:2], configs[2:]  # Primary + non-diarized are raced, stereo follows
+    return None, configs
+
+def _attempts(url, parameters, key, upload_for, chunked, hedged, hedge_delay):
+    result = detected_language = transcript = None
+    if chunked:
+        result, detected_language, transcript = transcribe_chunked(upload_for(parameters).data, url, parameters)
+
+    hedge_configs, configs = _attempt_plan(parameters, hedged)
+    if result is None and hedge_configs:
+        result, detected_language, transcript = transcribe_hedged(upload_for(parameters), url, hedge_configs, hedge_delay)
+
+    for label, config in configs:
+        if result is not None:
+            break
+        if label:
+            print_message(label)
+        upload = upload_for(config)
+        with telemetry.span("speech.attempt", config=label or "primary") as attempt:
+            result, detected_language, transcript = try_transcription(upload, url, config)
+            attempt.set(ok=result is not None)
+
+    if key and result is not None:
+        _cache_store(key, result, detected_language, transcript)
 
     print_message("Fast transcription end")
-    return result, detected_language
+    return result, detected_language, transcript
 
-def try_transcription(audio, url, parameters):
-    """Invoke Fast Transcription API once with supplied parameters."""
-    print_message("Parameters: " + json.dumps(parameters))
+def audio_payload(audio):
+    """Raw bytes of an upload (Streamlit UploadedFile / BytesIO), file path, file object, PreparedAudio or a bytes-like payload."""
+    if isinstance(audio, PreparedAudio):
+        return audio.data
+    if isinstance(audio, (str, os.PathLike)):
+        with open(audio, "rb") as f:
+            return f.read()
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return bytes(audio) if not isinstance(audio, bytes) else audio
+    if hasattr(audio, "getvalue"):
+        return audio.getvalue()
+    audio.seek(0)  # Any other (small) file object: open(p, "rb"), SpooledTemporaryFile, ...
+    return audio.read()
+
+def source_payload(audio):
+    """AudioSource for large paths / file objects (see audio_preprocess.STREAM_MIN_BYTES), else the bytes."""
+    return stream_source(audio) or audio_payload(audio)
+
+def fallback_configs(parameters):
+    """Ordered (log label, parameters) attempts: primary, no diarization, stereo + diarization."""
+    # Fallback 1: disable diarization
+    no_diarization = json.loads(json.dumps(parameters))
+    no_diarization["diarizationSettings"]["enabled"] = False
+    # Fallback 2: enable stereo + re-enable diarization
+    stereo = json.loads(json.dumps(parameters))
+    stereo["channels"] = [0, 1]
+    stereo["diarizationSettings"]["enabled"] = True
+    return [
+        (None, parameters),
+        ("Retry without diarization", no_diarization),
+        ("Retry stereo + diarization", stereo),
+    ]
+
+class _HedgeRace:
+    """Launch / winner decisions of a hedged run, shared by the thread and task drivers."""
+
+    def __init__(self, configs, hedge_delay=None):
+        self.configs = configs
+        self.hedge_delay = HEDGE_DELAY_SECONDS if hedge_delay is None else hedge_delay
+        self.launched = 1  # configs[0] starts right away
+        self.results = {}
+
+    def timeout(self):
+        """How long to wait for an answer before hedging (None: nothing left to launch)."""
+        return self.hedge_delay if self.launched < len(self.configs) else None
+
+    def record(self, index, outcome):
+        self.results[index] = outcome
+
+    def winner(self):
+        """First successful outcome in preference order, or None."""
+        winners = sorted(i for i, r in self.results.items() if r[0] is not None)
+        if not winners:
+            return None
+        print_message(f"Hedged attempt {winners[0]} won")
+        return self.results[winners[0]]
+
+    def next_launch(self):
+        """Index of the next hedge to start (budget exceeded or earlier attempts failed), or None."""
+        if self.launched >= len(self.configs):
+            return None
+        index = self.launched
+        print_message(f"Hedge: {self.configs[index][0] or 'attempt ' + str(index)}")
+        self.launched += 1
+        return index
+
+def transcribe_hedged(audio, url, configs, hedge_delay=None):
+    """Run configs[0]; hedge with configs[1] after hedge_delay s (or on early failure).
+
+    The first successful answer wins (ties resolved in preference order); the
+    other attempt is cancelled - not started, or its retries abandoned and its
+    response discarded. Returns (None, None, None) if every attempt fails.
+    """
+    cancel = threading.Event()
+    parent = telemetry.current_span()
+    race = _HedgeRace(configs, hedge_delay)
+
+    def attempt(index):
+        with telemetry.span("speech.attempt", parent=parent, config=configs[index][0] or "primary", hedged=True) as s:
+            outcome = try_transcription(audio, url, configs[index][1], cancel)
+            s.set(ok=outcome[0] is not None, cancelled=cancel.is_set())
+            return outcome
+
+    pool = ThreadPoolExecutor(max_workers=len(configs))
+    futures = {pool.submit(attempt, 0): 0}
+    try:
+        while futures:
+            done, _ = wait(futures, timeout=race.timeout(), return_when=FIRST_COMPLETED)
+            for future in done:
+                race.record(futures.pop(future), future.result())
+            winner = race.winner()
+            if winner is not None:
+                return winner
+            index = race.next_launch()
+            if index is not None:
+                futures[pool.submit(attempt, index)] = index
+        return None, None, None
+    finally:
+        cancel.set()
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+def transcribe_chunked(audio_bytes, url, parameters):
+    """Transcribe a long WAV as overlapping windows on a bounded worker pool.
+
+    Each window is retried on its own (CHUNK_RETRIES) so one transient failure
+    does not discard the rest. Returns (None, None, None) when the payload is not a
+    WAV, is shorter than one window, or a window keeps failing -> caller falls
+    back to the single-request path.
+    """
+    chunks = _chunk_plan(audio_bytes)
+    if chunks is None:
+        return None, None, None
+    print_message(f"Chunked transcription: {len(chunks)} windows, {CHUNK_MAX_WORKERS} workers")
+
+    parent = telemetry.current_span()
+    failed = threading.Event()  # Set once a window failed for good -> the others stop retrying
+
+    def run_chunk(chunk):
+        for attempt in range(CHUNK_RETRIES + 1):
+            with telemetry.span("speech.chunk", parent=parent, index=chunk.index, attempt=attempt):
+                phrases = request_phrases(chunk.data, url, parameters, failed)
+            delay = _chunk_retry_delay(chunk, attempt, phrases, failed.is_set())
+            if delay is None:
+                break
+            time.sleep(delay)
+        return _chunk_result(chunk, phrases)
+
+    pool = ThreadPoolExecutor(max_workers=CHUNK_MAX_WORKERS)
+    futures = [pool.submit(run_chunk, chunk) for chunk in chunks]
     try:
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        error = next((f.exception() for f in done if f.exception() is not None), None)
+        if error is not None:
+            failed.set()
+            return _chunked_failure(error)
+        chunk_phrases = [future.result() for future in futures]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)  # Queued windows never start; running ones stop at their next attempt
+    return format_transcript(stitch_phrases(chunks, chunk_phrases))
+
+def _chunk_plan(audio_bytes):
+    """Overlapping windows to transcribe, or None (message logged) when chunking does not apply."""
+    chunks = split_wav(audio_bytes, CHUNK_SECONDS, CHUNK_OVERLAP_SECONDS)
+    if not chunks or len(chunks) < 2:
+        print_message("Chunked mode skipped (not a multi-window WAV)")
+        return None
+    return chunks
+
+def _chunk_retry_delay(chunk, attempt, phrases, stopped):
+    """Seconds to wait before retrying a window, or None when it is done (answered, stopped, out of attempts)."""
+    if phrases is not None or stopped:
+        return None
+    print_message(f"Chunk {chunk.index} failed (attempt {attempt + 1})")
+    if attempt >= CHUNK_RETRIES:
+        return None
+    return CHUNK_RETRY_BACKOFF * (2 ** attempt)
+
+def _chunk_result(chunk, phrases):
+    if phrases is None:
+        raise RuntimeError(f"chunk {chunk.index} failed after {CHUNK_RETRIES + 1} attempts")
+    return phrases
+
+def _chunked_failure(error):
+    """A window failed for good -> (None, None, None) so the caller falls back; unexpected errors propagate."""
+    if not isinstance(error, RuntimeError):
+        raise error
+    print_message(f"Chunked transcription failed: {error}")
+    return None, None, None
+
+def try_transcription(audio, url, parameters, cancel_event=None):
+    """Invoke Fast Transcription API once with supplied parameters -> (text, language, Transcript)."""
+    return _transcription_outcome(request_phrases(audio, url, parameters, cancel_event))
+
+def _transcription_outcome(phrases):
+    if not phrases:
+        if phrases is not None:
+            print_message("No phrases in response")
+        return None, None, None
+    return format_transcript(phrases)
+
+def request_phrases(audio, url, parameters, cancel_event=None):
+    """POST one transcription request; returns the phrases list ([] if silent) or None on failure.
+
+    audio: PreparedAudio (uses its real filename / MIME type) or raw WAV bytes / upload.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+    print_message("Parameters: " + json.dumps(parameters))
+    with telemetry.span("speech.request") as request_span:
+        try:
+            body, headers = encode_request(audio, parameters)
+            response = azure_transport.post(url, data=body, headers=headers, cancel_event=cancel_event)
+            return _response_phrases(response, request_span, cancel_event)
+        except Exception as e:
+            print_message(f"Exception: {e}")
+            return None
+
+def _response_phrases(response, request_span, cancel_event=None):
+    """Phrases of a (requests or httpx) response; None when it failed or the request was cancelled meanwhile."""
+    request_span.set(status=response.status_code)
+    print_message(f"HTTP {response.status_code}")
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+
+    if response.status_code != 200:
+        print_message(f"Failure: {response.text[:200]}")
+        return None
+
+    with telemetry.span("speech.parse"):
+        json_response = response.json()
+    return json_response.get('phrases', [])
+
+def encode_request(audio, parameters):
+    """Multipart body (definition + audio) and request headers."""
+    with telemetry.span("speech.encode"):
         files = {
             'definition': (None, json.dumps(parameters), 'application/json'),
-            'audio': ('audio.wav', audio.getvalue(), 'audio/wav')
+            'audio': upload_part(audio)
         }
-        headers = {'Ocp-Apim-Subscription-Key': SPEECH_KEY}
-        response = requests.post(url, files=files, headers=headers)
-        print_message(f"HTTP {response.status_code}")
+        body, content_type = azure_transport.multipart_body(files)
+    return body, {'Ocp-Apim-Subscription-Key': SPEECH_KEY, 'Content-Type': content_type}
 
-        if response.status_code != 200:
-            print_message(f"Failure: {response.text[:200]}")
-            return None, None
+def upload_part(audio):
+    """(filename, bytes or AudioSource, content type) multipart tuple for the audio field."""
+    if isinstance(audio, PreparedAudio):
+        return audio.filename, audio.data, audio.mime
+    if isinstance(audio, AudioSource):
+        filename, mime = CONTAINERS.get(audio.container, CONTAINERS["wav"])
+        return filename, audio, mime
+    payload = audio_payload(audio)
+    filename, mime = CONTAINERS.get(sniff_container(payload), CONTAINERS["wav"])
+    return filename, payload, mime
 
-        json_response = response.json()
-        phrases = json_response.get('phrases', [])
-        if not phrases:
-            print_message("No phrases in response")
-            return None, None
-
-        detected_language = phrases[0].get('locale', 'en-US')
-        lines = []
-        for phrase in phrases:
-            text = phrase.get('text', '')
-            speaker = phrase.get('speaker')
-            if text:
-                if speaker and speaker != 'Speaker':
-                    lines.append(f"{speaker}: {text}")
-                else:
-                    lines.append(text)
-        if not lines:
-            print_message("Empty phrase texts")
-            return None, None
-
-        result = '\n'.join(lines)
-        print_message("Success")
-        return result, detected_language
-    except Exception as e:
-        print_message(f"Exception: {e}")
+def format_phrases(phrases):
+    """Flatten phrases into 'Speaker: text' lines -> (transcription_text, detected_language)."""
+    detected_language = phrases[0].get('locale', 'en-US') if phrases else None
+    lines = []
+    for phrase in phrases:
+        text = phrase.get('text', '')
+        speaker = phrase.get('speaker')
+        if text:
+            if speaker and speaker != 'Speaker':
+                lines.append(f"{speaker}: {text}")
+            else:
+                lines.append(text)
+    if not lines:
+        print_message("Empty phrase texts")
         return None, None
+
+    result = '\n'.join(lines)
+    print_message("Success")
+    return result, detected_language
+
+def format_transcript(phrases):
+    """format_phrases plus the structured form -> (transcription_text, detected_language, Transcript)."""
+    result, detected_language = format_phrases(phrases)
+    if result is None:
+        return None, None, None
+    return result, detected_language, Transcript.from_phrases(phrases, detected_language)
+
+# ----- asyncio -----
+
+async def afast_transcript(audio, use_cache=True, chunked=False, hedged=False, hedge_delay=None, normalize=True, trim_silence=False, structured=False):
+    """fast_transcript() for asyncio callers (httpx transport; CPU / disk work in worker threads)."""
+    with telemetry.span("speech.transcribe", chunked=chunked, hedged=hedged, asynchronous=True) as root:
+        result, detected_language, transcript = await _afast_transcript(audio, use_cache, chunked, hedged, hedge_delay, normalize, trim_silence, structured)
+        root.set(ok=result is not None, language=detected_language)
+    if structured:
+        return result, detected_language, transcript
+    return result, detected_language
+
+async def _afast_transcript(audio, use_cache, chunked, hedged, hedge_delay, normalize, trim_silence, structured=False):
+    print_message("Fast transcription start")
+    url = transcription_url()
+    parameters = base_parameters()
+    payload = await asyncio.to_thread(source_payload, audio)
+
+    key = None
+    if use_cache:
+        key, cached = await asyncio.to_thread(_cache_lookup, payload, url, parameters, chunked, trim_silence, structured)
+        if cached:
+            return cached
+
+    uploads = {}
+
+    async def upload_for(config):
+        keep_channels = len(config["channels"]) > 1
+        if keep_channels not in uploads:
+            uploads[keep_channels] = await asyncio.to_thread(_prepare_upload, payload, keep_channels, normalize, trim_silence)
+        return uploads[keep_channels]
+
+    try:
+        return await _aattempts(url, parameters, key, upload_for, chunked, hedged, hedge_delay)
+    finally:
+        for upload in uploads.values():
+            upload.close()
+
+async def _aattempts(url, parameters, key, upload_for, chunked, hedged, hedge_delay):
+    result = detected_language = transcript = None
+    if chunked:
+        result, detected_language, transcript = await atranscribe_chunked((await upload_for(parameters)).data, url, parameters)
+
+    hedge_configs, configs = _attempt_plan(parameters, hedged)
+    if result is None and hedge_configs:
+        result, detected_language, transcript = await atranscribe_hedged(await upload_for(parameters), url, hedge_configs, hedge_delay)
+
+    for label, config in configs:
+        if result is not None:
+            break
+        if label:
+            print_message(label)
+        upload = await upload_for(config)
+        with telemetry.span("speech.attempt", config=label or "primary") as attempt:
+            result, detected_language, transcript = await atry_transcription(upload, url, config)
+            attempt.set(ok=result is not None)
+
+    if key and result is not None:
+        await asyncio.to_thread(_cache_store, key, result, detected_language, transcript)
+
+    print_message("Fast transcription end")
+    return result, detected_language, transcript
+
+async def atranscribe_hedged(audio, url, configs, hedge_delay=None):
+    """transcribe_hedged() with tasks: losers are cancelled outright (their HTTP request is dropped)."""
+    cancel = asyncio.Event()
+    parent = telemetry.current_span()
+    race = _HedgeRace(configs, hedge_delay)
+
+    async def attempt(index):
+        with telemetry.span("speech.attempt", parent=parent, config=configs[index][0] or "primary", hedged=True) as s:
+            outcome = await atry_transcription(audio, url, configs[index][1], cancel)
+            s.set(ok=outcome[0] is not None, cancelled=cancel.is_set())
+            return outcome
+
+    tasks = {asyncio.ensure_future(attempt(0)): 0}
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks, timeout=race.timeout(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                race.record(tasks.pop(task), task.result())
+            winner = race.winner()
+            if winner is not None:
+                return winner
+            index = race.next_launch()
+            if index is not None:
+                tasks[asyncio.ensure_future(attempt(index))] = index
+        return None, None, None
+    finally:
+        cancel.set()
+        for task in tasks:
+            task.cancel()
+
+async def atranscribe_chunked(audio_bytes, url, parameters):
+    """transcribe_chunked() with at most CHUNK_MAX_WORKERS windows in flight."""
+    chunks = await asyncio.to_thread(_chunk_plan, audio_bytes)
+    if chunks is None:
+        return None, None, None
+    print_message(f"Chunked transcription: {len(chunks)} windows, {CHUNK_MAX_WORKERS} in flight")
+    parent = telemetry.current_span()
+    failed = asyncio.Event()  # Set once a window failed for good -> the others stop retrying
+    slots = asyncio.Semaphore(CHUNK_MAX_WORKERS)
+
+    async def run_chunk(chunk):
+        async with slots:
+            for attempt in range(CHUNK_RETRIES + 1):
+                with telemetry.span("speech.chunk", parent=parent, index=chunk.index, attempt=attempt):
+                    phrases = await arequest_phrases(chunk.data, url, parameters, failed)
+                delay = _chunk_retry_delay(chunk, attempt, phrases, failed.is_set())
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        return _chunk_result(chunk, phrases)
+
+    tasks = [asyncio.ensure_future(run_chunk(chunk)) for chunk in chunks]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        error = next((t.exception() for t in done if t.exception() is not None), None)
+        if error is not None:
+            failed.set()
+            return _chunked_failure(error)
+        chunk_phrases = [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            task.cancel()  # Windows waiting for a slot never start; running ones drop their request
+    return format_transcript(stitch_phrases(chunks, chunk_phrases))
+
+async def atry_transcription(audio, url, parameters, cancel_event=None):
+    """try_transcription() for asyncio; cancel_event is an asyncio.Event."""
+    return _transcription_outcome(await arequest_phrases(audio, url, parameters, cancel_event))
+
+async def arequest_phrases(audio, url, parameters, cancel_event=None):
+    """request_phrases() over the async transport."""
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+    print_message("Parameters: " + json.dumps(parameters))
+    with telemetry.span("speech.request") as request_span:
+        try:
+            body, headers = encode_request(audio, parameters)
+            response = await azure_transport.apost(url, data=body, headers=headers, cancel_event=cancel_event)
+            return _response_phrases(response, request_span, cancel_event)
+        except Exception as e:
+            print_message(f"Exception: {e}")
+            return None
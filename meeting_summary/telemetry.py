@@ -0,0 +1,325 @@
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+"""telemetry.py
+Lightweight in-process instrumentation: nested timing spans + metric registry.
+
+Usage:
+    with telemetry.span("speech.request", config="primary") as s:
+        ...
+        s.set(status=200)
+    telemetry.record("speech_sdk.first_partial", seconds)   # externally measured duration
+    telemetry.count("llm.cache_hit")
+
+Design:
+- span() nests per thread / asyncio task (context variable, so interleaved coroutines
+  never adopt each other's spans); worker threads pass parent= explicitly
+- Every finished span feeds a histogram keyed by its name; root spans (with their
+  children) are kept in a bounded ring of recent traces for the diagnostics panel
+- Disabled (TELEMETRY=0 or set_enabled(False)) -> span() returns a shared no-op
+  object: no allocation, no clock reads
+- Export: to_prometheus() (text exposition format) / to_json()
+"""
+
+ENABLED = os.getenv("TELEMETRY", "1") != "0"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+RECENT_SAMPLES = 512   # Per-histogram reservoir for quantiles (most recent observations)
+RECENT_TRACES = 50
+METRIC_PREFIX = "avia"
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for empty input)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+
+class Histogram:
+    """Cumulative bucket counts (Prometheus style) + recent samples for quantiles."""
+    __slots__ = ("buckets", "counts", "count", "sum", "max", "recent", "_lock")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot: +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+            self.recent.append(value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Nearest-rank quantile over the recent samples (None when empty)."""
+        with self._lock:
+            recent = list(self.recent)
+        return percentile(recent, q * 100.0)
+
+    def snapshot(self) -> Dict:
+        p50, p95, p99 = self.quantile(0.5), self.quantile(0.95), self.quantile(0.99)
+        with self._lock:
+            return {"count": self.count, "sum": round(self.sum, 6), "max": round(self.max, 6),
+                    "p50": p50, "p95": p95, "p99": p99,
+                    "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts))}
+
+
+class Registry:
+    """Named histograms and counters, each optionally labelled."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, labels: Optional[Dict[str, str]] = None) -> Histogram:
+        key = (name, _label_key(labels))
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram(self.buckets))
+        return hist
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self.histogram(name, labels).observe(value)
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        return {
+            "histograms": [dict(name=name, labels=dict(labels), **hist.snapshot()) for (name, labels), hist in sorted(histograms)],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(counters)],
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix: str = METRIC_PREFIX) -> str:
+        """Prometheus text exposition: one histogram family per name, one counter family per name."""
+        snap = self.snapshot()
+        lines: List[str] = []
+        seen = set()
+        for h in snap["histograms"]:
+            metric = f"{prefix}_{_metric_name(h['name'])}_seconds"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for le, n in h["buckets"].items():
+                cumulative += n
+                lines.append(f"{metric}_bucket{_labels(h['labels'], le=le)} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(h['labels'])} {h['sum']}")
+            lines.append(f"{metric}_count{_labels(h['labels'])} {h['count']}")
+        for c in snap["counters"]:
+            metric = f"{prefix}_{_metric_name(c['name'])}_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels(c['labels'])} {c['value']:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _metric_name(name: str) -> str:
+    return "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def _labels(labels: Dict[str, str], **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in items.items())
+    return "{" + body + "}"
+
+
+registry = Registry()
+recent_traces: "deque[Span]" = deque(maxlen=RECENT_TRACES)
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("telemetry_span", default=None)
+
+
+# ===== Spans =====
+
+class Span:
+    """One timed operation; use via span(). Children / events are attached as they finish."""
+    __slots__ = ("name", "attrs", "parent", "children", "events", "start", "end", "_token")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attrs: Optional[Dict] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.parent = parent
+        self.children: List[Span] = []
+        self.events: List[Tuple[float, str]] = []
+        self.start = 0.0
+        self.end = 0.0
+        self._token = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def event(self, message: str):
+        self.events.append((time.perf_counter() - self.start, message))
+
+    def __enter__(self):
+        if self.parent is None:
+            self.parent = _current.get()
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        try:
+            _current.reset(self._token)
+        except ValueError:  # Exited in another context (generator resumed elsewhere)
+            pass
+        self._token = None
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        registry.observe(self.name, self.end - self.start)
+        if self.parent is not None:
+            self.parent.children.append(self)
+        else:
+            recent_traces.append(self)
+        return False
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "ms": round(self.duration * 1000, 2),
+            "attrs": self.attrs,
+            "events": [{"at_ms": round(at * 1000, 2), "message": m} for at, m in self.events],
+            "children": [child.to_dict() for child in sorted(self.children, key=lambda c: c.start)],
+        }
+
+
+class _NoopSpan:
+    """Shared stand-in returned while telemetry is disabled."""
+    __slots__ = ()
+    name = ""
+    duration = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def event(self, message: str):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def enabled() -> bool:
+    return ENABLED
+
+
+def set_enabled(flag: bool):
+    global ENABLED
+    ENABLED = bool(flag)
+
+
+def span(name: str, parent: Optional[Span] = None, **attrs):
+    """Context manager timing a block. parent: explicit parent for spans opened on worker threads."""
+    if not ENABLED:
+        return NOOP_SPAN
+    return Span(name, parent if isinstance(parent, Span) else None, attrs)
+
+
+def current_span():
+    """Innermost open span on this thread / task (None when there is none / telemetry is off)."""
+    if not ENABLED:
+        return None
+    return _current.get()
+
+
+def event(message: str):
+    """Attach a timestamped message to the current span (no-op outside spans)."""
+    current = current_span()
+    if current is not None:
+        current.event(message)
+
+
+def record(name: str, seconds: float, **labels):
+    """Feed an externally measured duration into the histogram registry."""
+    if ENABLED:
+        registry.observe(name, seconds, labels or None)
+
+
+def add_span(name: str, start: float, end: float, parent: Optional[Span] = None, **attrs):
+    """Record an already finished operation (perf_counter start / end) as a span.
+
+    For timings that cannot wrap a with-block: generators suspended across yields,
+    or sub-phases measured inside another call (upload vs. service wait).
+    """
+    if not ENABLED:
+        return
+    finished = Span(name, parent if isinstance(parent, Span) else current_span(), attrs)
+    finished.start, finished.end = start, end
+    registry.observe(name, end - start)
+    if finished.parent is not None:
+        finished.parent.children.append(finished)
+    else:
+        recent_traces.append(finished)
+
+
+def count(name: str, value: float = 1.0, **labels):
+    if ENABLED:
+        registry.inc(name, value, labels or None)
+
+
+def traces(limit: int = RECENT_TRACES) -> List[Dict]:
+    """Most recent root spans (newest first) as nested dicts."""
+    return [s.to_dict() for s in list(recent_traces)[::-1][:limit]]
+
+
+def format_trace(trace: Dict, indent: int = 0) -> str:
+    """Indented text tree of a traces() entry."""
+    attrs = " ".join(f"{k}={v}" for k, v in trace["attrs"].items())
+    lines = [f"{'  ' * indent}{trace['name']} {trace['ms']:.1f} ms {attrs}".rstrip()]
+    for child in trace["children"]:
+        lines.append(format_trace(child, indent + 1))
+    return "\n".join(lines)
+
+
+def reset():
+    registry.reset()
+    recent_traces.clear()
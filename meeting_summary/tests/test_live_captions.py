@@ -0,0 +1,87 @@
+import threading
+
+from live_captions import CaptionFeed, FakeRecognizer, TranscriptBuffer, attach, render_caption_html
+
+
+def run_script(script, feed):
+    """Drive a FakeRecognizer through attach() until its session stops."""
+    recognizer = FakeRecognizer(script, speed=0)
+    stopped = threading.Event()
+    attach(recognizer, feed)
+    recognizer.session_stopped.connect(lambda _: stopped.set())
+    feed.start()
+    recognizer.start_continuous_recognition()
+    assert stopped.wait(5)
+
+
+def test_buffer_evicts_and_pages_with_global_offsets():
+    journal = [f"segment {i}" for i in range(7)]
+    calls = []
+
+    def pager(start, count):
+        calls.append((start, count))
+        return journal[start:start + count]
+
+    buffer = TranscriptBuffer(max_segments=3, pager=pager)
+    for text in journal:
+        buffer.append(text)
+
+    assert len(buffer) == 7
+    assert buffer.first_index == 4
+    assert buffer.get(5, 10) == journal[5:]
+    assert calls == []  # Held segments never hit the pager
+    assert buffer.get(2, 4) == journal[2:6]
+    assert calls == [(2, 2)]
+    assert buffer.text() == " ".join(journal)
+
+
+def test_buffer_without_pager_skips_evicted_segments():
+    buffer = TranscriptBuffer(max_segments=2)
+    for text in ("a", "b", "c"):
+        buffer.append(text)
+    assert buffer.get(0, 3) == ["b", "c"]
+
+
+def test_fake_recognizer_feeds_bounded_caption_state():
+    script = [(0, "partial", "one")] + [(0, "final", f"final {i}") for i in range(6)]
+    feed = CaptionFeed(tail_segments=2, max_segments=4)
+    run_script(script, feed)
+
+    snap = feed.snapshot()
+    assert not snap.running
+    assert snap.total_segments == 6
+    assert snap.finals_html == ["final 4", "final 5"]
+    assert snap.partial == ""
+    assert feed.page(0, 6) == [f"final {i}" for i in range(2, 6)]  # Evicted, no pager
+
+    feed.pager = lambda start, count: [f"final {i}" for i in range(start, start + count)]
+    assert feed.page(0, 6) == [f"final {i}" for i in range(6)]
+    assert "… 4 earlier segments" in render_caption_html(snap)
+
+
+def test_caption_html_is_escaped():
+    feed = CaptionFeed()
+    partial_seen = threading.Event()
+    script = [(0, "final", "<b>Q&A</b> starts"), (0, "partial", "<script>x</script>"), (60, "final", "never")]
+    recognizer = FakeRecognizer(script)
+    attach(recognizer, feed)
+    recognizer.recognizing.connect(lambda _: partial_seen.set())
+    feed.start()
+    recognizer.start_continuous_recognition()
+    try:
+        assert partial_seen.wait(5)
+        rendered = render_caption_html(feed.snapshot())
+    finally:
+        recognizer.stop_continuous_recognition()
+
+    assert "&lt;b&gt;Q&amp;A&lt;/b&gt; starts" in rendered
+    assert "<span class='live-partial'>&lt;script&gt;x&lt;/script&gt;</span>" in rendered
+    assert "<b>" not in rendered and "<script>" not in rendered
+    assert feed.text() == "<b>Q&A</b> starts"  # Raw text is kept for export / translation
+
+
+def test_empty_feed_renders_placeholder():
+    feed = CaptionFeed()
+    assert "No transcript yet." in render_caption_html(feed.snapshot())
+    feed.start()
+    assert "Capturing…" in render_caption_html(feed.snapshot())
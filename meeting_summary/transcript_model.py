@@ -0,0 +1,330 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+"""transcript_model.py
+Compact structured transcript: what Fast Transcription returns, minus the dicts.
+
+Layout (struct-of-arrays, phrases in time order):
+- phrase columns: start_ms (int64), duration_ms (int32), speaker / locale ids (int16,
+  -1 = none, names in small lookup tables), confidence (float32, NaN = none)
+- phrase text: one UTF-8 blob + int64 offsets (n + 1); same for words, whose rows
+  (start_ms, duration_ms, text offsets) are packed in one table indexed per phrase
+- a running max of phrase end times makes between() a binary search
+
+Binary file format (save / load): b"AVTR", u32 version, u32 header length, JSON
+header (lookup tables + column name -> dtype, byte offset, count), then the raw
+column arrays, each 8-byte aligned. load() memory-maps the file and wraps the
+columns with np.frombuffer, so nothing is read until a column is touched.
+
+Slices (between, for_speakers, take) are Transcripts themselves; contiguous time
+ranges share the parent's buffers (no copies).
+"""
+
+MAGIC = b"AVTR"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<4sII")
+_ALIGN = 8
+
+_COLUMNS = (
+    ("start_ms", np.int64), ("duration_ms", np.int32), ("speaker_id", np.int16), ("locale_id", np.int16),
+    ("confidence", np.float32), ("text_offsets", np.int64), ("word_index", np.int64),
+    ("word_start_ms", np.int64), ("word_duration_ms", np.int32), ("word_offsets", np.int64),
+    ("text_blob", np.uint8), ("word_blob", np.uint8),
+)
+
+
+def _offsets(lengths) -> np.ndarray:
+    out = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=out[1:])
+    return out
+
+
+def _gather(offsets: np.ndarray, blob: np.ndarray, rows: np.ndarray):
+    """Pack the variable-length items `rows` of (offsets, blob) into a new (offsets, blob) pair."""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    new_offsets = _offsets(lengths)
+    total = int(new_offsets[-1])
+    if not total:
+        return new_offsets, blob[:0]
+    positions = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(total, dtype=np.int64)
+    return new_offsets, blob[positions]
+
+
+class Word:
+    __slots__ = ("text", "start_ms", "duration_ms")
+
+    def __init__(self, text: str, start_ms: int, duration_ms: int):
+        self.text = text
+        self.start_ms = start_ms
+        self.duration_ms = duration_ms
+
+    def __repr__(self):
+        return f"Word({self.text!r}, {self.start_ms}, {self.duration_ms})"
+
+
+class Phrase:
+    """Read-only view of one row (decoded on access)."""
+    __slots__ = ("transcript", "index")
+
+    def __init__(self, transcript: "Transcript", index: int):
+        self.transcript = transcript
+        self.index = index
+
+    @property
+    def start_ms(self) -> int:
+        return int(self.transcript.start_ms[self.index])
+
+    @property
+    def duration_ms(self) -> int:
+        return int(self.transcript.duration_ms[self.index])
+
+    @property
+    def end_ms(self) -> int:
+        return self.start_ms + self.duration_ms
+
+    @property
+    def speaker(self) -> Optional[str]:
+        sid = int(self.transcript.speaker_id[self.index])
+        return self.transcript.speakers[sid] if sid >= 0 else None
+
+    @property
+    def locale(self) -> Optional[str]:
+        lid = int(self.transcript.locale_id[self.index])
+        return self.transcript.locales[lid] if lid >= 0 else None
+
+    @property
+    def confidence(self) -> Optional[float]:
+        value = float(self.transcript.confidence[self.index])
+        return None if value != value else value
+
+    @property
+    def text(self) -> str:
+        return self.transcript.text(self.index)
+
+    def words(self) -> List[Word]:
+        return self.transcript.words(self.index)
+
+    def __repr__(self):
+        return f"Phrase({self.start_ms}ms, speaker={self.speaker!r}, {self.text!r})"
+
+
+class Transcript:
+    """Column-oriented transcript (see module docstring); build with from_phrases() or load()."""
+    __slots__ = ("locale", "speakers", "locales", "start_ms", "duration_ms", "speaker_id", "locale_id", "confidence",
+                 "text_offsets", "word_index", "word_start_ms", "word_duration_ms", "word_offsets",
+                 "text_blob", "word_blob", "_end_max", "_buffer")
+
+    def __init__(self, locale: Optional[str], speakers: Sequence[str], locales: Sequence[str], columns: Dict[str, np.ndarray], buffer=None):
+        self.locale = locale
+        self.speakers = list(speakers)
+        self.locales = list(locales)
+        for name, _ in _COLUMNS:
+            setattr(self, name, columns[name])
+        self._end_max: Optional[np.ndarray] = None
+        self._buffer = buffer  # Keeps an mmap alive for zero-copy columns
+
+    # ----- Construction -----
+    @classmethod
+    def from_phrases(cls, phrases: Sequence[Dict], locale: Optional[str] = None) -> "Transcript":
+        """Pack Fast Transcription `phrases` (offsets, durations, speaker, locale, confidence, words)."""
+        ordered = sorted(phrases, key=lambda p: p.get("offsetMilliseconds", 0))  # Stable: channels interleave in time
+        speakers: Dict[str, int] = {}
+        locales: Dict[str, int] = {}
+        n = len(ordered)
+        start = np.zeros(n, dtype=np.int64)
+        duration = np.zeros(n, dtype=np.int32)
+        speaker_id = np.full(n, -1, dtype=np.int16)
+        locale_id = np.full(n, -1, dtype=np.int16)
+        confidence = np.full(n, np.nan, dtype=np.float32)
+        texts: List[bytes] = []
+        word_counts: List[int] = []
+        word_start: List[int] = []
+        word_duration: List[int] = []
+        word_texts: List[bytes] = []
+        for i, phrase in enumerate(ordered):
+            start[i] = phrase.get("offsetMilliseconds", 0)
+            duration[i] = phrase.get("durationMilliseconds", 0)
+            if phrase.get("speaker") is not None:
+                speaker_id[i] = speakers.setdefault(str(phrase["speaker"]), len(speakers))
+            if phrase.get("locale"):
+                locale_id[i] = locales.setdefault(phrase["locale"], len(locales))
+            if phrase.get("confidence") is not None:
+                confidence[i] = phrase["confidence"]
+            texts.append(phrase.get("text", "").encode("utf-8"))
+            words = phrase.get("words") or []
+            word_counts.append(len(words))
+            for word in words:
+                word_start.append(word.get("offsetMilliseconds", 0))
+                word_duration.append(word.get("durationMilliseconds", 0))
+                word_texts.append(word.get("text", "").encode("utf-8"))
+        columns = {
+            "start_ms": start, "duration_ms": duration, "speaker_id": speaker_id, "locale_id": locale_id,
+            "confidence": confidence,
+            "text_offsets": _offsets([len(t) for t in texts]),
+            "word_index": _offsets(word_counts),
+            "word_start_ms": np.array(word_start, dtype=np.int64),
+            "word_duration_ms": np.array(word_duration, dtype=np.int32),
+            "word_offsets": _offsets([len(t) for t in word_texts]),
+            "text_blob": np.frombuffer(b"".join(texts), dtype=np.uint8),
+            "word_blob": np.frombuffer(b"".join(word_texts), dtype=np.uint8),
+        }
+        if locale is None and ordered:
+            locale = ordered[0].get("locale")
+        return cls(locale, list(speakers), list(locales), columns)
+
+    # ----- Access -----
+    def __len__(self) -> int:
+        return len(self.start_ms)
+
+    def __getitem__(self, index: int) -> Phrase:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return Phrase(self, index)
+
+    def __iter__(self) -> Iterator[Phrase]:
+        return (Phrase(self, i) for i in range(len(self)))
+
+    @property
+    def end_ms(self) -> int:
+        return int(self._ends_max()[-1]) if len(self) else 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name, _ in _COLUMNS)
+
+    def text(self, index: int) -> str:
+        a, b = self.text_offsets[index], self.text_offsets[index + 1]
+        return self.text_blob[a:b].tobytes().decode("utf-8")
+
+    def words(self, index: int) -> List[Word]:
+        out = []
+        for w in range(int(self.word_index[index]), int(self.word_index[index + 1])):
+            a, b = self.word_offsets[w], self.word_offsets[w + 1]
+            out.append(Word(self.word_blob[a:b].tobytes().decode("utf-8"), int(self.word_start_ms[w]), int(self.word_duration_ms[w])))
+        return out
+
+    def speaker_of(self, index: int) -> Optional[str]:
+        sid = int(self.speaker_id[index])
+        return self.speakers[sid] if sid >= 0 else None
+
+    def lines(self) -> List[str]:
+        """'Speaker: text' lines (same labelling as speech_fast_transcription.format_phrases)."""
+        out = []
+        for i in range(len(self)):
+            text = self.text(i)
+            if not text:
+                continue
+            speaker = self.speaker_of(i)
+            out.append(f"{speaker}: {text}" if speaker and speaker != "Speaker" else text)
+        return out
+
+    def to_text(self) -> str:
+        return "\n".join(self.lines())
+
+    # ----- Slicing -----
+    def _ends_max(self) -> np.ndarray:
+        if self._end_max is None:
+            self._end_max = np.maximum.accumulate(self.start_ms + self.duration_ms) if len(self) else np.zeros(0, dtype=np.int64)
+        return self._end_max
+
+    def between(self, start_ms: int, end_ms: int) -> "Transcript":
+        """Phrases overlapping [start_ms, end_ms)."""
+        lo = int(np.searchsorted(self._ends_max(), start_ms, side="right"))
+        hi = int(np.searchsorted(self.start_ms, end_ms, side="left"))
+        if hi <= lo:
+            return self._range(0, 0)
+        ends = self.start_ms[lo:hi] + self.duration_ms[lo:hi]
+        keep = ends > start_ms
+        if keep.all():
+            return self._range(lo, hi)
+        return self.take(np.flatnonzero(keep) + lo)
+
+    def for_speakers(self, *speakers: str) -> "Transcript":
+        """Phrases spoken by any of the given speaker labels."""
+        ids = [self.speakers.index(str(s)) for s in speakers if str(s) in self.speakers]
+        return self.take(np.flatnonzero(np.isin(self.speaker_id, ids)))
+
+    def take(self, rows) -> "Transcript":
+        """Transcript of the given phrase rows (index array / list, kept in the given order)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        text_offsets, text_blob = _gather(self.text_offsets, self.text_blob, rows)
+        word_index, word_rows = _gather(self.word_index, np.arange(len(self.word_start_ms), dtype=np.int64), rows)
+        word_offsets, word_blob = _gather(self.word_offsets, self.word_blob, word_rows)
+        return Transcript(self.locale, self.speakers, self.locales, {
+            "start_ms": self.start_ms[rows], "duration_ms": self.duration_ms[rows],
+            "speaker_id": self.speaker_id[rows], "locale_id": self.locale_id[rows], "confidence": self.confidence[rows],
+            "text_offsets": text_offsets, "word_index": word_index,
+            "word_start_ms": self.word_start_ms[word_rows], "word_duration_ms": self.word_duration_ms[word_rows],
+            "word_offsets": word_offsets, "text_blob": text_blob, "word_blob": word_blob,
+        })
+
+    def _range(self, lo: int, hi: int) -> "Transcript":
+        """Contiguous rows [lo, hi) as views of this transcript's buffers."""
+        t0, t1 = int(self.text_offsets[lo]), int(self.text_offsets[hi])
+        w0, w1 = int(self.word_index[lo]), int(self.word_index[hi])
+        b0, b1 = int(self.word_offsets[w0]), int(self.word_offsets[w1])
+        return Transcript(self.locale, self.speakers, self.locales, {
+            "start_ms": self.start_ms[lo:hi], "duration_ms": self.duration_ms[lo:hi],
+            "speaker_id": self.speaker_id[lo:hi], "locale_id": self.locale_id[lo:hi], "confidence": self.confidence[lo:hi],
+            "text_offsets": self.text_offsets[lo:hi + 1] - t0, "word_index": self.word_index[lo:hi + 1] - w0,
+            "word_start_ms": self.word_start_ms[w0:w1], "word_duration_ms": self.word_duration_ms[w0:w1],
+            "word_offsets": self.word_offsets[w0:w1 + 1] - b0,
+            "text_blob": self.text_blob[t0:t1], "word_blob": self.word_blob[b0:b1],
+        }, self._buffer)
+
+    # ----- Binary format -----
+    def to_bytes(self) -> bytes:
+        columns, position = {}, 0
+        for name, dtype in _COLUMNS:
+            array = np.ascontiguousarray(getattr(self, name), dtype=dtype)
+            columns[name] = (np.dtype(dtype).str, position, len(array))
+            position += -(-array.nbytes // _ALIGN) * _ALIGN
+        header = json.dumps({"locale": self.locale, "speakers": self.speakers, "locales": self.locales,
+                             "columns": columns}, ensure_ascii=False).encode("utf-8")
+        header += b" " * (-(_PREAMBLE.size + len(header)) % _ALIGN)
+        parts = [_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)), header]
+        for name, dtype in _COLUMNS:
+            data = np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes()
+            parts.append(data + b"\0" * (-len(data) % _ALIGN))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, buffer=None) -> "Transcript":
+        """Parse the binary format; columns are zero-copy views of data."""
+        magic, version, header_len = _PREAMBLE.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a transcript file (or unsupported version)")
+        header = json.loads(bytes(data[_PREAMBLE.size:_PREAMBLE.size + header_len]).decode("utf-8"))
+        base = _PREAMBLE.size + header_len
+        columns = {name: np.frombuffer(data, dtype=np.dtype(dtype), count=count, offset=base + offset)
+                   for name, (dtype, offset, count) in header["columns"].items()}
+        return cls(header.get("locale"), header["speakers"], header["locales"], columns, buffer if buffer is not None else data)
+
+    def save(self, path: str):
+        """Atomic write of the binary format."""
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True) -> "Transcript":
+        """Load a saved transcript; use_mmap maps the file so columns page in lazily."""
+        with open(path, "rb") as f:
+            if not use_mmap or os.fstat(f.fileno()).st_size == 0:
+                return cls.from_bytes(f.read())
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_bytes(mapped, mapped)
+
+    def summary(self) -> str:
+        minutes = self.end_ms / 60000
+        return f"{len(self)} phrases · {len(self.speakers)} speakers · {minutes:.1f} min · {self.nbytes / 1024:.1f} KB"
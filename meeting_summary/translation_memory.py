@@ -0,0 +1,290 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import azure_transport
+import telemetry
+
+"""translation_memory.py
+Persistent translation memory shared by every scenario and session.
+
+- Key: (source language, target language, normalized source text); normalization is
+  Unicode NFKC + collapsed whitespace, so "Good  morning " and "Good morning" share an entry
+- Local SQLite file (WAL, one connection per process guarded by a lock); LRU eviction on
+  last_used once the table holds more than max_entries rows
+- translate(client, texts, ...) looks every text up first and sends only the distinct
+  misses to the Translator, batched within the service limits; results come back in
+  input order (atranslate: same for the async Translator client)
+- Each entry remembers what fetching it cost (its share of the batch latency), so hits
+  report latency saved; LookupStats collects per-call numbers, stats() totals
+
+TRANSLATION_MEMORY=0 disables the layer (translate() then always calls the service).
+"""
+
+TRANSLATION_MEMORY_ENABLED = os.getenv("TRANSLATION_MEMORY", "1") != "0"
+TRANSLATION_MEMORY_PATH = os.getenv("TRANSLATION_MEMORY_PATH", os.path.join(os.getcwd(), ".cache", "translation_memory.sqlite3"))
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "100000"))
+MAX_BATCH_ITEMS = 100      # Translator: <= 1000 elements per request
+MAX_BATCH_CHARS = 40000    # Translator: <= 50,000 characters per request
+EVICT_SLACK = 0.05         # Evict this fraction below the limit so eviction runs rarely
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    latency REAL NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (source_lang, target_lang, source)
+);
+CREATE INDEX IF NOT EXISTS memory_last_used ON memory (last_used);
+"""
+
+
+def normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class LookupStats:
+    """Per-call numbers filled in by translate()."""
+
+    def __init__(self):
+        self.segments = 0
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.saved_seconds = 0.0
+        self.service_seconds = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.hits}/{self.hits + self.misses} segments from translation memory "
+                f"({self.hit_rate:.0%}), ~{self.saved_seconds:.1f}s saved, {self.requests} translator requests")
+
+
+class TranslationMemory:
+    """SQLite-backed (source_lang, target_lang, normalized text) -> translation store with LRU eviction."""
+
+    def __init__(self, path: str = TRANSLATION_MEMORY_PATH, max_entries: int = TRANSLATION_MEMORY_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+
+    def lookup(self, texts: Sequence[str], source_lang: str, target_lang: str) -> Dict[str, Tuple[str, float]]:
+        """normalized text -> (translation, latency it saves) for the texts present; refreshes their LRU stamp."""
+        keys = list(dict.fromkeys(normalize(t) for t in texts if t and t.strip()))
+        found: Dict[str, Tuple[str, float]] = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):  # Stay under SQLite's bound-parameter limit
+                part = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT source, translation, latency FROM memory WHERE source_lang = ? AND target_lang = ? "
+                    f"AND source IN ({','.join('?' * len(part))})", (source_lang, target_lang, *part)).fetchall()
+                found.update((source, (translation, latency)) for source, translation, latency in rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE memory SET last_used = ?, hits = hits + 1 WHERE source_lang = ? AND target_lang = ? AND source = ?",
+                    [(now, source_lang, target_lang, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            self.saved_seconds += sum(latency for _, latency in found.values())
+        return found
+
+    def store(self, entries: Sequence[Tuple[str, str, float]], source_lang: str, target_lang: str):
+        """entries: (source text, translation, latency share) triples."""
+        now = time.time()
+        rows = [(source_lang, target_lang, normalize(source), translation, latency, now, now)
+                for source, translation, latency in entries if source and source.strip()]
+        if not rows:
+            return
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO memory (source_lang, target_lang, source, translation, latency, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            self.stores += self._conn.total_changes - before
+            self._rows = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+            if self._rows > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        target = int(self.max_entries * (1 - EVICT_SLACK))
+        excess = self._rows - target
+        self._conn.execute(
+            "DELETE FROM memory WHERE rowid IN (SELECT rowid FROM memory ORDER BY last_used LIMIT ?)", (excess,))
+        self._conn.commit()
+        self.evictions += excess
+        self._rows = target
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM memory")
+            self._conn.commit()
+            self._rows = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._rows,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+
+_default: Optional[TranslationMemory] = None
+_default_lock = threading.Lock()
+
+
+def default_memory() -> Optional[TranslationMemory]:
+    """Process-wide memory at TRANSLATION_MEMORY_PATH (None when disabled or the file cannot be opened)."""
+    global _default, TRANSLATION_MEMORY_ENABLED
+    if not TRANSLATION_MEMORY_ENABLED:
+        return None
+    with _default_lock:
+        if _default is None:
+            try:
+                _default = TranslationMemory()
+            except sqlite3.Error:
+                TRANSLATION_MEMORY_ENABLED = False  # Unusable file -> behave as disabled
+                return None
+        return _default
+
+
+def _batches(texts: List[str]):
+    batch, chars = [], 0
+    for text in texts:
+        if batch and (len(batch) >= MAX_BATCH_ITEMS or chars + len(text) > MAX_BATCH_CHARS):
+            yield batch
+            batch, chars = [], 0
+        batch.append(text)
+        chars += len(text)
+    if batch:
+        yield batch
+
+
+class _Plan:
+    """One translate() call: memory hits, distinct misses, results; shared by the sync and async paths."""
+
+    def __init__(self, texts: Sequence[str], to_language: str, from_language: Optional[str], memory: Optional[TranslationMemory]):
+        self.texts = texts
+        self.to_language = to_language
+        self.source_lang = from_language or "auto"
+        self.memory = memory
+        self.keys = [normalize(t) if t and t.strip() else "" for t in texts]
+        self.found: Dict[str, Tuple[str, float]] = {}
+        self.translated: Dict[str, str] = {}
+        self.missing: Dict[str, str] = {}  # normalized -> first original text
+        self.requests = 0
+        self.service_seconds = 0.0
+
+    def lookup(self):
+        self.found = self.memory.lookup(self.texts, self.source_lang, self.to_language) if self.memory is not None else {}
+        self.translated = {key: value for key, (value, _) in self.found.items()}
+        for key, text in zip(self.keys, self.texts):
+            if key and key not in self.translated:
+                self.missing.setdefault(key, text)
+
+    def batches(self):
+        return _batches(list(self.missing.values()))
+
+    def add(self, batch: List[str], result, elapsed: float):
+        """Record one service response; returns the memory entries to store."""
+        self.requests += 1
+        self.service_seconds += elapsed
+        outputs = [item['translations'][0]['text'] for item in result]
+        chars = sum(len(t) for t in batch) or 1
+        entries = [(text, out, elapsed * len(text) / chars) for text, out in zip(batch, outputs)]
+        for text, out, _ in entries:
+            self.translated[normalize(text)] = out
+        return entries
+
+    def finish(self, stats: Optional[LookupStats]) -> List[str]:
+        saved = sum(latency for _, latency in self.found.values())
+        telemetry.count("translation_memory.hit", len(self.found))
+        telemetry.count("translation_memory.miss", len(self.missing))
+        if saved:
+            telemetry.count("translation_memory.saved_seconds", saved)
+        if stats is not None:
+            stats.segments += len(self.texts)
+            stats.hits += len(self.found)
+            stats.misses += len(self.missing)
+            stats.requests += self.requests
+            stats.saved_seconds += saved
+            stats.service_seconds += self.service_seconds
+        return [self.translated.get(key, "") if key else "" for key in self.keys]
+
+
+def translate(client, texts: Sequence[str], to_language: str, from_language: Optional[str] = None,
+              memory: Optional[TranslationMemory] = None, endpoint: Optional[str] = None,
+              stats: Optional[LookupStats] = None) -> List[str]:
+    """Translate texts (one result per input, in order): memory hits first, distinct misses in batched requests.
+
+    memory defaults to default_memory(). Service errors propagate; hits are never lost to them.
+    """
+    plan = _Plan(texts, to_language, from_language, memory if memory is not None else default_memory())
+    plan.lookup()
+    if plan.missing:
+        with telemetry.span("translation_memory.fetch", misses=len(plan.missing)):
+            for batch in plan.batches():
+                started = time.perf_counter()
+                result = azure_transport.translate(client, body=batch, to_language=[to_language],
+                                                   from_language=from_language, endpoint=endpoint)
+                entries = plan.add(batch, result, time.perf_counter() - started)
+                if plan.memory is not None:
+                    plan.memory.store(entries, plan.source_lang, to_language)
+    return plan.finish(stats)
+
+
+async def atranslate(client, texts: Sequence[str], to_language: str, from_language: Optional[str] = None,
+                     memory: Optional[TranslationMemory] = None, endpoint: Optional[str] = None,
+                     stats: Optional[LookupStats] = None) -> List[str]:
+    """translate() for an aio TextTranslationClient; SQLite work runs in a worker thread."""
+    plan = _Plan(texts, to_language, from_language, memory if memory is not None else default_memory())
+    await asyncio.to_thread(plan.lookup)
+    if plan.missing:
+        with telemetry.span("translation_memory.fetch", misses=len(plan.missing)):
+            for batch in plan.batches():
+                started = time.perf_counter()
+                result = await azure_transport.atranslate(client, body=batch, to_language=[to_language],
+                                                          from_language=from_language, endpoint=endpoint)
+                entries = plan.add(batch, result, time.perf_counter() - started)
+                if plan.memory is not None:
+                    await asyncio.to_thread(plan.memory.store, entries, plan.source_lang, to_language)
+    return plan.finish(stats)